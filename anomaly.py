@@ -0,0 +1,119 @@
+"""刷星检测：对一批新stargazer整体打分
+
+所有特征都以NumPy数组在整批用户上一次算出，避免逐个用户的Python循环，
+热门仓库一分钟涌入上千个star时也能跟上。NumPy是可选依赖，未安装时不启用检测。
+"""
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .tracing import parse_github_time
+
+# 注册不足该天数的账号视为新账号
+NEW_ACCOUNT_DAYS = 30
+# 统计该时间窗口内最多集中了整批中多少比例的star
+BURST_WINDOW_SECONDS = 10.0
+# starred_at只精确到秒，平均间隔小于该值时间隔分布没有参考意义
+MIN_MEAN_GAP_SECONDS = 2.0
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def _timestamps(values: List[str]):
+    """把一组GitHub ISO时间整体交给NumPy解析为秒级时间戳，无法解析的为NaN"""
+    try:
+        parsed = np.array([value[:19] if value else "NaT" for value in values], dtype="datetime64[s]")
+    except ValueError:
+        return np.array([parse_github_time(value) or np.nan for value in values], dtype=np.float64)
+    stamps = parsed.astype(np.int64).astype(np.float64)
+    stamps[np.isnat(parsed)] = np.nan
+    return stamps
+
+
+class AnomalyResult:
+    """一批stargazer的检测结果，各比例均为0~1"""
+
+    __slots__ = ("size", "score", "suspicious", "new_account_ratio", "zero_follower_ratio", "empty_profile_ratio", "burst_ratio", "regularity")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.score = 0.0
+        self.suspicious = False
+        self.new_account_ratio = 0.0
+        self.zero_follower_ratio = 0.0
+        self.empty_profile_ratio = 0.0
+        # 最密集的时间窗口内star的占比
+        self.burst_ratio = 0.0
+        # star间隔越均匀越接近1，自然流量的间隔近似指数分布（变异系数约为1）
+        self.regularity = 0.0
+
+    def reasons(self) -> List[str]:
+        reasons = []
+        if self.new_account_ratio >= 0.3:
+            reasons.append(f"新注册账号 {self.new_account_ratio:.0%}")
+        if self.zero_follower_ratio >= 0.3:
+            reasons.append(f"无关注者 {self.zero_follower_ratio:.0%}")
+        if self.empty_profile_ratio >= 0.3:
+            reasons.append(f"无公开仓库 {self.empty_profile_ratio:.0%}")
+        if self.burst_ratio >= 0.5:
+            reasons.append(f"{self.burst_ratio:.0%}的star集中在{BURST_WINDOW_SECONDS:.0f}秒内")
+        if self.regularity >= 0.5:
+            reasons.append("star间隔异常均匀")
+        return reasons
+
+
+def score_batch(stargazers: list, profiles: list, threshold: float = 0.6, min_batch: int = 10) -> Optional[AnomalyResult]:
+    """对一批 Stargazer 打分，少于 min_batch 个或没有NumPy时返回None
+
+    profiles 与 stargazers 一一对应，提供账号特征（注册时间、关注者、公开仓库数）。
+    查询失败、未查询或不存在的账号没有真实资料，不计入账号特征的比例，只参与时间分布的统计；
+    有真实资料的用户不足 min_batch 个时不打分，避免把资料缺失误判为空账号。
+    """
+    if np is None or len(stargazers) < min_batch:
+        return None
+    has_profile = np.array([profile is not None and profile.found for profile in profiles], dtype=bool)
+    profiled = int(has_profile.sum())
+    if profiled < min_batch:
+        return None
+    size = len(stargazers)
+    starred = _timestamps([user.starred_at for user in stargazers])
+    created = _timestamps([profile.created_at if profile else "" for profile in profiles])
+    followers = np.array([profile.followers if profile else 0 for profile in profiles], dtype=np.int64)
+    repos = np.array([profile.public_repos if profile else 0 for profile in profiles], dtype=np.int64)
+
+    result = AnomalyResult(size)
+    # 账号特征：星标时账号年龄、关注者数与公开仓库数
+    per_user = np.zeros(size, dtype=np.float64)
+    if profiled:
+        age_days = (starred - created) / 86400
+        new_account = has_profile & (age_days < NEW_ACCOUNT_DAYS)
+        zero_followers = has_profile & (followers == 0)
+        empty_profile = has_profile & (repos == 0)
+        result.new_account_ratio = float(new_account.sum()) / profiled
+        result.zero_follower_ratio = float(zero_followers.sum()) / profiled
+        result.empty_profile_ratio = float(empty_profile.sum()) / profiled
+        per_user = 0.45 * new_account + 0.35 * zero_followers + 0.2 * empty_profile
+    account_score = float(per_user[has_profile].mean()) if profiled else 0.0
+
+    # 时间特征：最密集窗口的集中度（searchsorted一次求出每个起点窗口内的数量），
+    # 以及间隔分布的变异系数，脚本批量操作的间隔往往过于均匀
+    times = np.sort(starred[~np.isnan(starred)])
+    timing_score = 0.0
+    if times.size >= 3:
+        in_window = np.searchsorted(times, times + BURST_WINDOW_SECONDS, side="right") - np.arange(times.size)
+        result.burst_ratio = float(in_window.max()) / times.size
+        gaps = np.diff(times)
+        mean_gap = gaps.mean()
+        if mean_gap >= MIN_MEAN_GAP_SECONDS:
+            result.regularity = float(np.clip(1 - gaps.std() / mean_gap, 0, 1))
+        timing_score = 0.5 * result.burst_ratio + 0.5 * result.regularity
+
+    weight = 0.6 if profiled else 0.0
+    result.score = round(weight * account_score + (1 - weight) * timing_score, 3)
+    result.suspicious = result.score >= threshold
+    return result
@@ -0,0 +1,215 @@
+"""GitHubStarMonitor 基准测试
+
+在本地模拟的GitHub API上运行监控插件，统计不同仓库规模下的
+单轮检查耗时、每轮请求数、内存占用以及渲染/发送延迟。
+
+用法:
+    python benchmarks/bench_monitor.py --sizes 10,100,1000 --cycles 3 --latency 0.02
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(BENCH_DIR)
+PLUGIN_PACKAGE = "star_monitor_plugin"
+
+sys.path.insert(0, BENCH_DIR)
+from mock_github import MockGitHub  # noqa: E402
+
+
+def load_plugin_module():
+    """以包的形式加载插件的 main 模块，与AstrBot的加载方式一致"""
+    if PLUGIN_PACKAGE not in sys.modules:
+        package = types.ModuleType(PLUGIN_PACKAGE)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PLUGIN_PACKAGE] = package
+    return importlib.import_module(f"{PLUGIN_PACKAGE}.main")
+
+
+class FakeContext:
+    """替代AstrBot的Context，只记录发送的消息和耗时"""
+
+    def __init__(self, send_latency: float = 0.0):
+        self.send_latency = send_latency
+        self.sent: List[tuple] = []
+        self.send_durations: List[float] = []
+
+    async def send_message(self, session, message_chain):
+        start = time.perf_counter()
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        self.sent.append((session, message_chain))
+        self.send_durations.append(time.perf_counter() - start)
+        return True
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def instrument(monitor, method_name: str, samples: List[float]):
+    """包装插件方法，记录每次调用耗时"""
+    original = getattr(monitor, method_name)
+
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    setattr(monitor, method_name, wrapper)
+
+
+async def run_size(module, size: int, args) -> Dict:
+    mock = MockGitHub(
+        repo_count=size,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        enable_etag=not args.no_etag,
+        seed=args.seed,
+    )
+    base_url = await mock.start()
+    context = FakeContext(send_latency=args.send_latency)
+    config = {
+        "repositories": [f"org:{mock.owner}"] if args.discover else mock.repo_names,
+        "target_sessions": [f"bench:GroupMessage:{i}" for i in range(args.sessions)],
+        "github_token": args.token,
+        "check_interval": 60,
+        "enable_startup_notification": False,
+        "enable_image_notification": args.images,
+        "max_concurrent_requests": args.concurrency,
+        "enable_stargazer_enrichment": args.enrich,
+        # 各轮检查连续进行，关闭响应缓存以免复用上一轮的结果
+        "response_cache_ttl": 0,
+    }
+    monitor = module.GitHubStarMonitor(context, config)
+    # 基准测试手动驱动检查，不使用插件自带的后台循环
+    if monitor.monitoring_task:
+        monitor.monitoring_task.cancel()
+    monitor.api_base = base_url
+
+    render_samples: List[float] = []
+    instrument(monitor, "render_html_to_image", render_samples)
+
+    try:
+        start = time.perf_counter()
+        await monitor.init_star_counts()
+        init_time = time.perf_counter() - start
+        init_requests = mock.request_count
+
+        cycle_times, cycle_requests, changes = [], [], 0
+        for _ in range(args.cycles):
+            changes += len(mock.burst(args.burst_fraction, args.burst_size))
+            mock.reset_stats()
+            start = time.perf_counter()
+            await monitor.check_repositories()
+            cycle_times.append(time.perf_counter() - start)
+            cycle_requests.append(mock.request_count)
+
+        # 单独跑一轮统计内存，避免tracemalloc拖慢计时
+        mock.burst(args.burst_fraction, args.burst_size)
+        tracemalloc.start()
+        await monitor.check_repositories()
+        current_mem, peak_mem = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        await monitor.terminate()
+        await mock.stop()
+
+    return {
+        "repos": size,
+        "init_time_s": init_time,
+        "init_requests": init_requests,
+        "cycle_time_mean_s": statistics.mean(cycle_times),
+        "cycle_time_max_s": max(cycle_times),
+        "requests_per_cycle": statistics.mean(cycle_requests),
+        "changes": changes,
+        "not_modified": mock.not_modified_count,
+        "rate_limited": mock.rate_limited_count,
+        "mem_current_kb": current_mem / 1024,
+        "mem_peak_kb": peak_mem / 1024,
+        "renders": len(render_samples),
+        "render_p50_ms": percentile(render_samples, 50) * 1000,
+        "render_p99_ms": percentile(render_samples, 99) * 1000,
+        "sends": len(context.send_durations),
+        "send_p50_ms": percentile(context.send_durations, 50) * 1000,
+        "send_p99_ms": percentile(context.send_durations, 99) * 1000,
+    }
+
+
+def print_table(results: List[Dict]):
+    columns = [
+        ("repos", "仓库数", "{:d}"),
+        ("cycle_time_mean_s", "轮耗时(s)", "{:.3f}"),
+        ("cycle_time_max_s", "最大(s)", "{:.3f}"),
+        ("requests_per_cycle", "请求/轮", "{:.1f}"),
+        ("mem_peak_kb", "峰值内存(KB)", "{:.0f}"),
+        ("render_p50_ms", "渲染p50(ms)", "{:.1f}"),
+        ("render_p99_ms", "渲染p99(ms)", "{:.1f}"),
+        ("send_p50_ms", "发送p50(ms)", "{:.2f}"),
+        ("send_p99_ms", "发送p99(ms)", "{:.2f}"),
+    ]
+    print("  ".join(title for _, title, _ in columns))
+    for result in results:
+        print("  ".join(fmt.format(result[key]).rjust(len(title)) for key, title, fmt in columns))
+
+
+async def main(args):
+    module = load_plugin_module()
+    results = []
+    # 插件会在工作目录下写入数据文件（出站队列等），基准测试在临时目录中运行
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            for size in args.sizes:
+                result = await run_size(module, size, args)
+                results.append(result)
+        finally:
+            os.chdir(cwd)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GitHubStarMonitor 基准测试")
+    parser.add_argument("--sizes", default="10,100,1000", type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--cycles", type=int, default=3, help="每个规模运行的检查轮数")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟API延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="模拟API延迟抖动（秒）")
+    parser.add_argument("--rate-limit", type=int, default=0, help="每令牌请求上限，0为不限制")
+    parser.add_argument("--no-etag", action="store_true", help="关闭模拟服务的ETag支持")
+    parser.add_argument("--burst-fraction", type=float, default=0.1, help="每轮发生星标变化的仓库比例")
+    parser.add_argument("--burst-size", type=int, default=3, help="单个仓库每轮最大星标变化量")
+    parser.add_argument("--sessions", type=int, default=2, help="目标会话数量")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="模拟平台发送延迟（秒）")
+    parser.add_argument("--token", default="bench-token", help="传给插件的GitHub Token，留空则走未认证路径")
+    parser.add_argument("--discover", action="store_true", help="使用 org: 自动发现代替逐个配置仓库")
+    parser.add_argument("--concurrency", type=int, default=8, help="插件的 max_concurrent_requests")
+    parser.add_argument("--images", action="store_true", help="启用图片通知（需要安装Chromium）")
+    parser.add_argument("--enrich", action="store_true", help="启用stargazer资料补全（批量GraphQL查询）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
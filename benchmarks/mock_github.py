@@ -0,0 +1,294 @@
+"""本地GitHub API模拟服务，供基准测试使用
+
+模拟仓库数量、响应延迟、ETag/304、速率限制以及星标突增。
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+# 1x1 透明PNG，用作模拟头像
+AVATAR_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+class MockRepo:
+    """单个模拟仓库的状态"""
+
+    def __init__(self, owner: str, name: str, stars: int):
+        self.owner = owner
+        self.name = name
+        self.stars = stars
+        self.start_time = time.time() - stars
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.name}"
+
+    def to_json(self) -> dict:
+        return {
+            "id": abs(hash(self.full_name)) % 10**9,
+            "name": self.name,
+            "full_name": self.full_name,
+            "owner": {"login": self.owner},
+            "private": False,
+            "html_url": f"https://github.com/{self.full_name}",
+            "stargazers_count": self.stars,
+            "watchers_count": self.stars,
+        }
+
+
+class MockGitHub:
+    """模拟的GitHub API服务
+
+    Args:
+        repo_count: 模拟仓库数量
+        latency: 每个请求的模拟延迟（秒）
+        jitter: 延迟的随机抖动（秒）
+        rate_limit: 每个令牌在一个窗口内的请求上限，0 表示不限制
+        rate_window: 速率限制窗口（秒）
+        enable_etag: 是否支持 If-None-Match 条件请求
+        seed: 随机种子，保证多次运行结果可复现
+    """
+
+    def __init__(
+        self,
+        repo_count: int = 10,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit: int = 0,
+        rate_window: int = 3600,
+        enable_etag: bool = True,
+        owner: str = "bench-org",
+        seed: int = 42,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.enable_etag = enable_etag
+        self.owner = owner
+        self.random = random.Random(seed)
+        self.repos: Dict[str, MockRepo] = {}
+        for i in range(repo_count):
+            repo = MockRepo(owner, f"repo-{i:04d}", self.random.randint(50, 5000))
+            self.repos[repo.full_name] = repo
+
+        # 统计信息
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.rate_limited_count = 0
+        self.path_counts: Dict[str, int] = {}
+        self._rate_buckets: Dict[str, List[float]] = {}
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_get("/rate_limit", self.handle_rate_limit)
+        self.app.router.add_get("/repos/{owner}/{repo}", self.handle_repo)
+        self.app.router.add_get("/repos/{owner}/{repo}/stargazers", self.handle_stargazers)
+        self.app.router.add_get("/repos/{owner}/{repo}/events", self.handle_events)
+        self.app.router.add_get("/avatars/{login}", self.handle_avatar)
+        self.app.router.add_get("/orgs/{owner}/repos", self.handle_repo_list)
+        self.app.router.add_get("/users/{owner}/repos", self.handle_repo_list)
+        self.app.router.add_post("/graphql", self.handle_graphql)
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    @property
+    def repo_names(self) -> List[str]:
+        return list(self.repos.keys())
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """启动服务，返回基础URL"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = site._server.sockets
+        actual_port = sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{actual_port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def burst(self, repo_fraction: float = 0.1, size: int = 3, allow_unstar: bool = True) -> Dict[str, int]:
+        """让一部分仓库的星标数发生变化，返回 {仓库: 变化量}"""
+        repos = list(self.repos.values())
+        count = max(1, int(len(repos) * repo_fraction)) if repos else 0
+        changes = {}
+        for repo in self.random.sample(repos, count):
+            delta = self.random.randint(1, size)
+            if allow_unstar and self.random.random() < 0.2:
+                delta = -min(delta, repo.stars)
+            repo.stars += delta
+            if delta:
+                changes[repo.full_name] = delta
+        return changes
+
+    def reset_stats(self):
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.rate_limited_count = 0
+        self.path_counts.clear()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.request_count += 1
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.path_counts[route] = self.path_counts.get(route, 0) + 1
+
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # 与GitHub一致，查询 /rate_limit 不消耗额度
+        if request.path.startswith("/avatars/") or request.path == "/rate_limit":
+            return await handler(request)
+
+        token = request.headers.get("Authorization", "anonymous")
+        limit, remaining, reset = self._consume(token)
+        rate_headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset),
+        }
+        if self.rate_limit and remaining < 0:
+            self.rate_limited_count += 1
+            rate_headers["X-RateLimit-Remaining"] = "0"
+            return web.json_response(
+                {"message": "API rate limit exceeded"}, status=403, headers=rate_headers
+            )
+
+        response = await handler(request)
+        response.headers.update(rate_headers)
+        return response
+
+    def _consume(self, token: str):
+        """按令牌统计请求，返回 (上限, 剩余, 重置时间)"""
+        if not self.rate_limit:
+            return 5000, 5000, int(time.time()) + self.rate_window
+        now = time.time()
+        bucket = self._rate_buckets.setdefault(token, [now, 0])
+        if now - bucket[0] >= self.rate_window:
+            bucket[0], bucket[1] = now, 0
+        bucket[1] += 1
+        return self.rate_limit, self.rate_limit - bucket[1], int(bucket[0] + self.rate_window)
+
+    def _json(self, request: web.Request, payload) -> web.Response:
+        """序列化响应，必要时按ETag返回304"""
+        body = json.dumps(payload).encode("utf-8")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.enable_etag and request.headers.get("If-None-Match") == etag:
+            self.not_modified_count += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        headers = {"ETag": etag} if self.enable_etag else {}
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    def _get_repo(self, request: web.Request) -> Optional[MockRepo]:
+        return self.repos.get(f"{request.match_info['owner']}/{request.match_info['repo']}")
+
+    def _user(self, index: int) -> dict:
+        login = f"stargazer{index}"
+        return {
+            "login": login,
+            "id": index,
+            "avatar_url": f"{self.base_url}/avatars/{login}",
+            "type": "User",
+        }
+
+    async def handle_rate_limit(self, request: web.Request) -> web.Response:
+        token = request.headers.get("Authorization", "anonymous")
+        bucket = self._rate_buckets.get(token)
+        limit = self.rate_limit or 5000
+        used = bucket[1] if bucket and self.rate_limit else 0
+        reset = int((bucket[0] if bucket else time.time()) + self.rate_window)
+        core = {"limit": limit, "remaining": max(0, limit - used), "reset": reset, "used": used}
+        return web.json_response({"resources": {"core": core}, "rate": core})
+
+    async def handle_repo(self, request: web.Request) -> web.Response:
+        repo = self._get_repo(request)
+        if not repo:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return self._json(request, repo.to_json())
+
+    async def handle_stargazers(self, request: web.Request) -> web.Response:
+        repo = self._get_repo(request)
+        if not repo:
+            return web.json_response({"message": "Not Found"}, status=404)
+        per_page = min(100, int(request.query.get("per_page", 30)))
+        page = max(1, int(request.query.get("page", 1)))
+        start = (page - 1) * per_page
+        end = min(repo.stars, start + per_page)
+        star_format = "star+json" in request.headers.get("Accept", "")
+        entries = []
+        for index in range(start, end):
+            user = self._user(index)
+            if star_format:
+                starred_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(repo.start_time + index))
+                entries.append({"starred_at": starred_at, "user": user})
+            else:
+                entries.append(user)
+        return self._json(request, entries)
+
+    async def handle_events(self, request: web.Request) -> web.Response:
+        repo = self._get_repo(request)
+        if not repo:
+            return web.json_response({"message": "Not Found"}, status=404)
+        events = []
+        for index in range(max(0, repo.stars - 5), repo.stars):
+            events.append({
+                "type": "WatchEvent",
+                "actor": self._user(index),
+                "repo": {"name": repo.full_name},
+                "payload": {"action": "started"},
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            })
+        events.reverse()
+        return self._json(request, events)
+
+    async def handle_repo_list(self, request: web.Request) -> web.Response:
+        owner = request.match_info["owner"]
+        per_page = min(100, int(request.query.get("per_page", 30)))
+        page = max(1, int(request.query.get("page", 1)))
+        repos = [repo for repo in self.repos.values() if repo.owner == owner]
+        if not repos:
+            return web.json_response({"message": "Not Found"}, status=404)
+        last_page = max(1, (len(repos) + per_page - 1) // per_page)
+        items = [repo.to_json() for repo in repos[(page - 1) * per_page:page * per_page]]
+        response = self._json(request, items)
+        if last_page > 1:
+            base = f"{self.base_url}{request.path}?per_page={per_page}"
+            links = []
+            if page < last_page:
+                links.append(f'<{base}&page={page + 1}>; rel="next"')
+            links.append(f'<{base}&page={last_page}>; rel="last"')
+            response.headers["Link"] = ", ".join(links)
+        return response
+
+    async def handle_graphql(self, request: web.Request) -> web.Response:
+        """只支持插件的批量用户资料查询：变量 l0、l1... 对应别名 u0、u1..."""
+        body = await request.json()
+        data = {}
+        for name, login in (body.get("variables") or {}).items():
+            index = int(login[len("stargazer"):]) if login.startswith("stargazer") else 0
+            data["u" + name[1:]] = {
+                "login": login,
+                "name": login.title(),
+                "company": "@bench" if index % 7 == 0 else None,
+                "bio": f"Benchmark user {index}",
+                "followers": {"totalCount": index * 3},
+                "repositories": {"totalCount": index % 50},
+                "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - (index % 400) * 86400)),
+            }
+        return web.json_response({"data": data})
+
+    async def handle_avatar(self, request: web.Request) -> web.Response:
+        return web.Response(body=AVATAR_PNG, content_type="image/png")
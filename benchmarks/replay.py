@@ -0,0 +1,411 @@
+"""星标事件回放
+
+把录制的或合成的星标时间线按模拟时钟加速回放给监控插件，GitHub请求层与
+AstrBot的Context都替换为进程内的替身，不需要网络，也不需要等待真实的star。
+每轮检查前把截至当前模拟时间的事件写入替身，统计检测延迟（模拟秒）、
+合并程度（每条通知覆盖的事件数）以及检查、渲染与发送的真实耗时。
+
+用法:
+    python benchmarks/replay.py --scenario hn --duration 7200 --speed 100
+    python benchmarks/replay.py --timeline data/astrbot_plugin_StarMonitor/observations.jsonl
+
+时间线文件为JSON Lines，每行一个事件 ``{"t": 秒, "repo": "owner/repo", "user": "login", "delta": 1}``；
+也可以直接使用 digests 功能记录的 observations.jsonl（每行 ``t/repo/change/users``）。
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from urllib.parse import urlparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+from bench_monitor import FakeContext, instrument, load_plugin_module, percentile  # noqa: E402
+from mock_github import AVATAR_PNG  # noqa: E402
+
+# 模拟时钟的起点（2023-11-14），保证多次回放生成的 starred_at 完全一致
+SIM_EPOCH = 1_700_000_000
+REPLAY_API = "https://replay.invalid"
+
+
+def iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+class StarEvent:
+    """时间线中的一次star（delta=1）或取消star（delta=-1），t 为相对起点的模拟秒数"""
+
+    __slots__ = ("t", "repo", "login", "delta")
+
+    def __init__(self, t: float, repo: str, login: str, delta: int = 1):
+        self.t = t
+        self.repo = repo
+        self.login = login
+        self.delta = delta
+
+
+def load_timeline(path: str) -> List[StarEvent]:
+    """读取事件时间线或 observations.jsonl，时间统一平移为从0开始"""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "user" in record:
+                events.append(StarEvent(record["t"], record["repo"], record["user"], record.get("delta", 1)))
+                continue
+            # observations.jsonl：一条记录是一次检测到的变动，新增用户已知，其余用合成用户名补齐
+            change = record.get("change", 0)
+            users = list(record.get("users", []))
+            for i in range(abs(change)):
+                login = users[i] if i < len(users) else f"replay-{index}-{i}"
+                events.append(StarEvent(record["t"], record["repo"], login, 1 if change > 0 else -1))
+    if events:
+        start = min(event.t for event in events)
+        for event in events:
+            event.t -= start
+    events.sort(key=lambda event: event.t)
+    return events
+
+
+def poisson_times(rng: random.Random, rate_at, start: float, end: float, peak_rate: float) -> List[float]:
+    """非齐次泊松过程（thinning法），rate_at 返回每秒的到达率"""
+    times, t = [], start
+    if peak_rate <= 0:
+        return times
+    while True:
+        t += rng.expovariate(peak_rate)
+        if t >= end:
+            return times
+        if rng.random() < rate_at(t) / peak_rate:
+            times.append(t)
+
+
+def synthetic_hn(
+    repos: List[str],
+    duration: float,
+    seed: int = 42,
+    base_per_hour: float = 6,
+    spike_at: float = 600,
+    peak_per_minute: float = 300,
+    decay_minutes: float = 30,
+    farm_size: int = 0,
+) -> List[StarEvent]:
+    """“上了Hacker News首页”场景
+
+    所有仓库按 base_per_hour 的自然速率涨星；第一个仓库在 spike_at 秒时流量暴涨到
+    每分钟 peak_per_minute 个star，之后按 decay_minutes 指数衰减。farm_size 大于0时
+    在暴涨期间额外注入一批间隔均匀的刷星账号。
+    """
+    rng = random.Random(seed)
+    events = []
+    counter = 0
+    for repo in repos:
+        rate = base_per_hour / 3600
+        for t in poisson_times(rng, lambda _: rate, 0, duration, rate):
+            counter += 1
+            events.append(StarEvent(t, repo, f"user{counter}", -1 if rng.random() < 0.05 else 1))
+    if repos and peak_per_minute > 0:
+        peak = peak_per_minute / 60
+        decay = decay_minutes * 60
+
+        def spike_rate(t: float) -> float:
+            return peak * math.exp(-(t - spike_at) / decay) if t >= spike_at else 0.0
+
+        for t in poisson_times(rng, spike_rate, spike_at, duration, peak):
+            counter += 1
+            events.append(StarEvent(t, repos[0], f"hn{counter}"))
+    if repos:
+        for i in range(farm_size):
+            events.append(StarEvent(spike_at + 120 + i * 0.5, repos[0], f"farm{i}"))
+    events.sort(key=lambda event: event.t)
+    return events
+
+
+class ReplayStore:
+    """替身GitHub的数据：每个仓库按star顺序保存的stargazers与最近的WatchEvent"""
+
+    def __init__(self, repos: List[str], initial_stars: int, seed: int = 42):
+        rng = random.Random(seed)
+        self.stargazers: Dict[str, List[tuple]] = {}
+        self.events: Dict[str, List[dict]] = {}
+        for repo in repos:
+            count = rng.randint(initial_stars // 2, initial_stars)
+            # 初始stargazer的时间均匀分布在起点之前的一年内
+            self.stargazers[repo] = [
+                (f"early{i}", iso(SIM_EPOCH - 365 * 86400 + i * (365 * 86400 // max(1, count)))) for i in range(count)
+            ]
+            self.events[repo] = []
+
+    def apply(self, event: StarEvent):
+        stargazers = self.stargazers.setdefault(event.repo, [])
+        starred_at = iso(SIM_EPOCH + event.t)
+        if event.delta > 0:
+            stargazers.append((event.login, starred_at))
+        else:
+            # 取消star：移除最近一个stargazer（回放不区分具体是谁）
+            if stargazers:
+                stargazers.pop()
+        events = self.events.setdefault(event.repo, [])
+        events.insert(0, {
+            "type": "WatchEvent",
+            "actor": {"login": event.login, "avatar_url": f"{REPLAY_API}/avatars/{event.login}"},
+            "payload": {"action": "started"},
+            "created_at": starred_at,
+        })
+        del events[30:]
+
+
+def profile_for(login: str) -> dict:
+    """按用户名生成确定的用户资料，farm 开头的为新注册的空账号"""
+    digest = int(hashlib.md5(login.encode("utf-8")).hexdigest()[:8], 16)
+    if login.startswith("farm"):
+        return {"login": login, "createdAt": iso(SIM_EPOCH - 3 * 86400), "followers": {"totalCount": 0},
+                "repositories": {"totalCount": 0}}
+    return {
+        "login": login,
+        "name": login.title(),
+        "company": "@replay" if digest % 11 == 0 else None,
+        "bio": None,
+        "createdAt": iso(SIM_EPOCH - (30 + digest % 3000) * 86400),
+        "followers": {"totalCount": digest % 2000 if digest % 13 == 0 else digest % 40},
+        "repositories": {"totalCount": digest % 60},
+    }
+
+
+def make_replay_client(module, store: ReplayStore, latency: float = 0.0):
+    """构造替身请求层：继承插件的GitHubClient，只替换真正发送HTTP请求的 _send
+
+    合并、缓存、重试与熔断逻辑都照常运行。
+    """
+    client_module = sys.modules[module.__name__.rsplit(".", 1)[0] + ".github_client"]
+
+    class ReplayGitHubClient(client_module.GitHubClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.request_counts: Dict[str, int] = {}
+
+        async def _send(self, url, params, accept, etag, auth, token, parse, timeout, method, json_body, transform):
+            if latency:
+                await asyncio.sleep(latency)
+            status, data = self._route(urlparse(url).path, params or {}, accept, method, json_body)
+            if status == 200 and parse == "json" and transform is not None:
+                data = transform(data)
+            return client_module.GitHubResponse(status, {}, data, token)
+
+        def _route(self, path: str, params: dict, accept: str, method: str, json_body):
+            parts = path.strip("/").split("/")
+            kind = parts[0] if parts[0] != "repos" else "repo" if len(parts) < 4 else parts[3]
+            self.request_counts[kind] = self.request_counts.get(kind, 0) + 1
+            if parts[0] == "graphql" and method == "POST":
+                variables = (json_body or {}).get("variables") or {}
+                return 200, {"data": {"u" + name[1:]: profile_for(login) for name, login in variables.items()}}
+            if parts[0] == "avatars":
+                return 200, AVATAR_PNG
+            if parts[0] == "rate_limit":
+                core = {"limit": 5000, "remaining": 5000, "reset": int(time.time()) + 3600, "used": 0}
+                return 200, {"resources": {"core": core}, "rate": core}
+            if parts[0] != "repos" or len(parts) < 3:
+                return 404, {"message": "Not Found"}
+            repo = f"{parts[1]}/{parts[2]}"
+            stargazers = store.stargazers.get(repo)
+            if stargazers is None:
+                return 404, {"message": "Not Found"}
+            if len(parts) == 3:
+                return 200, {"full_name": repo, "stargazers_count": len(stargazers), "private": False}
+            if parts[3] == "stargazers":
+                per_page = min(100, int(params.get("per_page", 30)))
+                page = max(1, int(params.get("page", 1)))
+                chunk = stargazers[(page - 1) * per_page:page * per_page]
+                users = [
+                    {"starred_at": starred_at, "user": {"login": login, "avatar_url": f"{REPLAY_API}/avatars/{login}"}}
+                    for login, starred_at in chunk
+                ]
+                return 200, users if "star+json" in accept else [entry["user"] for entry in users]
+            if parts[3] == "events":
+                return 200, list(store.events.get(repo, []))
+            return 404, {"message": "Not Found"}
+
+    return ReplayGitHubClient
+
+
+class ReplayEngine:
+    """以模拟时钟驱动监控插件：每个检查间隔为一个节拍，按 speed 倍速控制真实耗时"""
+
+    def __init__(self, module, events: List[StarEvent], repos: List[str], args):
+        self.module = module
+        self.events = events
+        self.repos = repos
+        self.args = args
+
+    async def run(self) -> dict:
+        args = self.args
+        store = ReplayStore(self.repos, args.initial_stars, args.seed)
+        context = FakeContext(send_latency=args.send_latency)
+        config = {
+            "repositories": self.repos,
+            "target_sessions": [f"replay:GroupMessage:{i}" for i in range(args.sessions)],
+            "github_token": "replay-token",
+            "check_interval": args.check_interval,
+            "enable_startup_notification": False,
+            "enable_image_notification": args.images,
+            "enable_stargazer_enrichment": args.enrich,
+            "enable_anomaly_detection": args.anomaly,
+            "enable_latency_trace": False,
+            # 模拟时钟比真实时间快，响应缓存会跨节拍复用旧数据，回放时关闭
+            "response_cache_ttl": 0,
+        }
+        monitor = self.module.GitHubStarMonitor(context, config)
+        if monitor.monitoring_task:
+            monitor.monitoring_task.cancel()
+        client_class = make_replay_client(self.module, store, args.latency)
+        await monitor.github.close()
+        monitor.github = client_class(monitor.token_pool, retries=0, cache_ttl=0)
+        monitor.api_base = REPLAY_API
+
+        check_samples: List[float] = []
+        render_samples: List[float] = []
+        notified: List[str] = []
+        instrument(monitor, "render_html_to_image", render_samples)
+        original_notify = monitor.notify_star_change
+
+        async def counting_notify(target_sessions, repo_key, *rest, **kwargs):
+            notified.append(repo_key)
+            return await original_notify(target_sessions, repo_key, *rest, **kwargs)
+
+        monitor.notify_star_change = counting_notify
+
+        detect_latencies: List[float] = []
+        suspicious = 0
+        ticks_over_budget = 0
+        budget = args.check_interval / args.speed
+        real_start = time.perf_counter()
+        try:
+            await monitor.init_star_counts()
+            index = 0
+            tick = 0.0
+            while tick < args.duration:
+                tick += args.check_interval
+                pending = []
+                while index < len(self.events) and self.events[index].t <= tick:
+                    store.apply(self.events[index])
+                    pending.append(self.events[index])
+                    index += 1
+                tick_start = time.perf_counter()
+                before = len(notified)
+                await monitor.check_repositories()
+                await monitor.outbox.drain()
+                elapsed = time.perf_counter() - tick_start
+                check_samples.append(elapsed)
+                notified_repos = set(notified[before:])
+                detect_latencies.extend(tick - event.t for event in pending if event.repo in notified_repos)
+                if elapsed > budget:
+                    ticks_over_budget += 1
+                else:
+                    await asyncio.sleep(budget - elapsed)
+            suspicious = sum(1 for _, chain in context.sent if "疑似刷星" in str(getattr(chain, "chain", chain)))
+        finally:
+            await monitor.terminate()
+        real_duration = time.perf_counter() - real_start
+
+        return {
+            "events": len(self.events),
+            "ticks": len(check_samples),
+            "notifications": len(notified),
+            "events_per_notification": len(self.events) / len(notified) if notified else 0.0,
+            "messages": len(context.sent),
+            "suspicious_messages": suspicious,
+            "requests": sum(monitor.github.request_counts.values()),
+            "request_counts": monitor.github.request_counts,
+            "detect_p50_s": percentile(detect_latencies, 50),
+            "detect_p99_s": percentile(detect_latencies, 99),
+            "check_p50_ms": percentile(check_samples, 50) * 1000,
+            "check_p99_ms": percentile(check_samples, 99) * 1000,
+            "render_p50_ms": percentile(render_samples, 50) * 1000,
+            "render_p99_ms": percentile(render_samples, 99) * 1000,
+            "deliver_p50_ms": percentile(context.send_durations, 50) * 1000,
+            "deliver_p99_ms": percentile(context.send_durations, 99) * 1000,
+            "ticks_over_budget": ticks_over_budget,
+            "real_duration_s": real_duration,
+            "effective_speed": args.duration / real_duration if real_duration else 0.0,
+        }
+
+
+def print_report(result: dict):
+    print(f"事件数: {result['events']}  节拍数: {result['ticks']}  通知数: {result['notifications']}"
+          f"（平均每条覆盖 {result['events_per_notification']:.1f} 个事件）  发送消息: {result['messages']}")
+    print(f"GitHub请求: {result['requests']} {result['request_counts']}")
+    print(f"检测延迟（模拟秒）    p50 {result['detect_p50_s']:.1f}  p99 {result['detect_p99_s']:.1f}")
+    print(f"单轮检查（真实毫秒）  p50 {result['check_p50_ms']:.1f}  p99 {result['check_p99_ms']:.1f}")
+    print(f"图片渲染（真实毫秒）  p50 {result['render_p50_ms']:.1f}  p99 {result['render_p99_ms']:.1f}")
+    print(f"消息发送（真实毫秒）  p50 {result['deliver_p50_ms']:.1f}  p99 {result['deliver_p99_ms']:.1f}")
+    if result["suspicious_messages"]:
+        print(f"标记为疑似刷星的消息: {result['suspicious_messages']}")
+    print(f"超出节拍预算的检查: {result['ticks_over_budget']}  实际倍速: {result['effective_speed']:.0f}x")
+
+
+async def main(args):
+    module = load_plugin_module()
+    if args.timeline:
+        events = load_timeline(args.timeline)
+        repos = sorted({event.repo for event in events})
+        if not args.duration_set:
+            args.duration = (events[-1].t if events else 0) + args.check_interval
+    else:
+        repos = [f"replay-org/repo-{i:03d}" for i in range(args.repos)]
+        events = synthetic_hn(
+            repos, args.duration, args.seed,
+            base_per_hour=args.base_rate, spike_at=args.spike_at,
+            peak_per_minute=args.peak, decay_minutes=args.decay, farm_size=args.farm,
+        )
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            result = await ReplayEngine(module, events, repos, args).run()
+        finally:
+            os.chdir(cwd)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GitHubStarMonitor 星标事件回放")
+    parser.add_argument("--timeline", help="时间线文件（JSON Lines），不指定时使用合成场景")
+    parser.add_argument("--scenario", default="hn", choices=["hn"], help="合成场景")
+    parser.add_argument("--repos", type=int, default=20, help="合成场景的仓库数")
+    parser.add_argument("--duration", type=float, default=7200, help="回放的模拟时长（秒）")
+    parser.add_argument("--speed", type=float, default=100, help="模拟时钟相对真实时间的倍速")
+    parser.add_argument("--check-interval", type=int, default=60, help="插件的检查间隔（模拟秒）")
+    parser.add_argument("--base-rate", type=float, default=6, help="每个仓库的自然涨星速率（每小时）")
+    parser.add_argument("--spike-at", type=float, default=600, help="暴涨开始的模拟时间（秒）")
+    parser.add_argument("--peak", type=float, default=300, help="暴涨峰值（每分钟star数）")
+    parser.add_argument("--decay", type=float, default=30, help="暴涨的衰减时间常数（分钟）")
+    parser.add_argument("--farm", type=int, default=0, help="暴涨期间注入的刷星账号数")
+    parser.add_argument("--initial-stars", type=int, default=2000, help="每个仓库的初始星标数上限")
+    parser.add_argument("--sessions", type=int, default=2, help="目标会话数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身GitHub每个请求的真实延迟（秒）")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="模拟平台发送延迟（秒）")
+    parser.add_argument("--images", action="store_true", help="启用图片通知（需要安装Chromium）")
+    parser.add_argument("--enrich", action="store_true", help="启用stargazer资料补全")
+    parser.add_argument("--anomaly", action="store_true", help="启用刷星检测（需要NumPy）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args(argv)
+    args.duration_set = any(arg.startswith("--duration") for arg in (argv if argv is not None else sys.argv[1:]))
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,294 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from astrbot.api import logger
+
+PERIODS = {"daily": 86400, "weekly": 7 * 86400}
+PERIOD_NAMES = {"daily": "日报", "weekly": "周报"}
+
+
+class DigestSchedule:
+    """一个会话的定时汇总：周期、发送时间，以及是否只接收汇总"""
+
+    __slots__ = ("session", "period", "hour", "minute", "digest_only")
+
+    def __init__(self, session: str, period: str, hour: int = 9, minute: int = 0, digest_only: bool = False):
+        self.session = session
+        self.period = period
+        self.hour = hour
+        self.minute = minute
+        self.digest_only = digest_only
+
+    @property
+    def key(self) -> str:
+        return f"{self.session}|{self.period}"
+
+    def last_due(self, now: datetime) -> datetime:
+        """不晚于 now 的最近一次发送时间（本地时间，周报固定在周一）"""
+        due = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if self.period == "weekly":
+            due -= timedelta(days=due.weekday())
+            if due > now:
+                due -= timedelta(days=7)
+        elif due > now:
+            due -= timedelta(days=1)
+        return due
+
+
+def parse_digest(line: str) -> Optional[DigestSchedule]:
+    """解析一行汇总配置
+
+    格式为 ``会话|daily或weekly|HH:MM|only``，时间省略时为09:00；
+    第四段为 ``only`` 时该会话不再接收逐条的星标变动通知。
+    """
+    parts = [part.strip() for part in line.split("|")]
+    if len(parts) < 2 or not parts[0] or parts[1].lower() not in PERIODS:
+        return None
+    hour, minute = 9, 0
+    if len(parts) >= 3 and parts[2]:
+        try:
+            hour, minute = (int(value) for value in parts[2].split(":", 1))
+        except ValueError:
+            return None
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            return None
+    digest_only = len(parts) >= 4 and parts[3].lower() == "only"
+    return DigestSchedule(parts[0], parts[1].lower(), hour, minute, digest_only)
+
+
+def parse_digests(lines: Iterable[str]) -> List[DigestSchedule]:
+    schedules = []
+    for line in lines or []:
+        if not line or not line.strip():
+            continue
+        schedule = parse_digest(line)
+        if schedule is None:
+            logger.warning(f"GitHub Star Monitor: 无效的汇总配置: {line}")
+            continue
+        schedules.append(schedule)
+    return schedules
+
+
+class RepoDigest:
+    """一个仓库在统计周期内的累计变动"""
+
+    __slots__ = ("repo", "gained", "lost", "stars", "stargazers", "notable")
+
+    def __init__(self, repo: str):
+        self.repo = repo
+        self.gained = 0
+        self.lost = 0
+        self.stars = 0
+        # 用户名 -> 最近一次star的时间
+        self.stargazers: Dict[str, float] = {}
+        # 资料补全时被标记为知名用户的stargazer
+        self.notable: set = set()
+
+    @property
+    def net(self) -> int:
+        return self.gained - self.lost
+
+
+class DigestReport:
+    """发送给一个会话的汇总内容"""
+
+    __slots__ = ("period", "since", "until", "total_new", "total_lost", "repo_count", "top_repos", "notable")
+
+    def __init__(self, period: str, since: float, until: float):
+        self.period = period
+        self.since = since
+        self.until = until
+        self.total_new = 0
+        self.total_lost = 0
+        self.repo_count = 0
+        # (仓库, 净增, 当前星标数)
+        self.top_repos: List[Tuple[str, int, int]] = []
+        # (用户名, 本周期star过的仓库数, 是否知名用户)
+        self.notable: List[Tuple[str, int, bool]] = []
+
+    @property
+    def title(self) -> str:
+        return f"GitHub星标{PERIOD_NAMES.get(self.period, '汇总')}"
+
+    @property
+    def period_text(self) -> str:
+        fmt = "%m-%d %H:%M"
+        return f"{datetime.fromtimestamp(self.since).strftime(fmt)} ~ {datetime.fromtimestamp(self.until).strftime(fmt)}"
+
+
+def build_report(
+    period: str,
+    since: float,
+    until: float,
+    stats: Dict[str, RepoDigest],
+    include: Callable[[str], bool],
+    top: int = 10,
+    notable: int = 5,
+) -> DigestReport:
+    """从一次聚合的结果中挑出某个会话关心的仓库，生成排行榜"""
+    report = DigestReport(period, since, until)
+    repos = [digest for repo, digest in stats.items() if include(repo)]
+    users: Dict[str, list] = {}
+    for digest in repos:
+        report.total_new += digest.gained
+        report.total_lost += digest.lost
+        for login, starred_at in digest.stargazers.items():
+            entry = users.setdefault(login, [0, 0.0, False])
+            entry[0] += 1
+            entry[1] = max(entry[1], starred_at)
+            entry[2] = entry[2] or login in digest.notable
+    report.repo_count = len(repos)
+    repos.sort(key=lambda digest: (digest.net, digest.gained), reverse=True)
+    report.top_repos = [(digest.repo, digest.net, digest.stars) for digest in repos[:top] if digest.net > 0]
+    # 知名用户与同一周期内star了多个被监控仓库的用户排在前面，其次按时间由近到远
+    ranked = sorted(users.items(), key=lambda item: (item[1][2], item[1][0], item[1][1]), reverse=True)
+    report.notable = [(login, entry[0], entry[2]) for login, entry in ranked[:notable]]
+    return report
+
+
+class ObservationLog:
+    """本地记录的星标变动观测，用于生成汇总
+
+    每次检测到变动追加一行JSON，超过保留期的记录每天压缩一次。
+    汇总时只顺序读取一遍文件，按仓库累加。读写文件都是阻塞操作，
+    由调用方放到线程中执行，追加与压缩之间用锁互斥。
+    """
+
+    def __init__(self, path: str, retention: float = 8 * 86400):
+        self.path = path
+        self.retention = retention
+        self.compacted_at = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, repo_key: str, change: int, stars: int, users: Iterable = ()):
+        record = {
+            "t": round(time.time(), 3),
+            "repo": repo_key,
+            "change": change,
+            "stars": stars,
+            "users": [user.login for user in users] if change > 0 else [],
+        }
+        notable = [user.login for user in users if change > 0 and user.notable]
+        if notable:
+            record["notable"] = notable
+        try:
+            with self._lock:
+                self._append(record)
+                if time.time() - self.compacted_at > 86400:
+                    self._compact()
+        except Exception as e:
+            logger.warning(f"GitHub Star Monitor: 写入星标观测记录失败: {e}")
+
+    def _append(self, record: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _compact(self):
+        """删除超过保留期的记录"""
+        cutoff = time.time() - self.retention
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = [line for line in f if self._timestamp(line) >= cutoff]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.path)
+        self.compacted_at = time.time()
+
+    @staticmethod
+    def _timestamp(line: str) -> float:
+        try:
+            return json.loads(line).get("t", 0)
+        except ValueError:
+            return 0
+
+    def records(self, since: float, until: float = float("inf")) -> Iterator[dict]:
+        """按写入顺序读出 [since, until) 内的记录"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since <= record.get("t", 0) < until:
+                    yield record
+
+    def aggregate(self, since: float, until: float) -> Dict[str, RepoDigest]:
+        """一次遍历统计 [since, until) 内每个仓库的增减与star用户"""
+        stats: Dict[str, RepoDigest] = {}
+        for record in self.records(since, until):
+            digest = stats.get(record["repo"])
+            if digest is None:
+                digest = stats[record["repo"]] = RepoDigest(record["repo"])
+            change = record.get("change", 0)
+            if change > 0:
+                digest.gained += change
+            else:
+                digest.lost -= change
+            digest.stars = record.get("stars", digest.stars)
+            for login in record.get("users", ()):
+                digest.stargazers[login] = record["t"]
+            digest.notable.update(record.get("notable", ()))
+        return stats
+
+
+class SharedObservationLog(ObservationLog):
+    """分片模式下各实例共用的观测记录，保存在分片协调的SQLite文件中
+
+    每个实例只观测自己负责的仓库，汇总时需要读取所有实例写入的记录。
+    """
+
+    def __init__(self, path: str, retention: float = 8 * 86400):
+        super().__init__(path, retention)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS observations ("
+                "t REAL NOT NULL, repo TEXT NOT NULL, change INTEGER NOT NULL, stars INTEGER, users TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS observations_t ON observations (t)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _append(self, record: dict):
+        users = {key: record[key] for key in ("users", "notable") if record.get(key)}
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO observations (t, repo, change, stars, users) VALUES (?, ?, ?, ?, ?)",
+                (record["t"], record["repo"], record["change"], record["stars"], json.dumps(users, ensure_ascii=False)),
+            )
+        finally:
+            conn.close()
+
+    def _compact(self):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM observations WHERE t < ?", (time.time() - self.retention,))
+        finally:
+            conn.close()
+        self.compacted_at = time.time()
+
+    def records(self, since: float, until: float = float("inf")) -> Iterator[dict]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT t, repo, change, stars, users FROM observations WHERE t >= ? AND t < ? ORDER BY t, rowid",
+                (since, min(until, 1e18)),
+            ).fetchall()
+        finally:
+            conn.close()
+        for t, repo, change, stars, users in rows:
+            record = {"t": t, "repo": repo, "change": change, "stars": stars, "users": []}
+            record.update(json.loads(users or "{}"))
+            yield record
@@ -0,0 +1,62 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# repositories 中支持的自动发现前缀 -> GitHub API 路径
+DISCOVERY_KINDS = {
+    "org": "orgs",
+    "user": "users",
+}
+
+_LAST_PAGE_RE = re.compile(r'[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+
+def parse_discovery_entry(entry: str) -> Optional[Tuple[str, str]]:
+    """解析 ``org:name`` / ``user:name`` 形式的配置项，返回 (类型, 名称)"""
+    if not entry or ":" not in entry:
+        return None
+    kind, _, name = entry.strip().partition(":")
+    kind = kind.strip().lower()
+    name = name.strip().strip("/")
+    if kind not in DISCOVERY_KINDS or not name or "/" in name:
+        return None
+    return kind, name
+
+
+def parse_last_page(link_header: Optional[str]) -> Optional[int]:
+    """从 Link 响应头中解析最后一页的页码"""
+    if not link_header:
+        return None
+    match = _LAST_PAGE_RE.search(link_header)
+    return int(match.group(1)) if match else None
+
+
+class DiscoverySource:
+    """一个自动发现来源（组织或用户）的增量状态
+
+    每一页都缓存 ETag 与解析结果，刷新时带上 If-None-Match，
+    未变化的页返回304，不消耗API额度。
+    """
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        # 页码 -> (ETag, [(仓库, 星标数)])
+        self.pages: Dict[int, Tuple[str, List[Tuple[str, int]]]] = {}
+        self.last_page = 1
+        self.repos: Dict[str, int] = {}
+        self.refreshed_at = 0.0
+
+    @property
+    def entry(self) -> str:
+        return f"{self.kind}:{self.name}"
+
+    @property
+    def path(self) -> str:
+        return f"/{DISCOVERY_KINDS[self.kind]}/{self.name}/repos"
+
+    @property
+    def params(self) -> dict:
+        # 组织需要显式指定只列出公开仓库，用户接口默认只返回其拥有的公开仓库
+        if self.kind == "org":
+            return {"type": "public", "per_page": 100}
+        return {"type": "owner", "per_page": 100}
@@ -0,0 +1,329 @@
+import asyncio
+import copy
+import random
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import aiohttp
+from astrbot.api import logger
+
+from .token_pool import TokenPool
+
+DEFAULT_ACCEPT = 'application/vnd.github.v3+json'
+
+# 各类接口的超时时间（秒），列表类接口返回的数据量较大，给予更长的时间
+ENDPOINT_TIMEOUTS = {
+    "repo": 8,
+    "stargazers": 15,
+    "events": 10,
+    "repo_list": 15,
+    "rate_limit": 5,
+    "avatar": 10,
+    "graphql": 15,
+}
+DEFAULT_TIMEOUT = 10
+
+
+class GitHubResponse:
+    """请求结果：状态码、响应头与已解析的响应体"""
+
+    __slots__ = ("status", "headers", "data", "token")
+
+    def __init__(self, status: int, headers, data: Any, token: Optional[str]):
+        self.status = status
+        self.headers = headers
+        self.data = data
+        self.token = token
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+    def copy(self) -> "GitHubResponse":
+        """复制一份响应，响应体深拷贝，调用方原地修改（如补全stargazer资料）不会互相影响"""
+        return GitHubResponse(self.status, self.headers, copy.deepcopy(self.data), self.token)
+
+
+class CircuitBreaker:
+    """GitHub服务降级时的熔断器
+
+    连续失败（5xx、超时、连接错误）达到阈值后熔断，冷却期内拒绝所有请求；
+    冷却结束后放行一次试探请求，成功则恢复，失败则重新熔断。
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 120.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.threshold > 0 and self.failures >= self.threshold and time.time() - self.opened_at < self.cooldown
+
+    def allow(self) -> bool:
+        if self.threshold <= 0 or self.failures < self.threshold:
+            return True
+        if time.time() - self.opened_at < self.cooldown:
+            return False
+        # 半开状态：同一时间只放行一个试探请求
+        if self.trial_in_flight:
+            return False
+        self.trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.trial_in_flight = False
+        self.failures += 1
+        if self.threshold > 0 and self.failures >= self.threshold:
+            if self.failures == self.threshold or time.time() - self.opened_at >= self.cooldown:
+                logger.warning(f"GitHub Star Monitor: GitHub请求连续失败 {self.failures} 次，暂停请求 {self.cooldown:.0f} 秒")
+            self.opened_at = time.time()
+
+    @property
+    def remaining_cooldown(self) -> float:
+        return max(0.0, self.cooldown - (time.time() - self.opened_at)) if self.is_open else 0.0
+
+
+class RetryableError(Exception):
+    """可重试的失败（5xx、超时、连接错误）"""
+
+
+class GitHubClient:
+    """统一的GitHub请求层
+
+    所有GitHub请求都经过这里：复用同一个连接池，从Token池挑选Token并记录额度，
+    按接口设置超时，对5xx与超时做带抖动的指数退避重试，可选对冲请求降低尾延迟，
+    并在GitHub服务降级时熔断。相同的并发GET请求共享同一个进行中的请求，
+    结果在 cache_ttl 秒内直接复用，命令与后台轮询同时查询同一仓库时只请求一次。
+    共享或缓存的结果返回给每个调用方的都是各自的副本。
+    """
+
+    def __init__(
+        self,
+        token_pool: TokenPool,
+        retries: int = 2,
+        backoff: float = 0.5,
+        hedge_delay: float = 0.0,
+        breaker: Optional[CircuitBreaker] = None,
+        cache_ttl: float = 5.0,
+    ):
+        self.token_pool = token_pool
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.header_cache: Dict[tuple, dict] = {}
+        # 短时响应缓存与进行中的请求，相同的并发请求只发一次
+        self.cache_ttl = cache_ttl
+        self.cache_limit = 2048
+        self._cache: Dict[tuple, Tuple[float, GitHubResponse]] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def set_token_pool(self, token_pool: TokenPool):
+        self.token_pool = token_pool
+        self.header_cache.clear()
+        self._cache.clear()
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def build_headers(self, accept: str, github_token: Optional[str]) -> dict:
+        cache_key = (accept, github_token)
+        headers = self.header_cache.get(cache_key)
+        if headers is None:
+            headers = {
+                'User-Agent': 'AstrBot-GitHub-Star-Monitor/1.0.0',
+                'Accept': accept
+            }
+            if github_token:
+                headers['Authorization'] = f'Bearer {github_token}'
+            self.header_cache[cache_key] = headers
+        return headers
+
+    def record_rate_limit(self, github_token: Optional[str], status: int, headers) -> None:
+        """根据响应更新Token额度，401时隔离该Token"""
+        self.token_pool.update(github_token, headers)
+        if status == 401 and github_token:
+            self.token_pool.quarantine(github_token)
+            state = self.token_pool.states[github_token]
+            logger.error(f"GitHub Star Monitor: GitHub Token {state.masked} 无效或已过期，已隔离")
+
+    async def request(
+        self,
+        url: str,
+        endpoint: str = "",
+        params: Optional[dict] = None,
+        accept: str = DEFAULT_ACCEPT,
+        etag: Optional[str] = None,
+        auth: bool = True,
+        token: Optional[str] = None,
+        parse: str = "json",
+        method: str = "GET",
+        json_body: Any = None,
+        transform: Optional[Callable[[Any], Any]] = None,
+    ) -> Optional[GitHubResponse]:
+        """发起请求，网络层面彻底失败或熔断时返回None
+
+        Args:
+            endpoint: 接口类型，决定超时时间
+            etag: 上次响应的ETag，用于条件请求
+            auth: 是否携带Token
+            token: 指定使用的Token，不指定时从Token池挑选
+            parse: 响应体解析方式，json 或 bytes
+            transform: 对解析后的响应体做转换，只保留需要的字段，原始JSON随请求结束释放
+        """
+        # 指定Token的请求（如查询各Token额度）结果因Token而异，不参与合并与缓存
+        if method != "GET" or token is not None:
+            return await self._fetch(url, endpoint, params, accept, etag, auth, token, parse, method, json_body, transform)
+
+        key = (url, tuple(sorted(params.items())) if params else (), accept, etag, auth, parse, transform)
+        cached = self._cache.get(key)
+        if cached is not None:
+            if cached[0] > time.time():
+                return cached[1].copy()
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._fetch(url, endpoint, params, accept, etag, auth, None, parse, method, json_body, transform)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._complete(key, t))
+        # shield：某个调用方被取消时不影响共享同一请求的其他调用方
+        response = await asyncio.shield(task)
+        return response.copy() if response is not None else None
+
+    def _complete(self, key: tuple, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        response = task.result()
+        if self.cache_ttl <= 0 or response is None or response.status not in (200, 304, 404):
+            return
+        if len(self._cache) >= self.cache_limit:
+            now = time.time()
+            for expired in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+                del self._cache[expired]
+            if len(self._cache) >= self.cache_limit:
+                self._cache.clear()
+        self._cache[key] = (time.time() + self.cache_ttl, response)
+
+    async def _fetch(self, url, endpoint, params, accept, etag, auth, token, parse, method, json_body, transform) -> Optional[GitHubResponse]:
+        if not self.breaker.allow():
+            logger.debug(f"GitHub Star Monitor: 熔断中，跳过请求 {url}")
+            return None
+
+        # 半开状态下本次请求就是试探请求，无论以何种方式结束都要释放
+        trial = self.breaker.trial_in_flight
+        timeout = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        last_error = None
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    # 带抖动的指数退避，避免所有请求同时重试
+                    await asyncio.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+                try:
+                    call = lambda: self._send(url, params, accept, etag, auth, token, parse, timeout, method, json_body, transform)
+                    if self.hedge_delay > 0 and method == "GET":
+                        response = await self._hedged(call)
+                    else:
+                        response = await call()
+                    self.breaker.record_success()
+                    return response
+                except RetryableError as e:
+                    last_error = e
+                except asyncio.TimeoutError:
+                    last_error = "请求超时"
+                except aiohttp.ClientError as e:
+                    last_error = e
+        except Exception:
+            # 响应体无法解析、transform 出错等非网络错误同样计为一次失败
+            self.breaker.record_failure()
+            raise
+        finally:
+            if trial:
+                self.breaker.trial_in_flight = False
+        self.breaker.record_failure()
+        logger.warning(f"GitHub Star Monitor: 请求 {url} 失败（已重试 {self.retries} 次）: {last_error}")
+        return None
+
+    async def _send(self, url, params, accept, etag, auth, token, parse, timeout, method, json_body, transform) -> GitHubResponse:
+        reserved = auth and token is None
+        github_token = (token or self.token_pool.acquire()) if auth else None
+        headers = self.build_headers(accept, github_token)
+        if etag:
+            headers = dict(headers, **{'If-None-Match': etag})
+        session = self._get_session()
+        try:
+            async with session.request(
+                method, url, headers=headers, params=params, json=json_body,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                if auth:
+                    self.record_rate_limit(github_token, response.status, response.headers)
+                if response.status >= 500:
+                    raise RetryableError(f"状态码 {response.status}")
+                data = None
+                if response.status == 200:
+                    if parse == "bytes":
+                        data = await response.read()
+                    else:
+                        data = await response.json(content_type=None)
+                    if transform is not None:
+                        data = transform(data)
+                return GitHubResponse(response.status, response.headers, data, github_token)
+        finally:
+            if reserved:
+                self.token_pool.release(github_token)
+
+    async def _hedged(self, call) -> GitHubResponse:
+        """对冲请求：首个请求在 hedge_delay 内未完成时再发一个，取先成功的结果"""
+        first = asyncio.ensure_future(call())
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+        second = asyncio.ensure_future(call())
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def describe_failure(response: Optional[GitHubResponse], subject: str) -> str:
+        """把失败的响应转换为日志文案"""
+        if response is None:
+            return f"{subject}: 网络请求失败"
+        if response.status == 401:
+            return f"{subject}: GitHub Token无效或已过期"
+        if response.status == 403:
+            if response.headers.get('X-RateLimit-Remaining') == '0':
+                reset = response.headers.get('X-RateLimit-Reset', 'unknown')
+                return f"{subject}: GitHub API限制已耗尽，重置时间: {reset}"
+            return f"{subject}: GitHub API返回403，可能是权限不足"
+        if response.status == 404:
+            return f"{subject}: 不存在或无法访问"
+        return f"{subject}: GitHub API 返回状态码 {response.status}"
@@ -0,0 +1,777 @@
+"""通知卡片的HTML模板
+
+模板体积较大且只在生成图片时使用，由 main 在首次渲染时按需导入。
+"""
+import html
+from typing import List, Optional, Tuple
+
+
+def star_notification_html(
+    repo_key: str, change: int, current_stars: int, users: List[Tuple[str, str, str, bool]], warning: str = ""
+) -> str:
+    """星标变动通知卡片，users 为 (用户名, 头像data URI, 资料简介, 是否知名用户) 列表，warning 为刷星提示"""
+    users_html = ""
+    for username, avatar_base64, detail, notable in users:
+        users_html += f"""
+                    <div class="user-item">
+                        <div class="avatar-container">
+                            <img class="avatar" src="{avatar_base64 or 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNTAiIGhlaWdodD0iNTAiIHZpZXdCb3g9IjAgMCA1MCA1MCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPGNpcmNsZSBjeD0iMjUiIGN5PSIyNSIgcj0iMjUiIGZpbGw9IiNEREREREQiLz4KPHN2ZyB4PSIxNSIgeT0iMTUiIHdpZHRoPSIyMCIgaGVpZ2h0PSIyMCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSIjOTk5OTk5Ij4KPHA+VXNlcjwvcD4KPHN2Zz4KPC9zdmc+'}" alt="avatar" />
+                        </div>
+                        <div class="user-info">
+                            <div class="username">@{username}{' <span class="notable-badge">🏅 知名用户</span>' if notable else ''}</div>
+                            {f'<div class="user-detail">{html.escape(detail)}</div>' if detail else ''}
+                        </div>
+                    </div>
+                    """
+
+    return f"""
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <meta charset="UTF-8">
+                <style>
+                    body {{
+                        margin: 0;
+                        padding: 40px;
+                        font-family: 'Microsoft YaHei', 'Helvetica Neue', Arial, sans-serif;
+                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                        min-height: 520px;
+                        box-sizing: border-box;
+                    }}
+                    .container {{
+                        background: white;
+                        border-radius: 20px;
+                        padding: 40px;
+                        box-shadow: 0 20px 60px rgba(0,0,0,0.1);
+                        max-width: 720px;
+                        margin: 0 auto;
+                    }}
+                    .title {{
+                        font-size: 32px;
+                        font-weight: bold;
+                        text-align: center;
+                        color: #2c3e50;
+                        margin-bottom: 30px;
+                        display: flex;
+                        align-items: center;
+                        justify-content: center;
+                        gap: 10px;
+                    }}
+                    .repo-info {{
+                        background: #f8f9fa;
+                        border-radius: 12px;
+                        padding: 20px;
+                        margin-bottom: 25px;
+                        border-left: 4px solid #667eea;
+                    }}
+                    .repo-name {{
+                        font-size: 24px;
+                        font-weight: bold;
+                        color: #2c3e50;
+                        margin-bottom: 10px;
+                    }}
+                    .stats {{
+                        display: flex;
+                        gap: 30px;
+                        align-items: center;
+                    }}
+                    .stat-item {{
+                        display: flex;
+                        align-items: center;
+                        gap: 8px;
+                    }}
+                    .change {{
+                        font-size: 20px;
+                        font-weight: bold;
+                        color: {'#27ae60' if change > 0 else '#e74c3c'};
+                    }}
+                    .current-stars {{
+                        font-size: 20px;
+                        color: #2c3e50;
+                    }}
+                    .users-section {{
+                        margin-top: 30px;
+                    }}
+                    .users-title {{
+                        font-size: 20px;
+                        font-weight: bold;
+                        color: #2c3e50;
+                        margin-bottom: 20px;
+                    }}
+                    .user-item {{
+                        display: flex;
+                        align-items: center;
+                        gap: 15px;
+                        padding: 15px;
+                        background: #f8f9fa;
+                        border-radius: 12px;
+                        margin-bottom: 12px;
+                        transition: transform 0.2s;
+                    }}
+                    .user-item:hover {{
+                        transform: translateX(5px);
+                    }}
+                    .avatar-container {{
+                        flex-shrink: 0;
+                    }}
+                    .avatar {{
+                        width: 50px;
+                        height: 50px;
+                        border-radius: 50%;
+                        border: 3px solid #667eea;
+                        object-fit: cover;
+                    }}
+                    .user-info {{
+                        flex: 1;
+                    }}
+                    .username {{                        font-size: 16px;
+                        font-weight: 600;
+                        color: #2c3e50;
+                        margin-bottom: 4px;
+                    }}
+                    .warning {{
+                        background: #fdf2e9;
+                        border-left: 4px solid #e67e22;
+                        border-radius: 12px;
+                        padding: 14px 20px;
+                        margin-bottom: 25px;
+                        color: #a04000;
+                        font-weight: 600;
+                    }}
+                    .notable-badge {{
+                        font-size: 13px;
+                        color: #f39c12;
+                        margin-left: 6px;
+                    }}
+                    .user-detail {{
+                        font-size: 13px;
+                        color: #7f8c8d;
+                    }}
+                    .star-icon {{
+                        color: #f39c12;
+                        font-size: 24px;
+                    }}
+                    .trend-icon {{
+                        font-size: 18px;
+                    }}
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <div class="title">
+                        <span class="star-icon">🌟</span>
+                        GitHub 星标变动提醒
+                    </div>
+                    
+                    <div class="repo-info">
+                        <div class="repo-name">{repo_key}</div>
+                        <div class="stats">
+                            <div class="stat-item">
+                                <span class="trend-icon">{'📈' if change > 0 else '📉'}</span>
+                                <span class="change">{'+' if change > 0 else ''}{change}</span>
+                            </div>
+                            <div class="stat-item">
+                                <span>⭐</span>
+                                <span class="current-stars">{current_stars} stars</span>
+                            </div>
+                        </div>
+                    </div>
+                    
+                    {f'<div class="warning">⚠️ {html.escape(warning)}</div>' if warning else ''}
+                    
+                    {f'''
+                    <div class="users-section">
+                        <div class="users-title">👤 导致此次变动的用户</div>                        {users_html}
+                    </div>
+                    ''' if users_html else ''}
+                </div>
+            </body>
+            </html>
+            """
+
+
+def milestone_html(repo_key: str, current_stars: int, user: Optional[Tuple[str, str]]) -> str:
+    """1万star里程碑庆祝卡片，user 为第1万个star用户的 (用户名, 头像data URI)"""
+    milestone_user_html = ""
+    if user:
+        username, avatar_base64 = user
+        milestone_user_html = f"""
+                <div class="milestone-user">
+                    <div class="milestone-avatar-container">
+                        <img class="milestone-avatar" src="{avatar_base64 or 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iODAiIGhlaWdodD0iODAiIHZpZXdCb3g9IjAgMCA4MCA4MCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPGNpcmNsZSBjeD0iNDAiIGN5PSI0MCIgcj0iNDAiIGZpbGw9IiNEREREREQiLz4KPHN2ZyB4PSIyNSIgeT0iMjUiIHdpZHRoPSIzMCIgaGVpZ2h0PSIzMCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSIjOTk5OTk5Ij4KPHA+VXNlcjwvcD4KPHN2Zz4KPC9zdmc+'}" alt="milestone user avatar" />
+                        <div class="crown">👑</div>
+                    </div>
+                    <div class="milestone-user-info">
+                        <div class="milestone-username">@{username}</div>
+                        <div class="milestone-label">第10,000个Star！</div>
+                    </div>
+                </div>
+                """
+
+    return f"""
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <meta charset="UTF-8">
+                <style>
+                    @import url('https://fonts.googleapis.com/css2?family=Fredoka+One:wght@400&display=swap');
+                    
+                    body {{
+                        margin: 0;
+                        padding: 40px;
+                        font-family: 'Microsoft YaHei', 'Helvetica Neue', Arial, sans-serif;
+                        background: linear-gradient(135deg, #ff6b6b 0%, #ffd93d 25%, #6bcf7f 50%, #4d79ff 75%, #ff6b6b 100%);
+                        background-size: 400% 400%;
+                        animation: celebration-bg 4s ease infinite;
+                        min-height: 600px;
+                        box-sizing: border-box;
+                        position: relative;
+                    }}
+                    
+                    @keyframes celebration-bg {{
+                        0% {{ background-position: 0% 50%; }}
+                        50% {{ background-position: 100% 50%; }}
+                        100% {{ background-position: 0% 50%; }}
+                    }}
+                    
+                    .fireworks {{
+                        position: absolute;
+                        top: 0;
+                        left: 0;
+                        width: 100%;
+                        height: 100%;
+                        pointer-events: none;
+                        overflow: hidden;
+                    }}
+                    
+                    .firework {{
+                        position: absolute;
+                        width: 4px;
+                        height: 4px;
+                        border-radius: 50%;
+                        animation: firework-explode 2s ease-out infinite;
+                    }}
+                    
+                    .firework:nth-child(1) {{ top: 20%; left: 15%; background: #ff6b6b; animation-delay: 0s; }}
+                    .firework:nth-child(2) {{ top: 30%; left: 85%; background: #ffd93d; animation-delay: 0.5s; }}
+                    .firework:nth-child(3) {{ top: 60%; left: 25%; background: #6bcf7f; animation-delay: 1s; }}
+                    .firework:nth-child(4) {{ top: 50%; left: 75%; background: #4d79ff; animation-delay: 1.5s; }}
+                    
+                    @keyframes firework-explode {{
+                        0% {{ transform: scale(0); opacity: 1; }}
+                        50% {{ transform: scale(20); opacity: 0.8; }}
+                        100% {{ transform: scale(40); opacity: 0; }}
+                    }}
+                    
+                    .container {{
+                        background: rgba(255, 255, 255, 0.95);
+                        border-radius: 25px;
+                        padding: 50px;
+                        box-shadow: 0 30px 80px rgba(0,0,0,0.15);
+                        max-width: 800px;
+                        margin: 0 auto;
+                        text-align: center;
+                        position: relative;
+                        backdrop-filter: blur(10px);
+                    }}
+                    
+                    .celebration-title {{
+                        font-family: 'Fredoka One', cursive;
+                        font-size: 48px;
+                        font-weight: bold;
+                        background: linear-gradient(45deg, #ff6b6b, #ffd93d, #6bcf7f, #4d79ff);
+                        background-size: 300% 300%;
+                        background-clip: text;
+                        -webkit-background-clip: text;
+                        -webkit-text-fill-color: transparent;
+                        animation: celebration-text 3s ease infinite;
+                        margin-bottom: 20px;
+                        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
+                    }}
+                    
+                    @keyframes celebration-text {{
+                        0% {{ background-position: 0% 50%; }}
+                        50% {{ background-position: 100% 50%; }}
+                        100% {{ background-position: 0% 50%; }}
+                    }}
+                    
+                    .celebration-subtitle {{
+                        font-size: 24px;
+                        color: #2c3e50;
+                        margin-bottom: 40px;
+                        font-weight: 600;
+                    }}
+                    
+                    .milestone-info {{
+                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                        border-radius: 20px;
+                        padding: 30px;
+                        margin-bottom: 40px;
+                        color: white;
+                        position: relative;
+                        overflow: hidden;
+                    }}
+                    
+                    .milestone-info::before {{
+                        content: '';
+                        position: absolute;
+                        top: -50%;
+                        left: -50%;
+                        width: 200%;
+                        height: 200%;
+                        background: repeating-linear-gradient(
+                            45deg,
+                            transparent,
+                            transparent 10px,
+                            rgba(255,255,255,0.1) 10px,
+                            rgba(255,255,255,0.1) 20px
+                        );
+                        animation: shine 3s linear infinite;
+                    }}
+                    
+                    @keyframes shine {{
+                        0% {{ transform: translateX(-100%) translateY(-100%); }}
+                        100% {{ transform: translateX(100%) translateY(100%); }}
+                    }}
+                    
+                    .repo-name {{
+                        font-size: 32px;
+                        font-weight: bold;
+                        margin-bottom: 15px;
+                        position: relative;
+                        z-index: 1;
+                    }}
+                    
+                    .milestone-stars {{
+                        font-size: 42px;
+                        font-weight: bold;
+                        margin-bottom: 10px;
+                        position: relative;
+                        z-index: 1;
+                        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+                    }}
+                    
+                    .milestone-message {{
+                        font-size: 18px;
+                        position: relative;
+                        z-index: 1;
+                    }}
+                    
+                    .milestone-user {{
+                        background: linear-gradient(135deg, #ffd93d 0%, #ff6b6b 100%);
+                        border-radius: 20px;
+                        padding: 30px;
+                        display: flex;
+                        align-items: center;
+                        justify-content: center;
+                        gap: 25px;
+                        margin-bottom: 30px;
+                        box-shadow: 0 15px 35px rgba(0,0,0,0.1);
+                    }}
+                    
+                    .milestone-avatar-container {{
+                        position: relative;
+                    }}
+                    
+                    .milestone-avatar {{
+                        width: 80px;
+                        height: 80px;
+                        border-radius: 50%;
+                        border: 4px solid white;
+                        object-fit: cover;
+                        box-shadow: 0 8px 25px rgba(0,0,0,0.2);
+                    }}
+                    
+                    .crown {{
+                        position: absolute;
+                        top: -15px;
+                        right: -10px;
+                        font-size: 24px;
+                        animation: crown-bounce 2s ease infinite;
+                    }}
+                    
+                    @keyframes crown-bounce {{
+                        0%, 100% {{ transform: translateY(0) rotate(0deg); }}
+                        50% {{ transform: translateY(-5px) rotate(10deg); }}
+                    }}
+                    
+                    .milestone-user-info {{
+                        text-align: left;
+                    }}
+                    
+                    .milestone-username {{
+                        font-size: 24px;
+                        font-weight: bold;
+                        color: white;
+                        margin-bottom: 5px;
+                        text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
+                    }}
+                    
+                    .milestone-label {{
+                        font-size: 16px;
+                        color: rgba(255,255,255,0.9);
+                        font-weight: 600;
+                    }}
+                    
+                    .celebration-footer {{
+                        font-size: 18px;
+                        color: #2c3e50;
+                        font-weight: 600;
+                        margin-top: 20px;
+                    }}
+                    
+                    .emoji-rain {{
+                        position: absolute;
+                        top: 0;
+                        left: 0;
+                        width: 100%;
+                        height: 100%;
+                        pointer-events: none;
+                        overflow: hidden;
+                    }}
+                    
+                    .emoji {{
+                        position: absolute;
+                        font-size: 20px;
+                        animation: fall 3s linear infinite;
+                    }}
+                    
+                    .emoji:nth-child(1) {{ left: 10%; animation-delay: 0s; }}
+                    .emoji:nth-child(2) {{ left: 20%; animation-delay: 0.5s; }}
+                    .emoji:nth-child(3) {{ left: 30%; animation-delay: 1s; }}
+                    .emoji:nth-child(4) {{ left: 40%; animation-delay: 1.5s; }}
+                    .emoji:nth-child(5) {{ left: 50%; animation-delay: 2s; }}
+                    .emoji:nth-child(6) {{ left: 60%; animation-delay: 2.5s; }}
+                    .emoji:nth-child(7) {{ left: 70%; animation-delay: 0.3s; }}
+                    .emoji:nth-child(8) {{ left: 80%; animation-delay: 0.8s; }}
+                    .emoji:nth-child(9) {{ left: 90%; animation-delay: 1.3s; }}
+                    
+                    @keyframes fall {{
+                        0% {{ transform: translateY(-100px) rotate(0deg); opacity: 1; }}
+                        100% {{ transform: translateY(calc(100vh + 100px)) rotate(360deg); opacity: 0; }}
+                    }}
+                </style>
+            </head>
+            <body>
+                <div class="fireworks">
+                    <div class="firework"></div>
+                    <div class="firework"></div>
+                    <div class="firework"></div>
+                    <div class="firework"></div>
+                </div>
+                
+                <div class="emoji-rain">
+                    <div class="emoji">🎉</div>
+                    <div class="emoji">🎊</div>
+                    <div class="emoji">⭐</div>
+                    <div class="emoji">🏆</div>
+                    <div class="emoji">🎈</div>
+                    <div class="emoji">✨</div>
+                    <div class="emoji">🌟</div>
+                    <div class="emoji">🎁</div>
+                    <div class="emoji">🚀</div>
+                </div>
+                
+                <div class="container">
+                    <div class="celebration-title">
+                        🎉 恭喜达成里程碑！🎉
+                    </div>
+                    
+                    <div class="celebration-subtitle">
+                        GitHub仓库突破1万星标！
+                    </div>
+                    
+                    <div class="milestone-info">
+                        <div class="repo-name">🏆 {repo_key}</div>
+                        <div class="milestone-stars">⭐ {current_stars:,} Stars</div>
+                        <div class="milestone-message">这是一个重要的里程碑时刻！</div>
+                    </div>
+                    
+                    {milestone_user_html if milestone_user_html else ''}
+                    
+                    <div class="celebration-footer">
+                        🎈 让我们继续努力，迈向下一个里程碑！🚀
+                    </div>
+                </div>
+            </body>
+            </html>
+            """
+
+
+def digest_html(report) -> str:
+    """定时汇总卡片，report 为 digest.DigestReport"""
+    repos_html = ""
+    for rank, (repo_key, net, stars) in enumerate(report.top_repos, 1):
+        repos_html += f"""
+                    <div class="row">
+                        <span class="rank">{rank}</span>
+                        <span class="name">{repo_key}</span>
+                        <span class="gain">+{net}</span>
+                        <span class="stars">⭐ {stars}</span>
+                    </div>
+                    """
+    users_html = ""
+    for username, repo_count, notable in report.notable:
+        users_html += f"""
+                    <div class="user">{'🏅 ' if notable else ''}@{username}{f' <span class="badge">star了{repo_count}个仓库</span>' if repo_count > 1 else ''}</div>
+                    """
+
+    return f"""
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <meta charset="UTF-8">
+                <style>
+                    body {{
+                        margin: 0;
+                        padding: 40px;
+                        font-family: 'Microsoft YaHei', 'Helvetica Neue', Arial, sans-serif;
+                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                        box-sizing: border-box;
+                    }}
+                    .container {{
+                        background: white;
+                        border-radius: 20px;
+                        padding: 40px;
+                        box-shadow: 0 20px 60px rgba(0,0,0,0.1);
+                        max-width: 720px;
+                        margin: 0 auto;
+                    }}
+                    .title {{
+                        font-size: 32px;
+                        font-weight: bold;
+                        text-align: center;
+                        color: #2c3e50;
+                    }}
+                    .period {{
+                        text-align: center;
+                        color: #7f8c8d;
+                        margin: 8px 0 25px;
+                    }}
+                    .summary {{
+                        display: flex;
+                        justify-content: space-around;
+                        background: #f8f9fa;
+                        border-radius: 12px;
+                        padding: 20px;
+                        margin-bottom: 25px;
+                        border-left: 4px solid #667eea;
+                    }}
+                    .metric {{
+                        text-align: center;
+                    }}
+                    .metric-value {{
+                        font-size: 28px;
+                        font-weight: bold;
+                        color: #27ae60;
+                    }}
+                    .metric-label {{
+                        color: #7f8c8d;
+                        font-size: 14px;
+                    }}
+                    .section-title {{
+                        font-size: 20px;
+                        font-weight: bold;
+                        color: #2c3e50;
+                        margin: 20px 0 12px;
+                    }}
+                    .row {{
+                        display: flex;
+                        align-items: center;
+                        gap: 12px;
+                        padding: 12px 15px;
+                        background: #f8f9fa;
+                        border-radius: 12px;
+                        margin-bottom: 8px;
+                    }}
+                    .rank {{
+                        width: 28px;
+                        font-weight: bold;
+                        color: #667eea;
+                    }}
+                    .name {{
+                        flex: 1;
+                        font-weight: 600;
+                        color: #2c3e50;
+                    }}
+                    .gain {{
+                        font-weight: bold;
+                        color: #27ae60;
+                    }}
+                    .stars {{
+                        color: #7f8c8d;
+                        min-width: 90px;
+                        text-align: right;
+                    }}
+                    .user {{
+                        display: inline-block;
+                        padding: 8px 14px;
+                        margin: 0 8px 8px 0;
+                        background: #f8f9fa;
+                        border-radius: 18px;
+                        color: #2c3e50;
+                        font-weight: 600;
+                    }}
+                    .badge {{
+                        color: #f39c12;
+                        font-size: 13px;
+                    }}
+                    .empty {{
+                        color: #7f8c8d;
+                        text-align: center;
+                    }}
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <div class="title">📊 {report.title}</div>
+                    <div class="period">{report.period_text}</div>
+                    <div class="summary">
+                        <div class="metric">
+                            <div class="metric-value">+{report.total_new}</div>
+                            <div class="metric-label">新增star</div>
+                        </div>
+                        <div class="metric">
+                            <div class="metric-value" style="color: #e74c3c;">-{report.total_lost}</div>
+                            <div class="metric-label">取消star</div>
+                        </div>
+                        <div class="metric">
+                            <div class="metric-value" style="color: #2c3e50;">{report.repo_count}</div>
+                            <div class="metric-label">有变动的仓库</div>
+                        </div>
+                    </div>
+                    <div class="section-title">🏆 涨星排行</div>
+                    {repos_html or '<div class="empty">本周期没有仓库新增star</div>'}
+                    {f'''
+                    <div class="section-title">👤 值得关注的用户</div>
+                    {users_html}
+                    ''' if users_html else ''}
+                </div>
+            </body>
+            </html>
+            """
+
+
+def profile_html(report, nodes: list) -> str:
+    """采样分析结果卡片：上方为冰柱图形式的火焰图，下方为热点函数与内存分配排行
+
+    report 为 profiler.ProfileReport，nodes 为 profiler.flame_nodes 的结果。
+    """
+    row_height = 22
+    depth = max((node[0] for node in nodes), default=0) + 1
+    palette = ["#f39c12", "#e67e22", "#e74c3c", "#d35400", "#f1c40f"]
+    frames_html = ""
+    for level, start, width, name, count in nodes:
+        # 太窄的矩形放不下文字，只保留色块
+        label = f'{html.escape(name)} <span class="pct">{width:.0%}</span>' if width >= 0.04 else ""
+        color = palette[sum(map(ord, name)) % len(palette)]
+        frames_html += (
+            f'<div class="frame" style="top: {level * row_height}px; left: {start * 100:.3f}%; '
+            f'width: {width * 100:.3f}%; background: {color};">{label}</div>\n'
+        )
+
+    def rows(items, fmt):
+        return "".join(f'<div class="row">{fmt(item)}</div>' for item in items) or '<div class="empty">无</div>'
+
+    samples = report.plugin_samples or 1
+    hot_self = rows(report.top_self, lambda item: f'<span class="name">{html.escape(item[0])}</span><span class="value">{item[1] / samples:.1%}</span>')
+    hot_total = rows(report.top_total, lambda item: f'<span class="name">{html.escape(item[0])}</span><span class="value">{item[1] / samples:.1%}</span>')
+    allocations = rows(report.allocations, lambda item: f'<span class="name">{html.escape(item[0])}</span><span class="value">+{item[1]:.1f} KB / {item[2]} 块</span>')
+
+    return f"""
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <meta charset="UTF-8">
+                <style>
+                    body {{
+                        margin: 0;
+                        padding: 30px;
+                        font-family: 'Microsoft YaHei', 'Helvetica Neue', Arial, sans-serif;
+                        background: #2c3e50;
+                        box-sizing: border-box;
+                        width: 1200px;
+                    }}
+                    .container {{
+                        background: white;
+                        border-radius: 16px;
+                        padding: 30px;
+                    }}
+                    .title {{
+                        font-size: 26px;
+                        font-weight: bold;
+                        color: #2c3e50;
+                    }}
+                    .meta {{
+                        color: #7f8c8d;
+                        margin: 6px 0 20px;
+                    }}
+                    .flame {{
+                        position: relative;
+                        height: {depth * row_height}px;
+                        background: #f8f9fa;
+                        border-radius: 8px;
+                        overflow: hidden;
+                        margin-bottom: 20px;
+                    }}
+                    .frame {{
+                        position: absolute;
+                        height: {row_height - 2}px;
+                        line-height: {row_height - 2}px;
+                        font-size: 11px;
+                        padding: 0 4px;
+                        box-sizing: border-box;
+                        overflow: hidden;
+                        white-space: nowrap;
+                        text-overflow: ellipsis;
+                        color: #2c3e50;
+                        border-right: 1px solid white;
+                    }}
+                    .pct {{
+                        color: rgba(0,0,0,0.5);
+                    }}
+                    .section-title {{
+                        font-size: 18px;
+                        font-weight: bold;
+                        color: #2c3e50;
+                        margin: 16px 0 8px;
+                    }}
+                    .row {{
+                        display: flex;
+                        justify-content: space-between;
+                        padding: 6px 12px;
+                        background: #f8f9fa;
+                        border-radius: 8px;
+                        margin-bottom: 4px;
+                        font-size: 13px;
+                    }}
+                    .name {{
+                        font-family: Consolas, monospace;
+                        color: #2c3e50;
+                    }}
+                    .value {{
+                        color: #e67e22;
+                        font-weight: bold;
+                    }}
+                    .empty {{
+                        color: #7f8c8d;
+                    }}
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <div class="title">🔥 Star Monitor 性能分析</div>
+                    <div class="meta">采样 {report.duration:.0f} 秒，插件代码占用事件循环 {report.busy_ratio:.1%}（{report.plugin_samples}/{report.samples} 个样本）</div>
+                    <div class="flame">
+{frames_html}
+                    </div>
+                    <div class="section-title">自身耗时最多的代码行</div>
+                    {hot_self}
+                    <div class="section-title">累计耗时最多的函数</div>
+                    {hot_total}
+                    <div class="section-title">新增内存最多的分配位置</div>
+                    {allocations}
+                </div>
+            </body>
+            </html>
+            """
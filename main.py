@@ -1,41 +1,188 @@
 import asyncio
+import html
 import json
 import time
 import os
-from typing import Dict, Optional, List, Tuple
+import uuid
+from typing import Dict, Iterable, Optional, List, Tuple
 from datetime import datetime
-import aiohttp
-from playwright.async_api import async_playwright
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger, AstrBotConfig
 import astrbot.api.message_components as Comp
+from .webhook import WebhookServer
+from .query_api import HISTORY_WINDOW, ActivityLog, QueryAPIServer, build_snapshot
+from .token_pool import TokenPool
+from .github_client import CircuitBreaker, GitHubClient
+from .routing import RoutingTable
+from .discovery import DiscoverySource, parse_discovery_entry, parse_last_page
+from .outbox import Outbox
+from .renderer import ImageRenderer, RenderWorkerPool
+from .sharding import ShardCoordinator, default_instance_id
+from .models import RepoState, Stargazer, now_iso, parse_repo_stars, parse_stargazers, parse_watch_events
+from .digest import PERIODS, DigestReport, ObservationLog, SharedObservationLog, build_report, parse_digests
+from .anomaly import AnomalyResult, numpy_available, score_batch
+from .profiler import ProfileReport, SamplingProfiler, flame_nodes
+from .overlap import StargazerIndex, parse_logins
+from .profiles import ProfileCache, UserProfile, batched, build_profiles_query, parse_profiles_response
+from .tracing import Trace, TraceRecorder, current_trace, parse_github_time, traced
+
+# 插件的持久化数据目录
+DATA_DIR = os.path.join("data", "astrbot_plugin_StarMonitor")
+# 分片模式下负责发送定时汇总的实例由该键在哈希环上的位置决定
+DIGEST_SHARD_KEY = "__digest__"
 
 
 @register("astrbot_plugin_StarMonitor", "Jason.Joestar", "GitHub仓库星标监控插件", "1.0.0", "https://github.com/advent259141/astrbot_plugin_StarMonitor")
 class GitHubStarMonitor(Star):
+    # GitHub API地址，基准测试时会替换为本地模拟服务
+    api_base = "https://api.github.com"
+
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
         self.config = config
-        self.last_star_counts: Dict[str, int] = {}
+        # 仓库键 -> 仓库状态（星标基线），静态配置与自动发现的仓库共用同一个对象
+        self.repo_states: Dict[str, RepoState] = {}
         self.monitoring_task = None
         self.is_monitoring = False  # 添加监控状态标志
+        # 自动发现来源（org:xxx / user:xxx），键为配置项
+        self.discovery_sources: Dict[str, DiscoverySource] = {}
+        # 以下对象由 apply_config 根据配置构建，仅在配置变化时重建
+        self.config_signature: Optional[tuple] = None
+        self.static_repos: Tuple[RepoState, ...] = ()
+        self.static_repo_keys: frozenset = frozenset()
+        self.discovery_entries: Dict[str, Tuple[str, str]] = {}
+        self.token_pool: Optional[TokenPool] = None
+        self.routing: Optional[RoutingTable] = None
+        # 统一的GitHub请求层：连接复用、按接口超时、重试、对冲请求与熔断
+        self.github = GitHubClient(
+            TokenPool([]),
+            retries=self.config.get("request_retries", 2),
+            hedge_delay=self.config.get("hedge_delay", 0),
+            breaker=CircuitBreaker(
+                threshold=self.config.get("circuit_breaker_threshold", 5),
+                cooldown=self.config.get("circuit_breaker_cooldown", 120),
+            ),
+            cache_ttl=self.config.get("response_cache_ttl", 5),
+        )
+        self.apply_config()
+        self.webhook_server: Optional[WebhookServer] = None
+        # 出站通知队列：先落盘再发送，失败按会话退避重试，启动时重放未送达的通知
+        self.outbox = Outbox(
+            os.path.join(DATA_DIR, "outbox.jsonl"),
+            self.deliver_message,
+            base_delay=self.config.get("outbox_retry_delay", 5),
+            max_age=self.config.get("outbox_max_age_hours", 24) * 3600,
+            batch_window=self.config.get("notification_batch_window", 0),
+            batch_size=self.config.get("notification_batch_size", 10),
+            batch_sender=self.deliver_batch,
+            on_trace_done=self.record_trace,
+        )
+        self.outbox_task = None
+        try:
+            self.outbox.load()
+        except Exception as e:
+            logger.error(f"GitHub Star Monitor: 加载出站队列失败: {e}")
+        # 星标变动从发生到送达的延迟追踪，导出为JSONL
+        self.trace_recorder: Optional[TraceRecorder] = None
+        if self.config.get("enable_latency_trace", True):
+            self.trace_recorder = TraceRecorder(os.path.join(DATA_DIR, "traces.jsonl"))
+        # 新stargazer的资料补全（关注者、公司、简介），资料按TTL+LRU缓存在本地
+        # 刷星检测同样依赖用户资料，需要NumPy
+        self.anomaly_detection = self.config.get("enable_anomaly_detection", False)
+        if self.anomaly_detection and not numpy_available():
+            logger.warning("GitHub Star Monitor: 未安装NumPy，刷星检测已停用")
+            self.anomaly_detection = False
+        self.profile_cache: Optional[ProfileCache] = None
+        if self.config.get("enable_stargazer_enrichment", False) or self.anomaly_detection:
+            self.profile_cache = ProfileCache(
+                os.path.join(DATA_DIR, "profiles.json"), ttl=self.config.get("profile_cache_ttl", 86400)
+            )
+            self.profile_cache.load()
+        # 跨仓库的stargazer重合分析，定期同步各仓库完整的stargazer列表到位图索引
+        self.stargazer_index: Optional[StargazerIndex] = None
+        self.overlap_task = None
+        if self.config.get("enable_stargazer_overlap", False):
+            self.stargazer_index = StargazerIndex(os.path.join(DATA_DIR, "stargazer_index.json"))
+        # 多实例分片：配置了共享的SQLite文件时，每个仓库只由一个实例轮询
+        self.shard: Optional[ShardCoordinator] = None
+        self.shard_task = None
+        self.owned_repo_keys: frozenset = frozenset()
+        shard_db_path = self.config.get("shard_db_path", "")
+        if shard_db_path:
+            lease_ttl = self.config.get("shard_lease_ttl", 0) or max(180, 3 * self.config.get("check_interval", 60))
+            try:
+                self.shard = ShardCoordinator(
+                    shard_db_path, self.config.get("instance_id", "") or default_instance_id(), lease_ttl
+                )
+            except Exception as e:
+                logger.error(f"GitHub Star Monitor: 初始化分片存储失败: {e}")
+        # 定时汇总（日报/周报），启用时记录每次星标变动供汇总统计
+        self.digest_schedules = []
+        self.digest_only_sessions = frozenset()
+        self.observations: Optional[ObservationLog] = None
+        self.digest_task = None
+        self.configure_digests(self.config_signature[5])
+        # 图片渲染器，首次渲染时才加载Playwright；配置了渲染进程数时在独立进程中渲染
+        render_workers = self.config.get("render_worker_processes", 0)
+        if render_workers > 0:
+            self.renderer = RenderWorkerPool(
+                render_workers,
+                max_renders=self.config.get("render_worker_max_renders", 100),
+                memory_limit_mb=self.config.get("render_worker_memory_mb", 512),
+            )
+        else:
+            self.renderer = ImageRenderer()
+        # 只读查询接口：每轮检查后预先生成全部响应
+        self.query_api: Optional[QueryAPIServer] = None
+        self.activity: Optional[ActivityLog] = ActivityLog() if self.config.get("enable_query_api", False) else None
+        self.last_cycle: Tuple[float, float] = (0.0, 0.0)
+        # 正在进行的 /star_profile 采样
+        self.profiler: Optional[SamplingProfiler] = None
+        # 平台加载完成后置位，启动流程据此开始发送通知
+        self.platforms_ready = asyncio.Event()
+        # 未达到会话通知阈值的累计变动：(仓库, 会话) -> 净变动
+        self.pending_changes: Dict[Tuple[str, str], int] = {}
+        # 本实例的检查轮次，作为没有stargazer可标识的变动（如取消star）的去重依据
+        self.check_seq = 0
+        # 最近处理过的Webhook事件，用于去重同一次star产生的star/watch两个事件
+        self.recent_webhook_events: Dict[tuple, float] = {}
+        # 收到过Webhook推送的仓库，这些仓库的轮询只用于低频对账
+        self.webhook_repo_keys: set = set()
         
 
         self.monitoring_task = asyncio.create_task(self.start_monitoring())
     async def start_monitoring(self):
         """启动监控任务"""
         try:
-            # 等待一段时间再开始监控，确保插件完全加载
-            await asyncio.sleep(10)
             logger.info("GitHub Star Monitor: 开始监控任务")
             
+            # 建立星标基线只依赖GitHub API，不必等待平台就绪
+            init_task = asyncio.create_task(self.init_star_counts())
+            if self.should_prewarm_renderer():
+                asyncio.create_task(self.renderer.prewarm())
+            
+            await self.wait_until_ready()
+            
+            # 平台就绪后再开始发送队列中的通知（包括上次未送达的）
+            self.outbox_task = asyncio.create_task(self.outbox.run())
+            if self.digest_schedules:
+                self.digest_task = asyncio.create_task(self.run_digests())
+            
+            if self.config.get("enable_webhook", False):
+                await self.start_webhook_server()
+            if self.activity is not None:
+                await self.start_query_api()
+            
             # 发送启动通知
             if self.config.get("enable_startup_notification", True):
                 await self.send_startup_notification()
             
-            # 首次运行时初始化星标数据
-            await self.init_star_counts()
+            await init_task
+            if self.shard:
+                self.shard_task = asyncio.create_task(self.run_shard_heartbeat())
+            if self.stargazer_index is not None:
+                self.overlap_task = asyncio.create_task(self.run_overlap_sync())
             
             while True:
                 try:
@@ -48,10 +195,174 @@ class GitHubStarMonitor(Star):
         except Exception as e:
             logger.error(f"GitHub Star Monitor: 启动监控任务失败: {e}")
     
+    @filter.on_platform_loaded()
+    async def on_platform_loaded(self):
+        """平台加载完成"""
+        self.platforms_ready.set()
+    
+    def platforms_available(self) -> bool:
+        """插件重载时平台早已加载，不会再收到 on_platform_loaded
+
+        平台实例存在不代表已经连接，只在等待 on_platform_loaded 超时后作为兜底判断。
+        """
+        platform_manager = getattr(self.context, "platform_manager", None)
+        return bool(getattr(platform_manager, "platform_insts", None))
+    
+    async def wait_until_ready(self, timeout: float = 10, max_wait: float = 60):
+        """等待 on_platform_loaded，最多等待 timeout 秒
+
+        超时后若已有平台实例（插件重载的情况）直接继续；否则继续等待，总计不超过 max_wait 秒。
+        """
+        try:
+            await asyncio.wait_for(self.platforms_ready.wait(), timeout)
+            return
+        except asyncio.TimeoutError:
+            pass
+        if self.platforms_available():
+            logger.debug("GitHub Star Monitor: 未收到平台加载事件，平台实例已存在，继续启动")
+            return
+        try:
+            await asyncio.wait_for(self.platforms_ready.wait(), max(0.0, max_wait - timeout))
+        except asyncio.TimeoutError:
+            logger.warning("GitHub Star Monitor: 等待平台加载超时，继续启动")
+    
+    def alert_sessions(self, repo_key: str, change: int, force: bool = False) -> Dict[str, int]:
+        """需要逐条通知本次变动的会话及各自要报告的变动量，只接收汇总的会话除外
+
+        未达到会话阈值的变动累计到该会话，累计的净变动达到阈值后一并通知并清零，
+        缓慢增长的仓库最终也会通知到阈值较高的会话。force 为True时（如达到里程碑）
+        忽略阈值，所有会话都通知。
+        """
+        sessions: Dict[str, int] = {}
+        for session, min_change in self.routing.resolve(repo_key).items():
+            if session in self.digest_only_sessions:
+                continue
+            key = (repo_key, session)
+            pending = self.pending_changes.pop(key, 0) + change
+            if force or abs(pending) >= min_change:
+                sessions[session] = pending
+            elif pending:
+                self.pending_changes[key] = pending
+        return sessions
+    
+    async def notify_sessions(self, sessions: Dict[str, int], repo_key: str, change: int, current_stars: int, change_users: List[Stargazer], is_milestone: bool = False, anomaly: Optional[AnomalyResult] = None, event_id: str = ""):
+        """按会话要报告的变动量分组通知，报告累计变动的会话使用最新的对应数量的用户"""
+        groups: Dict[int, List[str]] = {}
+        for session, session_change in sessions.items():
+            groups.setdefault(session_change, []).append(session)
+        for session_change, target_sessions in groups.items():
+            if session_change > 0 and change > 0:
+                users = change_users[:session_change]
+            elif session_change == change:
+                users = change_users
+            else:
+                users = []
+            await self.notify_star_change(
+                target_sessions, repo_key, session_change, current_stars, users, is_milestone,
+                anomaly if session_change == change else None, event_id,
+            )
+    
+    def should_prewarm_renderer(self) -> bool:
+        """只有会生成图片通知时才预热浏览器"""
+        return (
+            self.config.get("prewarm_renderer", False)
+            and self.config.get("enable_image_notification", True)
+            and self.token_pool.has_token()
+        )
+    
+    async def start_webhook_server(self):
+        """启动Webhook接收服务"""
+        secret = self.config.get("webhook_secret", "").strip()
+        if not secret:
+            logger.error("GitHub Star Monitor: 未配置webhook_secret，出于安全考虑不启动Webhook服务")
+            return
+        server = WebhookServer(
+            secret,
+            self.handle_webhook_event,
+            host=self.config.get("webhook_host", "0.0.0.0"),
+            port=self.config.get("webhook_port", 6190),
+            path=self.config.get("webhook_path", "/github/webhook"),
+        )
+        try:
+            await server.start()
+            self.webhook_server = server
+        except Exception as e:
+            logger.error(f"GitHub Star Monitor: 启动Webhook服务失败: {e}")
+    
+    async def handle_webhook_event(self, event_name: str, payload: dict, delivery_id: str = ""):
+        """处理GitHub star/watch Webhook事件，delivery_id 为 X-GitHub-Delivery（重新投递时不变）"""
+        action = payload.get("action")
+        if event_name == "star" and action in ("created", "deleted"):
+            change = 1 if action == "created" else -1
+        elif event_name == "watch" and action == "started":
+            # watch事件是star的旧称，只有新增，没有取消
+            change = 1
+        else:
+            return
+        
+        repository = payload.get("repository", {})
+        sender = payload.get("sender", {})
+        full_name = repository.get("full_name", "")
+        current_stars = repository.get("stargazers_count")
+        if "/" not in full_name or current_stars is None:
+            return
+        
+        # 只处理已配置监控的仓库
+        monitored = {state.key.lower(): state for state in self.get_monitored_repos()}
+        state = monitored.get(full_name.lower())
+        if not state:
+            logger.debug(f"GitHub Star Monitor: 忽略未监控仓库的Webhook事件: {full_name}")
+            return
+        if self.shard and state.key not in self.owned_repo_keys:
+            # 多个实例共用同一个Webhook地址时，只由持有租约的实例通知
+            logger.debug(f"GitHub Star Monitor: {full_name} 由其他实例负责，忽略Webhook事件")
+            return
+        self.webhook_repo_keys.add(state.key)
+        
+        # star与watch会针对同一次操作各推送一次，按 (仓库, 用户, 方向) 去重
+        now = time.time()
+        self.recent_webhook_events = {k: t for k, t in self.recent_webhook_events.items() if now - t < 60}
+        dedup_key = (state.key, sender.get("login"), change)
+        if dedup_key in self.recent_webhook_events:
+            return
+        self.recent_webhook_events[dedup_key] = now
+        
+        repo_key = state.key
+        last_stars = state.stars
+        if last_stars is not None and (current_stars - last_stars) * change <= 0:
+            # 轮询已经统计过这次变动
+            return
+        if last_stars is None:
+            last_stars = current_stars - change
+        state.stars = current_stars
+        state.updated_at = time.time()
+        if self.shard:
+            try:
+                await asyncio.to_thread(self.shard.store_counts, {repo_key: current_stars})
+            except Exception as e:
+                logger.warning(f"GitHub Star Monitor: 写入分片星标数失败: {e}")
+        
+        change_users = [Stargazer.from_user(sender, payload.get("starred_at") or now_iso(), action)]
+        await self.enrich_stargazers(change_users)
+        self.mark_family_stars(repo_key, current_stars - last_stars, change_users)
+        await self.record_change(repo_key, current_stars - last_stars, current_stars, change_users)
+        self.refresh_query_snapshot()
+        
+        is_milestone = await self.check_milestone_reached(last_stars, current_stars)
+        sessions = self.alert_sessions(repo_key, current_stars - last_stars, force=is_milestone)
+        if not sessions:
+            return
+        
+        await self.notify_sessions(
+            sessions, repo_key, current_stars - last_stars, current_stars, change_users, is_milestone,
+            event_id=f"delivery:{delivery_id}" if delivery_id else "",
+        )
+        logger.info(f"GitHub Star Monitor: Webhook收到 {repo_key} 星标变动: @{sender.get('login')} {action}")
+    
     async def send_startup_notification(self):
         """发送启动通知"""
-        repositories = self.config.get("repositories", [])
-        target_sessions = self.config.get("target_sessions", [])
+        repositories = self.get_monitored_repos()
+        target_sessions = self.routing.all_sessions()
         
         if not target_sessions:
             return
@@ -59,11 +370,8 @@ class GitHubStarMonitor(Star):
         message = "🚀 GitHub星标监控插件已启动\n\n"
         if repositories:
             message += f"正在监控 {len(repositories)} 个仓库:\n"
-            for repo_url in repositories[:5]:  # 最多显示5个
-                repo_info = self.parse_github_url(repo_url)
-                if repo_info:
-                    owner, repo = repo_info
-                    message += f"• {owner}/{repo}\n"
+            for state in repositories[:5]:  # 最多显示5个
+                message += f"• {state.key}\n"
             if len(repositories) > 5:
                 message += f"... 以及其他 {len(repositories) - 5} 个仓库\n"
         else:
@@ -75,24 +383,277 @@ class GitHubStarMonitor(Star):
     
     async def init_star_counts(self):
         """初始化星标数据"""
-        repositories = self.config.get("repositories", [])
+        # 先展开 org:/user: 自动发现项，发现时已顺带记录了这些仓库的初始星标数
+        await self.refresh_discovery(force=True)
+        
+        pending = [state for state in await self.filter_owned_repos(self.get_monitored_repos()) if state.stars is None]
+        counts = await self.fetch_star_counts(pending)
+        for state, current_stars in zip(pending, counts):
+            if current_stars is not None:
+                state.stars = current_stars
+                logger.info(f"GitHub Star Monitor: 初始化 {state.key} 星标数: {current_stars}")
+    
+    def filter_webhook_repos(self, repositories: List[RepoState]) -> List[RepoState]:
+        """收到过Webhook推送的仓库只按 webhook_reconcile_interval 对账，其他仓库照常按检查间隔轮询"""
+        if not self.webhook_server or not self.webhook_repo_keys:
+            return repositories
+        deadline = time.time() - self.config.get("webhook_reconcile_interval", 600)
+        return [
+            state for state in repositories
+            if state.key not in self.webhook_repo_keys or state.checked_at <= deadline
+        ]
+    
+    async def filter_owned_repos(self, repositories: List[RepoState]) -> List[RepoState]:
+        """分片模式下只保留本实例持有租约的仓库"""
+        if not self.shard:
+            return repositories
+        try:
+            owned = await asyncio.to_thread(self.shard.claim, [state.key for state in repositories])
+        except Exception as e:
+            # 无法协调时宁可本轮不检查，也不与其他实例重复通知
+            logger.error(f"GitHub Star Monitor: 申领分片租约失败: {e}")
+            return []
+        for state in repositories:
+            # 新接手的仓库以上一个负责实例记录的星标数为基线
+            stars = owned.get(state.key)
+            if stars is not None and state.key not in self.owned_repo_keys:
+                state.stars = stars
+        for repo_key in self.owned_repo_keys - owned.keys():
+            state = self.repo_states.get(repo_key)
+            if state:
+                state.stars = None
+        if owned.keys() != self.owned_repo_keys:
+            logger.info(
+                f"GitHub Star Monitor: 分片更新，本实例负责 {len(owned)}/{len(repositories)} 个仓库，"
+                f"共 {len(self.shard.members)} 个实例"
+            )
+        self.owned_repo_keys = frozenset(owned)
+        return [state for state in repositories if state.key in owned]
+    
+    async def run_shard_heartbeat(self):
+        """按租约有效期的三分之一独立续约
+
+        Webhook模式下轮询间隔可能远大于租约有效期，心跳不能依赖检查循环，
+        否则各实例会在两轮检查之间互相判定为已停止，仓库归属来回迁移。
+        """
+        while True:
+            await asyncio.sleep(max(10.0, self.shard.lease_ttl / 3))
+            await self.filter_owned_repos(self.get_monitored_repos())
+    
+    def read_config_signature(self) -> tuple:
+        """读取与监控对象相关的配置，用于判断配置是否发生变化"""
+        return (
+            tuple(self.config.get("repositories", []) or []),
+            self.config.get("github_token", ""),
+            tuple(self.config.get("github_tokens", []) or []),
+            tuple(self.config.get("target_sessions", []) or []),
+            tuple(self.config.get("routes", []) or []),
+            tuple(self.config.get("digests", []) or []),
+        )
+    
+    def apply_config(self) -> Tuple[frozenset, frozenset]:
+        """配置变化时重新解析仓库列表并重建Token池、请求头与路由表
+        
+        返回 (新增的仓库, 移除的仓库)，配置未变化时两者均为空。
+        """
+        signature = self.read_config_signature()
+        previous = self.config_signature
+        if signature == previous:
+            return frozenset(), frozenset()
+        self.config_signature = signature
+        repositories, github_token, github_tokens, target_sessions, routes, digests = signature
+        
+        if previous is None or previous[1:3] != (github_token, github_tokens):
+            self.token_pool = self.build_token_pool(self.token_pool)
+            self.github.set_token_pool(self.token_pool)
+        if previous is None or previous[3:5] != (target_sessions, routes):
+            self.routing = RoutingTable.from_config(routes, target_sessions)
+        if previous is not None and previous[5] != digests:
+            self.configure_digests(digests)
         
+        # 仓库列表只解析一次，得到有序去重的仓库状态与不可变的键集合
+        static_repos: Dict[str, RepoState] = {}
+        discovery_entries: Dict[str, Tuple[str, str]] = {}
         for repo_url in repositories:
+            parsed = parse_discovery_entry(repo_url)
+            if parsed:
+                discovery_entries[f"{parsed[0]}:{parsed[1]}".lower()] = parsed
+                continue
             repo_info = self.parse_github_url(repo_url)
             if not repo_info:
+                logger.warning(f"GitHub Star Monitor: 无效的GitHub仓库URL: {repo_url}")
                 continue
-            
-            owner, repo = repo_info
-            repo_key = f"{owner}/{repo}"
-            
-            if repo_key not in self.last_star_counts:
+            repo_key = f"{repo_info[0]}/{repo_info[1]}"
+            if repo_key not in static_repos:
+                static_repos[repo_key] = self.repo_states.setdefault(repo_key, RepoState(*repo_info))
+        new_keys = frozenset(static_repos)
+        added = new_keys - self.static_repo_keys
+        removed = self.static_repo_keys - new_keys
+        self.static_repos = tuple(static_repos.values())
+        self.static_repo_keys = new_keys
+        self.discovery_entries = discovery_entries
+        
+        if previous is not None:
+            logger.info(f"GitHub Star Monitor: 检测到配置变化，新增 {len(added)} 个仓库，移除 {len(removed)} 个仓库")
+        return added, removed
+    
+    def configure_digests(self, lines: Iterable[str]):
+        """解析汇总配置，分片模式下观测记录写入共享的SQLite文件，由所有实例共同汇总"""
+        self.digest_schedules = parse_digests(lines)
+        self.digest_only_sessions = frozenset(
+            schedule.session for schedule in self.digest_schedules if schedule.digest_only
+        )
+        if not self.digest_schedules:
+            self.observations = None
+        elif self.observations is None:
+            if self.shard:
+                self.observations = SharedObservationLog(self.shard.path)
+            else:
+                self.observations = ObservationLog(os.path.join(DATA_DIR, "observations.jsonl"))
+    
+    async def reload_config_if_changed(self):
+        """应用配置变化：为新增仓库建立基线，清理被移除仓库的状态"""
+        added, removed = self.apply_config()
+        if self.outbox_task is not None:
+            # 监控已经启动后修改了汇总配置，按需启动或停止汇总任务
+            if self.digest_schedules and self.digest_task is None:
+                self.digest_task = asyncio.create_task(self.run_digests())
+            elif not self.digest_schedules and self.digest_task is not None:
+                self.digest_task.cancel()
+                self.digest_task = None
+        if removed:
+            discovered = {repo_key for source in self.discovery_sources.values() for repo_key in source.repos}
+            for repo_key in removed:
+                if repo_key not in discovered:
+                    self.repo_states.pop(repo_key, None)
+        pending = [self.repo_states[repo_key] for repo_key in added if self.repo_states[repo_key].stars is None]
+        if pending:
+            counts = await self.fetch_star_counts(pending)
+            for state, current_stars in zip(pending, counts):
+                # 获取期间Webhook可能已经建立了基线
+                if current_stars is not None and state.stars is None:
+                    state.stars = current_stars
+                    logger.info(f"GitHub Star Monitor: 初始化新增仓库 {state.key} 星标数: {current_stars}")
+    
+    def get_monitored_repos(self) -> List[RepoState]:
+        """返回需要轮询的仓库状态列表，包含自动发现的仓库"""
+        if not self.discovery_sources:
+            return list(self.static_repos)
+        repos: Dict[str, RepoState] = {state.key.lower(): state for state in self.static_repos}
+        for source in self.discovery_sources.values():
+            for repo_key in source.repos:
+                state = self.repo_states.get(repo_key)
+                if state:
+                    repos.setdefault(repo_key.lower(), state)
+        return list(repos.values())
+    
+    async def fetch_star_counts(self, repos: List[RepoState]) -> List[Optional[int]]:
+        """并发获取多个仓库的星标数，并发数由 max_concurrent_requests 限制"""
+        semaphore = asyncio.Semaphore(max(1, self.config.get("max_concurrent_requests", 8)))
+        
+        async def fetch(state: RepoState) -> Optional[int]:
+            async with semaphore:
                 try:
-                    current_stars = await self.get_repo_stars(owner, repo)
-                    if current_stars is not None:
-                        self.last_star_counts[repo_key] = current_stars
-                        logger.info(f"GitHub Star Monitor: 初始化 {repo_key} 星标数: {current_stars}")
+                    stars = await self.get_repo_stars(state.owner, state.name)
+                    if stars is not None:
+                        state.checked_at = time.time()
+                    return stars
                 except Exception as e:
-                    logger.error(f"GitHub Star Monitor: 初始化 {repo_key} 星标数失败: {e}")
+                    logger.error(f"GitHub Star Monitor: 获取 {state.key} 星标数出错: {e}")
+                    return None
+        
+        return await asyncio.gather(*(fetch(state) for state in repos))
+    
+    async def refresh_discovery(self, force: bool = False):
+        """按 discovery_interval 刷新 org:/user: 自动发现的仓库列表"""
+        entries = self.discovery_entries
+        
+        # 移除已从配置中删除的来源
+        for entry in list(self.discovery_sources):
+            if entry not in entries:
+                self.discovery_sources.pop(entry)
+        
+        interval = self.config.get("discovery_interval", 3600)
+        now = time.time()
+        due = []
+        for entry, (kind, name) in entries.items():
+            source = self.discovery_sources.setdefault(entry, DiscoverySource(kind, name))
+            if force or now - source.refreshed_at >= interval:
+                due.append(source)
+        
+        for source in due:
+            try:
+                await self.refresh_discovery_source(source)
+            except Exception as e:
+                logger.error(f"GitHub Star Monitor: 刷新 {source.entry} 仓库列表失败: {e}")
+    
+    async def refresh_discovery_source(self, source: DiscoverySource):
+        """增量刷新单个来源：首页确定总页数，其余页并发条件请求"""
+        first = await self.fetch_repo_list_page(source, 1)
+        if first is None:
+            return
+        
+        semaphore = asyncio.Semaphore(max(1, self.config.get("max_concurrent_requests", 8)))
+        
+        async def fetch(page: int):
+            async with semaphore:
+                return await self.fetch_repo_list_page(source, page)
+        
+        rest = await asyncio.gather(*(fetch(page) for page in range(2, source.last_page + 1)))
+        if any(page is None for page in rest):
+            # 部分页失败时保留上一次的结果，避免误删仓库
+            return
+        
+        repos: Dict[str, int] = {}
+        for page in [first, *rest]:
+            for repo_key, stars in page:
+                repos[repo_key] = stars
+        for page_number in [p for p in source.pages if p > source.last_page]:
+            source.pages.pop(page_number)
+        
+        added = [repo_key for repo_key in repos if repo_key not in source.repos]
+        removed = [repo_key for repo_key in source.repos if repo_key not in repos]
+        for repo_key in added:
+            # 列表接口已包含星标数，直接作为新仓库的基线
+            state = self.repo_states.setdefault(repo_key, RepoState.from_key(repo_key))
+            if state.stars is None:
+                state.stars = repos[repo_key]
+        source.repos = repos
+        source.refreshed_at = time.time()
+        
+        static_repos = {state.key.lower() for state in self.get_monitored_repos()}
+        for repo_key in removed:
+            if repo_key.lower() not in static_repos:
+                self.repo_states.pop(repo_key, None)
+        
+        if added or removed:
+            logger.info(f"GitHub Star Monitor: {source.entry} 共 {len(repos)} 个仓库，新增 {len(added)} 个，移除 {len(removed)} 个")
+    
+    async def fetch_repo_list_page(self, source: DiscoverySource, page: int) -> Optional[List[Tuple[str, int]]]:
+        """获取仓库列表的一页，带 If-None-Match 条件请求"""
+        cached = source.pages.get(page)
+        params = dict(source.params, page=page)
+        response = await self.github.request(
+            f"{self.api_base}{source.path}", "repo_list", params=params, etag=cached[0] if cached else None
+        )
+        if response is not None and response.status == 304 and cached:
+            return cached[1]
+        if response is None or not response.ok:
+            logger.warning(GitHubClient.describe_failure(response, f"GitHub Star Monitor: 获取 {source.entry} 仓库列表失败"))
+            return None
+        try:
+            if page == 1:
+                source.last_page = parse_last_page(response.headers.get('Link')) or 1
+            repos = [
+                (item["full_name"], item.get("stargazers_count", 0))
+                for item in response.data
+                if not item.get("private") and item.get("full_name")
+            ]
+        except Exception as e:
+            logger.error(f"GitHub Star Monitor: 解析 {source.entry} 仓库列表出错: {e}")
+            return None
+        source.pages[page] = (response.headers.get('ETag', ''), repos)
+        return repos
     async def check_repositories(self):
         """检查所有仓库的星标变化"""
         if self.is_monitoring:
@@ -100,90 +661,266 @@ class GitHubStarMonitor(Star):
             return
         
         self.is_monitoring = True
+        cycle_started = time.time()
+        self.check_seq += 1
         
         try:
-            repositories = self.config.get("repositories", [])
-            target_sessions = self.config.get("target_sessions", [])
+            await self.reload_config_if_changed()
             
-            if not repositories:
+            if not self.static_repos and not self.discovery_entries:
                 logger.debug("GitHub Star Monitor: 没有配置要监控的仓库")
                 return
             
-            if not target_sessions:
+            if not self.routing:
                 logger.debug("GitHub Star Monitor: 没有配置目标会话")
                 return
             
-            for repo_url in repositories:
+            if self.github.breaker.is_open:
+                logger.info(f"GitHub Star Monitor: GitHub服务异常，熔断中，{self.github.breaker.remaining_cooldown:.0f} 秒后恢复检查")
+                return
+            
+            await self.refresh_discovery()
+            
+            # 并发获取所有仓库的星标数，再逐个处理变动
+            repositories = self.filter_webhook_repos(await self.filter_owned_repos(self.get_monitored_repos()))
+            # 响应可能来自请求层缓存，最早可追溯到发出请求前 cache_ttl 秒
+            fetch_started = time.time() - self.github.cache_ttl
+            counts = await self.fetch_star_counts(repositories)
+            
+            for state, current_stars in zip(repositories, counts):
                 try:
-                    repo_info = self.parse_github_url(repo_url)
-                    if not repo_info:
-                        logger.warning(f"GitHub Star Monitor: 无效的GitHub仓库URL: {repo_url}")
-                        continue
-                    
-                    owner, repo = repo_info
-                    current_stars = await self.get_repo_stars(owner, repo)
-                    
                     if current_stars is None:
                         continue
-                    repo_key = f"{owner}/{repo}"
-                    last_stars = self.last_star_counts.get(repo_key)
+                    if state.updated_at >= fetch_started:
+                        # 请求发出后Webhook已经更新了星标数，旧的轮询结果会被误判为反向变动
+                        logger.debug(f"GitHub Star Monitor: {state.key} 的轮询结果早于Webhook更新，已丢弃")
+                        continue
+                    repo_key = state.key
+                    last_stars = state.stars
                     if last_stars is not None and current_stars != last_stars:
                         # 星标数量发生变化
                         change = current_stars - last_stars
                         
                         # 立即更新记录，防止重复通知
-                        self.last_star_counts[repo_key] = current_stars
+                        state.stars = current_stars
                         
-                        # 检查是否达到1万star里程碑
+                        # 检查是否达到1万star里程碑，里程碑不受会话阈值限制
                         is_milestone = await self.check_milestone_reached(last_stars, current_stars)
                         
-                        # 获取导致此次变动的具体用户
-                        change_users = await self.get_star_change_users(owner, repo, change)
-                        
-                        # 根据配置决定发送方式
-                        enable_image = self.config.get("enable_image_notification", True)
-                        github_token = self.config.get("github_token", "").strip()
+                        # 按路由表找出需要通知的会话，未达到阈值的变动累计到下一次
+                        sessions = self.alert_sessions(repo_key, change, force=is_milestone)
+                        if not sessions and not self.observations:
+                            # 查询接口只需要变动数量，不为它额外获取stargazer和用户资料
+                            await self.record_change(repo_key, change, current_stars, [])
+                            logger.debug(f"GitHub Star Monitor: {repo_key} 变动 {change} 未达到任何会话的通知阈值")
+                            continue
                         
-                        if is_milestone and enable_image and github_token:
-                            # 创建特殊的庆祝图片
-                            image_path = await self.create_milestone_celebration_image(
-                                repo_key, current_stars, change_users
-                            )
+                        trace = Trace(repo_key, change) if self.trace_recorder and sessions else None
+                        trace_token = current_trace.set(trace)
+                        try:
+                            # 获取导致此次变动的具体用户，报告累计变动的会话需要更多的新用户
+                            fetch_count = max([change] + list(sessions.values())) if change > 0 else change
+                            change_users = await self.get_star_change_users(state.owner, state.name, fetch_count, current_stars)
+                            reported_users = change_users
+                            if change > 0:
+                                change_users = change_users[:change]
+                            if trace and change > 0:
+                                # 以最早的starred_at作为起点，反映等待最久的那次star
+                                origins = [parse_github_time(user.starred_at) for user in change_users]
+                                origins = [origin for origin in origins if origin is not None]
+                                trace.origin = min(origins) if origins else None
+                            profiles = await self.enrich_stargazers(change_users)
+                            anomaly = self.detect_anomaly(repo_key, change_users, profiles) if change > 0 else None
                             
-                            if image_path:
-                                # 发送庆祝图片通知
-                                await self.send_image_notification(target_sessions, image_path)
-                            else:
-                                # 图片生成失败，发送庆祝文本通知
-                                await self.send_milestone_text_notification(target_sessions, repo_key, current_stars, change_users)
-                        elif enable_image and github_token:
-                            # 创建通知图片
-                            image_path = await self.create_star_notification_image(
-                                repo_key, change, current_stars, change_users
-                            )
-                            
-                            if image_path:
-                                # 发送图片通知
-                                await self.send_image_notification(target_sessions, image_path)
-                            else:
-                                # 图片生成失败，发送文本通知
-                                await self.send_text_notification_with_users(target_sessions, repo_key, change, current_stars, change_users)
-                        else:
-                            # 发送文本通知
-                            if is_milestone:
-                                await self.send_milestone_text_notification(target_sessions, repo_key, current_stars, change_users)
-                            else:
-                                await self.send_text_notification_with_users(target_sessions, repo_key, change, current_stars, change_users)
+                            self.mark_family_stars(repo_key, change, change_users)
+                            await self.record_change(repo_key, change, current_stars, change_users)
+                            if sessions:
+                                await self.notify_sessions(
+                                    sessions, repo_key, change, current_stars, reported_users, is_milestone, anomaly,
+                                    event_id=f"check:{self.check_seq}",
+                                )
+                        finally:
+                            current_trace.reset(trace_token)
+                            if trace:
+                                trace.done = True
+                                self.record_trace(trace)
                         
                         logger.info(f"GitHub Star Monitor: 检测到 {repo_key} 星标变动: {last_stars} -> {current_stars}")
                     else:
                         # 更新记录的星标数
-                        self.last_star_counts[repo_key] = current_stars
+                        state.stars = current_stars
                     
                 except Exception as e:
-                    logger.error(f"GitHub Star Monitor: 检查仓库 {repo_url} 时出错: {e}")
+                    logger.error(f"GitHub Star Monitor: 检查仓库 {state.key} 时出错: {e}")
+            
+            if self.shard:
+                # 处理完变动后再写入，接手的实例不会重复通知已发送过的变动
+                latest = {state.key: state.stars for state in repositories if state.stars is not None}
+                try:
+                    await asyncio.to_thread(self.shard.store_counts, latest)
+                except Exception as e:
+                    logger.warning(f"GitHub Star Monitor: 写入分片星标数失败: {e}")
+            self.last_cycle = (cycle_started, time.time() - cycle_started)
+            self.refresh_query_snapshot()
         finally:
             self.is_monitoring = False
+    def mark_family_stars(self, repo_key: str, change: int, users: List[Stargazer]):
+        """标出新stargazer还star过哪些被监控仓库，并加入索引，无需任何API请求"""
+        if self.stargazer_index is None or change <= 0 or repo_key not in self.stargazer_index.bitmaps:
+            return
+        for user in users:
+            user.family_repos = self.stargazer_index.repo_count(user.login, exclude=repo_key)
+        self.stargazer_index.add(repo_key, (user.login for user in users))
+    
+    async def run_overlap_sync(self):
+        """启动时加载索引，之后按 overlap_sync_hours 定期同步"""
+        await asyncio.to_thread(self.stargazer_index.load)
+        while True:
+            try:
+                await self.sync_stargazer_index()
+            except Exception as e:
+                logger.error(f"GitHub Star Monitor: 同步stargazer索引出错: {e}")
+            await asyncio.sleep(max(1.0, self.config.get("overlap_sync_hours", 24)) * 3600)
+    
+    async def sync_stargazer_index(self):
+        """逐页同步各仓库的完整stargazer列表，每页带 If-None-Match，未变化的页不消耗额度"""
+        index = self.stargazer_index
+        max_stars = self.config.get("overlap_max_stars", 40000)
+        repos = [
+            state for state in await self.filter_owned_repos(self.get_monitored_repos())
+            if state.stars is not None and state.stars <= max_stars
+        ]
+        for repo_key in set(index.bitmaps) - {state.key for state in repos}:
+            index.remove_repo(repo_key)
+        semaphore = asyncio.Semaphore(max(1, self.config.get("max_concurrent_requests", 8)))
+        
+        async def fetch_page(state: RepoState, page: int) -> bool:
+            async with semaphore:
+                response = await self.github.request(
+                    f"{self.api_base}/repos/{state.owner}/{state.name}/stargazers", "stargazers",
+                    params={"per_page": 100, "page": page}, etag=index.page_etag(state.key, page), transform=parse_logins,
+                )
+            if response is not None and response.status == 304:
+                return True
+            if response is None or not response.ok:
+                return False
+            index.set_page(state.key, page, response.headers.get("ETag", ""), response.data)
+            return True
+        
+        started = time.time()
+        fetched = 0
+        for state in repos:
+            last_page = max(1, (state.stars + 99) // 100)
+            results = await asyncio.gather(*(fetch_page(state, page) for page in range(1, last_page + 1)))
+            fetched += last_page
+            if all(results):
+                index.rebuild(state.key, last_page)
+            else:
+                logger.warning(f"GitHub Star Monitor: 同步 {state.key} 的stargazer列表不完整，保留上次的结果")
+        # 压缩与写盘在线程中进行，通知时仍会加入新用户，先在事件循环中取快照
+        await asyncio.to_thread(index.save, index.snapshot())
+        logger.info(
+            f"GitHub Star Monitor: stargazer索引已同步，{len(index.bitmaps)} 个仓库，{len(index.logins)} 个用户，"
+            f"{fetched} 页，耗时 {time.time() - started:.1f} 秒"
+        )
+    
+    async def record_change(self, repo_key: str, change: int, stars: int, users: List[Stargazer]):
+        """记录一次星标变动，供汇总与查询接口使用，观测记录在线程中写入"""
+        if self.observations:
+            await asyncio.to_thread(self.observations.record, repo_key, change, stars, users)
+        if self.activity is not None:
+            self.activity.record(repo_key, change, stars, users)
+    
+    def refresh_query_snapshot(self):
+        """重新生成查询接口的全部响应"""
+        if not self.query_api:
+            return
+        started = time.perf_counter()
+        cycle_started, cycle_duration = self.last_cycle
+        status = {
+            "generated_at": round(time.time(), 3),
+            "last_check_at": round(cycle_started, 3) if cycle_started else None,
+            "last_check_duration": round(cycle_duration, 3),
+            "check_interval": self.config.get("check_interval", 60),
+            "webhook": self.webhook_server is not None,
+            "circuit_open": self.github.breaker.is_open,
+        }
+        if self.shard:
+            status["instance_id"] = self.shard.instance_id
+            status["shard_members"] = len(self.shard.members)
+        repos = self.get_monitored_repos()
+        if self.shard:
+            repos = [state for state in repos if state.key in self.owned_repo_keys]
+        self.query_api.update(build_snapshot(repos, self.activity, status))
+        logger.debug(f"GitHub Star Monitor: 查询接口快照已更新，耗时 {(time.perf_counter() - started) * 1000:.1f}ms")
+    
+    async def start_query_api(self):
+        """启动只读查询接口，并从观测记录恢复最近7天的变动"""
+        if self.observations:
+            records = await asyncio.to_thread(lambda: list(self.observations.records(time.time() - HISTORY_WINDOW)))
+            self.activity.load(records)
+        server = QueryAPIServer(
+            host=self.config.get("query_api_host", "127.0.0.1"),
+            port=self.config.get("query_api_port", 6191),
+            token=self.config.get("query_api_token", ""),
+        )
+        try:
+            await server.start()
+            self.query_api = server
+            self.refresh_query_snapshot()
+        except Exception as e:
+            logger.error(f"GitHub Star Monitor: 启动查询接口失败: {e}")
+    
+    async def notify_star_change(self, target_sessions: list, repo_key: str, change: int, current_stars: int, change_users: List[Stargazer], is_milestone: bool = False, anomaly: Optional[AnomalyResult] = None, event_id: str = ""):
+        """根据配置发送星标变动通知（轮询与Webhook共用）
+
+        anomaly 为刷星检测标记的可疑结果；event_id 标识检测到这次变动的检查轮次或Webhook投递。
+        """
+        # 同一次变动只通知一次，重放或轮询与Webhook重复检测时由出站队列去重。
+        # 键只由确定的数据组成：新增star以最新stargazer及其starred_at区分，轮询与Webhook
+        # 得到的键相同；没有stargazer时（如取消star）以检查轮次或Webhook投递ID区分
+        if change > 0 and change_users:
+            marker = f"{change_users[0].login}@{change_users[0].starred_at}"
+        else:
+            marker = event_id
+        dedup_key = f"{repo_key}:{current_stars - change}->{current_stars}"
+        if marker:
+            dedup_key += f":{marker}"
+        # 根据配置决定发送方式
+        enable_image = self.config.get("enable_image_notification", True)
+        github_token = self.token_pool.has_token()
+        
+        if is_milestone and enable_image and github_token:
+            # 创建特殊的庆祝图片
+            image_path = await self.create_milestone_celebration_image(
+                repo_key, current_stars, change_users
+            )
+            
+            if image_path:
+                # 发送庆祝图片通知
+                await self.send_image_notification(target_sessions, image_path, dedup_key)
+            else:
+                # 图片生成失败，发送庆祝文本通知
+                await self.send_milestone_text_notification(target_sessions, repo_key, current_stars, change_users, dedup_key)
+        elif enable_image and github_token:
+            # 创建通知图片
+            image_path = await self.create_star_notification_image(
+                repo_key, change, current_stars, change_users, anomaly
+            )
+            
+            if image_path:
+                # 发送图片通知
+                await self.send_image_notification(target_sessions, image_path, dedup_key)
+            else:
+                # 图片生成失败，发送文本通知
+                await self.send_text_notification_with_users(target_sessions, repo_key, change, current_stars, change_users, dedup_key, anomaly)
+        else:
+            # 发送文本通知
+            if is_milestone:
+                await self.send_milestone_text_notification(target_sessions, repo_key, current_stars, change_users, dedup_key)
+            else:
+                await self.send_text_notification_with_users(target_sessions, repo_key, change, current_stars, change_users, dedup_key, anomaly)
+
     def parse_github_url(self, url: str) -> Optional[tuple]:
         """解析GitHub仓库URL，返回(owner, repo)"""
         try:
@@ -211,74 +948,103 @@ class GitHubStarMonitor(Star):
             return None
         except Exception:
             return None
+    def build_token_pool(self, previous: Optional[TokenPool] = None) -> TokenPool:
+        """根据配置构建Token池，github_token 与 github_tokens 合并去重
+        
+        传入旧的Token池时，仍在配置中的Token会保留其额度与隔离状态。
+        """
+        tokens = [self.config.get("github_token", "")]
+        tokens.extend(self.config.get("github_tokens", []) or [])
+        pool = TokenPool(tokens)
+        if previous is not None:
+            for token in pool.states:
+                if token in previous.states:
+                    pool.states[token] = previous.states[token]
+        return pool
+    
     async def get_repo_stars(self, owner: str, repo: str) -> Optional[int]:
         """获取GitHub仓库的星标数"""
-        try:
-            url = f"https://api.github.com/repos/{owner}/{repo}"
-            
-            # 准备请求头
-            headers = {
-                'User-Agent': 'AstrBot-GitHub-Star-Monitor/1.0.0',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            # 如果配置了GitHub Token，添加认证头
-            github_token = self.config.get("github_token", "").strip()
-            if github_token:
-                headers['Authorization'] = f'Bearer {github_token}'
-                logger.debug(f"GitHub Star Monitor: 使用认证请求访问 {owner}/{repo}")
-            else:
-                logger.debug(f"GitHub Star Monitor: 使用未认证请求访问 {owner}/{repo}")
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("stargazers_count", 0)
-                    elif response.status == 401:
-                        logger.error(f"GitHub Star Monitor: GitHub Token无效或已过期")
-                        return None
-                    elif response.status == 403:
-                        # 检查是否是API限制
-                        rate_limit_remaining = response.headers.get('X-RateLimit-Remaining', 'unknown')
-                        rate_limit_reset = response.headers.get('X-RateLimit-Reset', 'unknown')
-                        if rate_limit_remaining == '0':
-                            logger.warning(f"GitHub Star Monitor: GitHub API限制已耗尽，重置时间: {rate_limit_reset}")
-                        else:
-                            logger.warning(f"GitHub Star Monitor: GitHub API返回403，可能是权限不足")
-                        return None
-                    elif response.status == 404:
-                        logger.warning(f"GitHub Star Monitor: 仓库 {owner}/{repo} 不存在或无法访问")
-                        return None
-                    else:
-                        logger.warning(f"GitHub Star Monitor: GitHub API 返回状态码 {response.status}")
-                        return None
-        except asyncio.TimeoutError:
-            logger.warning(f"GitHub Star Monitor: 获取 {owner}/{repo} 星标数超时")
+        # 仓库信息在请求层即被缩减为星标数，不保留完整的响应字典
+        response = await self.github.request(
+            f"{self.api_base}/repos/{owner}/{repo}", "repo", transform=parse_repo_stars
+        )
+        if response is None or not response.ok:
+            logger.warning(GitHubClient.describe_failure(response, f"GitHub Star Monitor: 获取 {owner}/{repo} 星标数失败"))
             return None
-        except Exception as e:
-            logger.error(f"GitHub Star Monitor: 获取 {owner}/{repo} 星标数出错: {e}")
-            return None
-    async def send_notification(self, target_sessions: list, message: str):
-        """发送通知到目标会话"""
+        return response.data
+    @traced("send")
+    async def send_notification(self, target_sessions: list, message: str, dedup_key: Optional[str] = None):
+        """发送通知到目标会话（经由出站队列，失败会自动重试）"""
+        for session_id in target_sessions:
+            self.outbox.enqueue(session_id, "text", message, dedup_key)
+        if not self.outbox.batch_window:
+            await self.outbox.drain()
+    
+    async def deliver_message(self, session_id: str, kind: str, payload: str):
+        """出站队列的实际发送函数，发送失败时抛出异常以触发重试"""
         # 根据AstrBot文档，需要创建一个具有chain属性的对象
         class MessageChain:
             def __init__(self, chain):
                 self.chain = chain
         
-        message_chain = MessageChain([Comp.Plain(message)])
+        if kind == "image":
+            if not os.path.exists(payload):
+                logger.warning(f"GitHub Star Monitor: 图片文件已不存在，跳过发送: {payload}")
+                return
+            # 使用本地文件路径
+            message_chain = MessageChain([Comp.Image.fromFileSystem(payload)])
+        else:
+            message_chain = MessageChain([Comp.Plain(payload)])
         
-        for session_id in target_sessions:
-            try:
-                await self.context.send_message(session_id, message_chain)
-                logger.info(f"GitHub Star Monitor: 已向会话 {session_id} 发送通知")
-            except Exception as e:
-                logger.error(f"GitHub Star Monitor: 向会话 {session_id} 发送通知失败: {e}")
+        result = await self.context.send_message(session_id, message_chain)
+        if result is False:
+            raise RuntimeError("未找到会话对应的平台")
+        logger.info(f"GitHub Star Monitor: 已向会话 {session_id} 发送{'图片' if kind == 'image' else ''}通知")
+    
+    async def deliver_batch(self, session_id: str, items: list):
+        """把同一会话缓冲的多条通知合并为一条消息发送
+
+        QQ（aiocqhttp）上以合并转发的形式发送，每条通知一个节点；其他平台把文字和图片依次放进同一条消息。
+        """
+        class MessageChain:
+            def __init__(self, chain):
+                self.chain = chain
+        
+        parts = []
+        for item in items:
+            if item.kind == "image":
+                if os.path.exists(item.payload):
+                    parts.append(Comp.Image.fromFileSystem(item.payload))
+                else:
+                    logger.warning(f"GitHub Star Monitor: 图片文件已不存在，跳过发送: {item.payload}")
+            else:
+                parts.append(Comp.Plain(item.payload))
+        if not parts:
+            return
+        if self.config.get("notification_batch_forward", True) and session_id.startswith("aiocqhttp:"):
+            nodes = [Comp.Node(content=[part], name="GitHub Star Monitor", uin="0") for part in parts]
+            chain = [Comp.Nodes(nodes)]
+        else:
+            chain = []
+            for part in parts:
+                if chain:
+                    chain.append(Comp.Plain("\n\n"))
+                chain.append(part)
+        result = await self.context.send_message(session_id, MessageChain(chain))
+        if result is False:
+            raise RuntimeError("未找到会话对应的平台")
+        logger.info(f"GitHub Star Monitor: 已向会话 {session_id} 合并发送 {len(items)} 条通知")
+    
+    def record_trace(self, trace: Trace):
+        """检测流程结束且出站队列中的通知都已送达（或丢弃）后写入延迟追踪记录"""
+        if trace.done and not trace.pending and self.trace_recorder:
+            self.trace_recorder.record(trace)
     
     @filter.command("star_status")
     async def star_status(self, event: AstrMessageEvent):
         """查看当前监控的仓库星标状态"""
-        repositories = self.config.get("repositories", [])
+        await self.reload_config_if_changed()
+        repositories = self.get_monitored_repos()
         
         if not repositories:
             yield event.plain_result("❌ 当前没有配置要监控的仓库")
@@ -286,30 +1052,32 @@ class GitHubStarMonitor(Star):
         
         status_text = "⭐ GitHub仓库星标监控状态\n\n"
         
-        for repo_url in repositories:
-            repo_info = self.parse_github_url(repo_url)
-            if not repo_info:
-                status_text += f"❌ 无效URL: {repo_url}\n"
-                continue
-            
-            owner, repo = repo_info
-            repo_key = f"{owner}/{repo}"
-            
-            try:
-                current_stars = await self.get_repo_stars(owner, repo)
-                if current_stars is not None:
-                    status_text += f"🌟 {repo_key}: {current_stars} stars\n"
-                else:
-                    status_text += f"❌ {repo_key}: 获取失败\n"
-            except Exception as e:
-                status_text += f"❌ {repo_key}: 检查出错\n"
+        # 直接使用轮询记录的星标数，org:/user: 展开的仓库再多也不会产生请求
+        for state in repositories:
+            repo_key = state.key
+            if state.stars is not None:
+                status_text += f"🌟 {repo_key}: {state.stars} stars\n"
+            elif self.shard and repo_key not in self.owned_repo_keys:
+                status_text += f"🧩 {repo_key}: 由其他实例负责\n"
+            else:
+                status_text += f"❌ {repo_key}: 尚未获取到星标数\n"
+        
+        cycle_started, _ = self.last_cycle
+        if cycle_started:
+            status_text += f"\n🕒 最近检查: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cycle_started))}"
+        
+        if self.shard:
+            status_text += (
+                f"\n🧩 分片: 本实例 {self.shard.instance_id} 负责 {len(self.owned_repo_keys)} 个仓库，"
+                f"共 {len(self.shard.members)} 个实例"
+            )
         
         yield event.plain_result(status_text.strip())
     
     @filter.command("star_test")
     async def star_test(self, event: AstrMessageEvent):
         """测试星标监控功能"""
-        target_sessions = self.config.get("target_sessions", [])
+        target_sessions = self.routing.all_sessions()
         
         test_message = "🧪 这是一条测试消息\n\n"
         test_message += "如果您收到这条消息，说明GitHub星标监控插件的通知功能正常工作。\n"
@@ -337,267 +1105,366 @@ class GitHubStarMonitor(Star):
     async def star_rate_limit(self, event: AstrMessageEvent):
         """检查GitHub API使用限制"""
         try:
-            url = "https://api.github.com/rate_limit"
+            url = f"{self.api_base}/rate_limit"
             
-            # 准备请求头
-            headers = {
-                'User-Agent': 'AstrBot-GitHub-Star-Monitor/1.0.0',
-                'Accept': 'application/vnd.github.v3+json'
-            }
+            # 未配置Token时查询未认证额度，否则逐个查询Token池中的Token
+            token_states = self.token_pool.all_states()
+            targets = [state.token for state in token_states] or [None]
             
-            # 如果配置了GitHub Token，添加认证头
-            github_token = self.config.get("github_token", "").strip()
-            if github_token:
-                headers['Authorization'] = f'Bearer {github_token}'
+            rate_info = "📊 GitHub API 使用情况\n"
+            if token_states:
+                rate_info += f"🔑 认证状态: 已认证（{len(token_states)} 个Token）\n"
+            else:
+                rate_info += "🔓 认证状态: 未认证\n"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        core_rate = data['resources']['core']
-                        
-                        rate_info = "📊 GitHub API 使用情况\n\n"
-                        
-                        if github_token:
-                            rate_info += "🔑 认证状态: 已认证\n"
-                        else:
-                            rate_info += "🔓 认证状态: 未认证\n"
-                        
-                        rate_info += f"剩余请求: {core_rate['remaining']}/{core_rate['limit']}\n"
-                        
-                        # 计算重置时间
-                        import datetime
-                        reset_time = datetime.datetime.fromtimestamp(core_rate['reset'])
-                        rate_info += f"重置时间: {reset_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                        
-                        # 计算百分比
-                        used_percent = ((core_rate['limit'] - core_rate['remaining']) / core_rate['limit']) * 100
-                        rate_info += f"使用百分比: {used_percent:.1f}%\n"
-                        
-                        if core_rate['remaining'] < 100:
-                            rate_info += "\n⚠️ 剩余请求较少，建议配置GitHub Token"
-                        
-                        yield event.plain_result(rate_info)
-                    else:
-                        yield event.plain_result(f"❌ 无法获取API限制信息，状态码: {response.status}")
+            total_remaining = 0
+            for token in targets:
+                state = self.token_pool.states.get(token) if token else None
+                name = state.masked if state else "未认证"
+                
+                # 逐个指定Token查询，401的Token会由请求层自动隔离
+                response = await self.github.request(url, "rate_limit", token=token)
+                if response is None or not response.ok:
+                    status = response.status if response is not None else "网络错误"
+                    rate_info += f"\n❌ {name}: 无法获取API限制信息，状态码: {status}\n"
+                    continue
+                core_rate = response.data['resources']['core']
+                
+                # /rate_limit 本身不消耗额度，顺便同步Token池的状态
+                if state:
+                    state.limit = core_rate['limit']
+                    state.remaining = core_rate['remaining']
+                    state.reset = core_rate['reset']
+                total_remaining += core_rate['remaining']
+                
+                reset_time = datetime.fromtimestamp(core_rate['reset'])
+                used_percent = ((core_rate['limit'] - core_rate['remaining']) / core_rate['limit']) * 100 if core_rate['limit'] else 0
+                rate_info += f"\n{'⛔' if state and state.quarantined else '🔹'} {name}\n"
+                rate_info += f"剩余请求: {core_rate['remaining']}/{core_rate['limit']}\n"
+                rate_info += f"重置时间: {reset_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                rate_info += f"使用百分比: {used_percent:.1f}%\n"
+            
+            quarantined = [state.masked for state in token_states if state.quarantined]
+            if quarantined:
+                rate_info += f"\n⛔ 已隔离的无效Token: {', '.join(quarantined)}"
+            if total_remaining < 100:
+                rate_info += "\n⚠️ 剩余请求较少，建议配置更多GitHub Token"
+            
+            yield event.plain_result(rate_info.strip())
         except Exception as e:
             yield event.plain_result(f"❌ 检查API限制失败: {e}")
-    async def get_recent_star_events(self, owner: str, repo: str) -> List[dict]:
+    
+    @filter.command("star_latency")
+    async def star_latency(self, event: AstrMessageEvent):
+        """查看星标变动从发生到送达的延迟统计"""
+        if not self.trace_recorder:
+            yield event.plain_result("❌ 未开启延迟追踪（enable_latency_trace）")
+            return
+        summary = self.trace_recorder.summarize()
+        if not any(stats["count"] for stats in summary.values()):
+            yield event.plain_result("📭 暂无延迟追踪记录")
+            return
+        
+        labels = {
+            "e2e": "端到端（star → 送达）",
+            "detect": "检测延迟（star → 发现）",
+            "change_users": "获取变动用户",
+            "avatar": "下载头像",
+            "enrich": "补全用户资料",
+            "render": "图片渲染",
+            "send": "发送消息",
+        }
+        text = "⏱️ 星标通知延迟统计（最近1000次变动）\n"
+        for name, stats in summary.items():
+            if not stats["count"]:
+                continue
+            text += f"\n{labels.get(name, name)}\n"
+            text += f"p50: {stats['p50']:.2f}s  p99: {stats['p99']:.2f}s  样本: {stats['count']}\n"
+        yield event.plain_result(text.strip())
+    @filter.command("star_overlap")
+    async def star_overlap(self, event: AstrMessageEvent, repo_a: str = "", repo_b: str = ""):
+        """stargazer重合分析：不带参数为整体概况，一个仓库为它与其他仓库的重合，两个仓库为两者的交集"""
+        index = self.stargazer_index
+        if index is None:
+            yield event.plain_result("❌ 未开启stargazer重合分析（enable_stargazer_overlap）")
+            return
+        if not index.bitmaps:
+            yield event.plain_result("⏳ stargazer索引尚未同步完成，请稍后再试")
+            return
+        keys = {repo.lower(): repo for repo in index.bitmaps}
+        selected = []
+        for arg in (repo_a, repo_b):
+            if not arg:
+                continue
+            parsed = self.parse_github_url(arg)
+            repo_key = keys.get(f"{parsed[0]}/{parsed[1]}".lower()) if parsed else None
+            if repo_key is None:
+                yield event.plain_result(f"❌ {arg} 不在stargazer索引中（未监控或星标数超过 overlap_max_stars）")
+                return
+            selected.append(repo_key)
+        
+        if len(selected) == 2:
+            a, b = index.as_int(selected[0]), index.as_int(selected[1])
+            both, either = (a & b).bit_count(), (a | b).bit_count()
+            text = f"🔗 {selected[0]} ∩ {selected[1]}\n\n"
+            text += f"同时star两者: {both} 人（Jaccard {both / either if either else 0:.1%}）\n"
+            text += f"合计: {either} 人\n"
+            text += f"只star了 {selected[0]}: {(a & ~b).bit_count()} 人\n"
+            text += f"只star了 {selected[1]}: {(b & ~a).bit_count()} 人"
+        elif selected:
+            repo_key = selected[0]
+            bitmap = index.as_int(repo_key)
+            total = bitmap.bit_count()
+            exclusive = index.exclusive(repo_key).bit_count()
+            text = f"🔗 {repo_key} 的stargazer（{total} 人）\n\n"
+            text += f"🆕 只star了这一个仓库（家族新面孔）: {exclusive} 人（{exclusive / total if total else 0:.1%}）\n"
+            overlaps = [
+                (other, (bitmap & index.as_int(other)).bit_count()) for other in index.bitmaps if other != repo_key
+            ]
+            overlaps = sorted((item for item in overlaps if item[1]), key=lambda item: item[1], reverse=True)[:10]
+            if overlaps:
+                text += "\n重合最多的仓库:\n"
+                for other, count in overlaps:
+                    text += f"• {other}: {count} 人（{count / total:.1%}）\n"
+        else:
+            union = index.union(index.bitmaps)
+            multi = index.multi_starred()
+            text = f"🔗 stargazer重合概况（{len(index.bitmaps)} 个仓库）\n\n"
+            text += f"去重后的stargazer: {union.bit_count()} 人\n"
+            text += f"star了多个仓库: {multi.bit_count()} 人\n"
+            top = index.top_users(10)
+            if top:
+                text += "\n⭐ star仓库最多的用户:\n"
+                for login, count in top:
+                    text += f"• @{login}: {count} 个仓库\n"
+        yield event.plain_result(text.strip())
+    
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("star_profile")
+    async def star_profile(self, event: AstrMessageEvent, seconds: int = 30, mode: str = ""):
+        """采样分析插件占用事件循环的热点函数与内存分配，mode 为 check 时在窗口内立即执行一轮检查"""
+        if self.profiler is not None:
+            yield event.plain_result("⏳ 已有一次性能分析正在进行")
+            return
+        seconds = max(5, min(int(seconds), 300))
+        self.profiler = SamplingProfiler()
+        self.profiler.start()
+        yield event.plain_result(f"🔬 开始采样 {seconds} 秒{'，并立即执行一轮检查' if mode == 'check' else ''}...")
+        started = time.monotonic()
+        try:
+            if mode == "check":
+                await self.check_repositories()
+            await asyncio.sleep(max(0.0, seconds - (time.monotonic() - started)))
+        finally:
+            report = self.profiler.stop()
+            self.profiler = None
+        
+        if self.config.get("enable_image_notification", True) and report.stacks:
+            try:
+                from .image_cards import profile_html
+                image_path = await self.render_html_to_image(profile_html(report, flame_nodes(report.stacks)))
+                if image_path:
+                    try:
+                        yield event.image_result(image_path)
+                    finally:
+                        # 直接回复的图片不经过出站队列，发送后在这里删除
+                        try:
+                            os.remove(image_path)
+                        except OSError:
+                            pass
+            except Exception as e:
+                logger.error(f"GitHub Star Monitor: 创建性能分析图片失败: {e}")
+        yield event.plain_result(self.format_profile_text(report))
+    
+    def format_profile_text(self, report: ProfileReport) -> str:
+        text = f"🔬 性能分析（{report.duration:.0f}秒，每{report.interval * 1000:.0f}ms采样一次）\n"
+        text += f"插件代码占用事件循环: {report.busy_ratio:.1%}（{report.plugin_samples}/{report.samples} 个样本）\n"
+        samples = report.plugin_samples or 1
+        if report.top_self:
+            text += "\n🔥 自身耗时最多的代码行:\n"
+            for label, count in report.top_self:
+                text += f"{count / samples:6.1%}  {label}\n"
+            text += "\n📚 累计耗时最多的函数:\n"
+            for label, count in report.top_total:
+                text += f"{count / samples:6.1%}  {label}\n"
+        else:
+            text += "\n窗口内插件代码几乎没有占用事件循环，可加上 check 参数在采样期间执行一轮检查\n"
+        if report.allocations:
+            text += "\n🧠 新增内存最多的分配位置:\n"
+            for location, size_kb, count in report.allocations:
+                text += f"+{size_kb:.1f} KB（{count} 块）  {location}\n"
+        return text.strip()
+    
+    @filter.command("star_digest")
+    async def star_digest(self, event: AstrMessageEvent, period: str = "daily"):
+        """预览当前会话的星标汇总，period 为 daily 或 weekly"""
+        if not self.observations:
+            yield event.plain_result("❌ 未配置定时汇总（digests），没有可用的星标观测记录")
+            return
+        period = period.lower() if period.lower() in PERIODS else "daily"
+        until = time.time()
+        since = until - PERIODS[period]
+        stats = await asyncio.to_thread(self.observations.aggregate, since, until)
+        report = build_report(period, since, until, stats, self.digest_filter(event.unified_msg_origin))
+        await self.send_digest([event.unified_msg_origin], report)
+        event.stop_event()
+    
+    def digest_filter(self, session: str):
+        """汇总中包含的仓库：会话出现在路由中时只统计路由到它的仓库，否则统计全部仓库"""
+        if session not in self.routing.all_sessions():
+            return lambda repo_key: True
+        return lambda repo_key: session in self.routing.resolve(repo_key)
+    
+    def load_digest_state(self) -> Dict[str, float]:
+        """读取每个汇总上一次发送的时间点"""
+        path = os.path.join(DATA_DIR, "digest_state.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_digest_state(self, state: Dict[str, float]):
+        path = os.path.join(DATA_DIR, "digest_state.json")
+        try:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+        except OSError as e:
+            logger.warning(f"GitHub Star Monitor: 保存汇总状态失败: {e}")
+    
+    async def run_digests(self):
+        """按配置的时间发送日报/周报"""
+        state = self.load_digest_state()
+        while True:
+            try:
+                await self.send_due_digests(state)
+            except Exception as e:
+                logger.error(f"GitHub Star Monitor: 发送定时汇总出错: {e}")
+            await asyncio.sleep(60)
+    
+    async def send_due_digests(self, state: Dict[str, float]):
+        """发送已到时间的汇总，同一周期、同一时间点的会话共用一次聚合"""
+        now = datetime.now()
+        due_groups: Dict[tuple, list] = {}
+        for schedule in self.digest_schedules:
+            due = schedule.last_due(now).timestamp()
+            if schedule.key not in state:
+                # 首次启用（包括运行中新增）时从下一个发送时间开始，不补发启用之前的汇总
+                state[schedule.key] = due
+                self.save_digest_state(state)
+            elif due > state[schedule.key]:
+                due_groups.setdefault((schedule.period, due), []).append(schedule)
+        if due_groups and self.shard and not self.shard.owns(DIGEST_SHARD_KEY):
+            # 分片模式下只由一个实例发送汇总，其他实例只推进进度，接手后不会补发
+            for (_, due), schedules in due_groups.items():
+                for schedule in schedules:
+                    state[schedule.key] = due
+            self.save_digest_state(state)
+            return
+        for (period, due), schedules in due_groups.items():
+            since = due - PERIODS[period]
+            stats = await asyncio.to_thread(self.observations.aggregate, since, due)
+            for schedule in schedules:
+                report = build_report(period, since, due, stats, self.digest_filter(schedule.session))
+                await self.send_digest([schedule.session], report, f"digest:{schedule.key}:{int(due)}")
+                state[schedule.key] = due
+                logger.info(f"GitHub Star Monitor: 已向会话 {schedule.session} 发送{report.title}")
+            self.save_digest_state(state)
+    
+    async def send_digest(self, target_sessions: list, report: DigestReport, dedup_key: Optional[str] = None):
+        """发送汇总，开启图片通知时渲染为一张卡片"""
+        if self.config.get("enable_image_notification", True) and self.token_pool.has_token():
+            image_path = await self.create_digest_image(report)
+            if image_path:
+                await self.send_image_notification(target_sessions, image_path, dedup_key)
+                return
+        await self.send_notification(target_sessions, self.format_digest_text(report), dedup_key)
+    
+    async def create_digest_image(self, report: DigestReport) -> str:
+        """创建汇总图片"""
+        try:
+            from .image_cards import digest_html
+            return await self.render_html_to_image(digest_html(report))
+        except Exception as e:
+            logger.error(f"GitHub Star Monitor: 创建汇总图片失败: {e}")
+            return ""
+    
+    def format_digest_text(self, report: DigestReport) -> str:
+        """汇总的文本格式"""
+        message = f"📊 {report.title}\n"
+        message += f"🕒 {report.period_text}\n\n"
+        message += f"⭐ 新增star: +{report.total_new}  取消star: -{report.total_lost}\n"
+        message += f"📁 有变动的仓库: {report.repo_count}\n"
+        if report.top_repos:
+            message += "\n🏆 涨星排行:\n"
+            for rank, (repo_key, net, stars) in enumerate(report.top_repos, 1):
+                message += f"{rank}. {repo_key} +{net}（{stars}）\n"
+        else:
+            message += "\n本周期没有仓库新增star\n"
+        if report.notable:
+            message += "\n👤 值得关注的用户:\n"
+            for username, repo_count, notable in report.notable:
+                message += f"• {'🏅 ' if notable else ''}@{username}" + (f"（star了{repo_count}个仓库）" if repo_count > 1 else "") + "\n"
+        return message.strip()
+    async def get_recent_star_events(self, owner: str, repo: str) -> List[Stargazer]:
         """获取最近的star事件"""
-        github_token = self.config.get("github_token", "").strip()
-        if not github_token:
+        if not self.token_pool.has_token():
             return []
         
         try:
-            url = f"https://api.github.com/repos/{owner}/{repo}/events"
-            
-            headers = {
-                'User-Agent': 'AstrBot-GitHub-Star-Monitor/1.0.0',
-                'Accept': 'application/vnd.github.v3+json',
-                'Authorization': f'Bearer {github_token}'
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        events = await response.json()
-                        # 只返回WatchEvent (star/unstar)
-                        star_events = [event for event in events if event.get('type') == 'WatchEvent']
-                        return star_events[:5]  # 返回最近5个star事件
-                    else:
-                        logger.warning(f"GitHub Star Monitor: 获取事件失败，状态码: {response.status}")
-                        return []
+            # 只保留WatchEvent (star/unstar)
+            response = await self.github.request(
+                f"{self.api_base}/repos/{owner}/{repo}/events", "events", transform=parse_watch_events
+            )
+            if response is None or not response.ok:
+                logger.warning(GitHubClient.describe_failure(response, f"GitHub Star Monitor: 获取 {owner}/{repo} 事件失败"))
+                return []
+            return response.data[:5]  # 返回最近5个star事件
         except Exception as e:
             logger.error(f"GitHub Star Monitor: 获取star事件失败: {e}")
             return []    
+    @traced("avatar")
     async def download_avatar_base64(self, avatar_url: str) -> Optional[str]:
         """下载用户头像并转换为base64"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(avatar_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        avatar_data = await response.read()
-                        import base64
-                        return base64.b64encode(avatar_data).decode('utf-8')
+            # 头像来自CDN，不携带Token，也不计入API额度
+            response = await self.github.request(avatar_url, "avatar", auth=False, parse="bytes")
+            if response is not None and response.ok:
+                import base64
+                return base64.b64encode(response.data).decode('utf-8')
         except Exception as e:
             logger.error(f"GitHub Star Monitor: 下载头像失败: {e}")
-        return None    
-    async def create_star_notification_image(self, repo_key: str, change: int, current_stars: int, star_events: List[dict]) -> str:
+        return None
+
+    async def avatar_src(self, user: Stargazer) -> str:
+        """卡片中头像的地址：渲染进程中的浏览器可以自行加载头像链接，进程内渲染时下载并内嵌为base64"""
+        if not user.avatar_url:
+            return ""
+        if self.renderer.loads_remote_images:
+            return html.escape(user.avatar_url, quote=True)
+        avatar_data = await self.download_avatar_base64(user.avatar_url)
+        return f"data:image/png;base64,{avatar_data}" if avatar_data else ""
+
+    async def create_star_notification_image(self, repo_key: str, change: int, current_stars: int, star_events: List[Stargazer], anomaly: Optional[AnomalyResult] = None) -> str:
         """创建星标变动通知图片 - 使用HTML渲染"""
         try:
-            # 准备用户数据
-            users_html = ""
+            # 准备用户数据：(用户名, 头像data URI)
+            users = []
             if star_events and len(star_events) > 0:
-                for i, event in enumerate(star_events[:3]):  # 最多显示3个用户
-                    user = event.get('actor', {})
-                    username = user.get('login', '未知用户')
-                    avatar_url = user.get('avatar_url', '')
-                    
-                    # 下载头像并转换为base64
-                    avatar_base64 = ""
-                    if avatar_url:
-                        avatar_data = await self.download_avatar_base64(avatar_url)
-                        if avatar_data:
-                            avatar_base64 = f"data:image/png;base64,{avatar_data}"
-                    
-                    # 添加用户HTML
-                    users_html += f"""
-                    <div class="user-item">
-                        <div class="avatar-container">
-                            <img class="avatar" src="{avatar_base64 or 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNTAiIGhlaWdodD0iNTAiIHZpZXdCb3g9IjAgMCA1MCA1MCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPGNpcmNsZSBjeD0iMjUiIGN5PSIyNSIgcj0iMjUiIGZpbGw9IiNEREREREQiLz4KPHN2ZyB4PSIxNSIgeT0iMTUiIHdpZHRoPSIyMCIgaGVpZ2h0PSIyMCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSIjOTk5OTk5Ij4KPHA+VXNlcjwvcD4KPHN2Zz4KPC9zdmc+'}" alt="avatar" />
-                        </div>
-                        <div class="user-info">
-                            <div class="username">@{username}</div>
-                        </div>
-                    </div>
-                    """
+                for user in star_events[:3]:  # 最多显示3个用户
+                    avatar_base64 = await self.avatar_src(user)
+                    detail = user.profile.summary() if user.profile else ""
+                    if user.family_repos and change > 0:
+                        detail = " · ".join(filter(None, [detail, f"已star我们的 {user.family_repos + 1} 个仓库"]))
+                    users.append((user.login, avatar_base64, detail, user.notable))
             
-            # 创建HTML模板
-            html_template = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    body {{
-                        margin: 0;
-                        padding: 40px;
-                        font-family: 'Microsoft YaHei', 'Helvetica Neue', Arial, sans-serif;
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        min-height: 520px;
-                        box-sizing: border-box;
-                    }}
-                    .container {{
-                        background: white;
-                        border-radius: 20px;
-                        padding: 40px;
-                        box-shadow: 0 20px 60px rgba(0,0,0,0.1);
-                        max-width: 720px;
-                        margin: 0 auto;
-                    }}
-                    .title {{
-                        font-size: 32px;
-                        font-weight: bold;
-                        text-align: center;
-                        color: #2c3e50;
-                        margin-bottom: 30px;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        gap: 10px;
-                    }}
-                    .repo-info {{
-                        background: #f8f9fa;
-                        border-radius: 12px;
-                        padding: 20px;
-                        margin-bottom: 25px;
-                        border-left: 4px solid #667eea;
-                    }}
-                    .repo-name {{
-                        font-size: 24px;
-                        font-weight: bold;
-                        color: #2c3e50;
-                        margin-bottom: 10px;
-                    }}
-                    .stats {{
-                        display: flex;
-                        gap: 30px;
-                        align-items: center;
-                    }}
-                    .stat-item {{
-                        display: flex;
-                        align-items: center;
-                        gap: 8px;
-                    }}
-                    .change {{
-                        font-size: 20px;
-                        font-weight: bold;
-                        color: {'#27ae60' if change > 0 else '#e74c3c'};
-                    }}
-                    .current-stars {{
-                        font-size: 20px;
-                        color: #2c3e50;
-                    }}
-                    .users-section {{
-                        margin-top: 30px;
-                    }}
-                    .users-title {{
-                        font-size: 20px;
-                        font-weight: bold;
-                        color: #2c3e50;
-                        margin-bottom: 20px;
-                    }}
-                    .user-item {{
-                        display: flex;
-                        align-items: center;
-                        gap: 15px;
-                        padding: 15px;
-                        background: #f8f9fa;
-                        border-radius: 12px;
-                        margin-bottom: 12px;
-                        transition: transform 0.2s;
-                    }}
-                    .user-item:hover {{
-                        transform: translateX(5px);
-                    }}
-                    .avatar-container {{
-                        flex-shrink: 0;
-                    }}
-                    .avatar {{
-                        width: 50px;
-                        height: 50px;
-                        border-radius: 50%;
-                        border: 3px solid #667eea;
-                        object-fit: cover;
-                    }}
-                    .user-info {{
-                        flex: 1;
-                    }}
-                    .username {{                        font-size: 16px;
-                        font-weight: 600;
-                        color: #2c3e50;
-                        margin-bottom: 4px;
-                    }}
-                    .star-icon {{
-                        color: #f39c12;
-                        font-size: 24px;
-                    }}
-                    .trend-icon {{
-                        font-size: 18px;
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="title">
-                        <span class="star-icon">🌟</span>
-                        GitHub 星标变动提醒
-                    </div>
-                    
-                    <div class="repo-info">
-                        <div class="repo-name">{repo_key}</div>
-                        <div class="stats">
-                            <div class="stat-item">
-                                <span class="trend-icon">{'📈' if change > 0 else '📉'}</span>
-                                <span class="change">{'+' if change > 0 else ''}{change}</span>
-                            </div>
-                            <div class="stat-item">
-                                <span>⭐</span>
-                                <span class="current-stars">{current_stars} stars</span>
-                            </div>
-                        </div>
-                    </div>
-                    
-                    {f'''
-                    <div class="users-section">
-                        <div class="users-title">👤 导致此次变动的用户</div>                        {users_html}
-                    </div>
-                    ''' if users_html else ''}
-                </div>
-            </body>
-            </html>
-            """
-              # 使用本地Playwright渲染HTML为图片
+            # 模板代码只在首次生成图片时加载
+            from .image_cards import star_notification_html
+            warning = self.format_anomaly(anomaly) if anomaly else ""
+            html_template = star_notification_html(repo_key, change, current_stars, users, warning)
+
+            # 使用本地Playwright渲染HTML为图片
             image_path = await self.render_html_to_image(html_template)
             return image_path
             
@@ -605,326 +1472,20 @@ class GitHubStarMonitor(Star):
             logger.error(f"GitHub Star Monitor: 创建通知图片失败: {e}")
             return ""
 
-    async def create_milestone_celebration_image(self, repo_key: str, current_stars: int, star_events: List[dict]) -> str:
+    async def create_milestone_celebration_image(self, repo_key: str, current_stars: int, star_events: List[Stargazer]) -> str:
         """创建1万star里程碑庆祝图片"""
         try:
             # 准备第1万个star用户数据
-            milestone_user_html = ""
+            milestone_user = None
             if star_events and len(star_events) > 0:
-                event = star_events[0]  # 获取第一个用户（第1万个star）
-                user = event.get('actor', {})
-                username = user.get('login', '未知用户')
-                avatar_url = user.get('avatar_url', '')
+                user = star_events[0]  # 获取第一个用户（第1万个star）
                 
-                # 下载头像并转换为base64
-                avatar_base64 = ""
-                if avatar_url:
-                    avatar_data = await self.download_avatar_base64(avatar_url)
-                    if avatar_data:
-                        avatar_base64 = f"data:image/png;base64,{avatar_data}"
-                
-                milestone_user_html = f"""
-                <div class="milestone-user">
-                    <div class="milestone-avatar-container">
-                        <img class="milestone-avatar" src="{avatar_base64 or 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iODAiIGhlaWdodD0iODAiIHZpZXdCb3g9IjAgMCA4MCA4MCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPGNpcmNsZSBjeD0iNDAiIGN5PSI0MCIgcj0iNDAiIGZpbGw9IiNEREREREQiLz4KPHN2ZyB4PSIyNSIgeT0iMjUiIHdpZHRoPSIzMCIgaGVpZ2h0PSIzMCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSIjOTk5OTk5Ij4KPHA+VXNlcjwvcD4KPHN2Zz4KPC9zdmc+'}" alt="milestone user avatar" />
-                        <div class="crown">👑</div>
-                    </div>
-                    <div class="milestone-user-info">
-                        <div class="milestone-username">@{username}</div>
-                        <div class="milestone-label">第10,000个Star！</div>
-                    </div>
-                </div>
-                """
+                avatar_base64 = await self.avatar_src(user)
+                milestone_user = (user.login, avatar_base64)
             
-            # 创建庆祝HTML模板
-            html_template = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    @import url('https://fonts.googleapis.com/css2?family=Fredoka+One:wght@400&display=swap');
-                    
-                    body {{
-                        margin: 0;
-                        padding: 40px;
-                        font-family: 'Microsoft YaHei', 'Helvetica Neue', Arial, sans-serif;
-                        background: linear-gradient(135deg, #ff6b6b 0%, #ffd93d 25%, #6bcf7f 50%, #4d79ff 75%, #ff6b6b 100%);
-                        background-size: 400% 400%;
-                        animation: celebration-bg 4s ease infinite;
-                        min-height: 600px;
-                        box-sizing: border-box;
-                        position: relative;
-                    }}
-                    
-                    @keyframes celebration-bg {{
-                        0% {{ background-position: 0% 50%; }}
-                        50% {{ background-position: 100% 50%; }}
-                        100% {{ background-position: 0% 50%; }}
-                    }}
-                    
-                    .fireworks {{
-                        position: absolute;
-                        top: 0;
-                        left: 0;
-                        width: 100%;
-                        height: 100%;
-                        pointer-events: none;
-                        overflow: hidden;
-                    }}
-                    
-                    .firework {{
-                        position: absolute;
-                        width: 4px;
-                        height: 4px;
-                        border-radius: 50%;
-                        animation: firework-explode 2s ease-out infinite;
-                    }}
-                    
-                    .firework:nth-child(1) {{ top: 20%; left: 15%; background: #ff6b6b; animation-delay: 0s; }}
-                    .firework:nth-child(2) {{ top: 30%; left: 85%; background: #ffd93d; animation-delay: 0.5s; }}
-                    .firework:nth-child(3) {{ top: 60%; left: 25%; background: #6bcf7f; animation-delay: 1s; }}
-                    .firework:nth-child(4) {{ top: 50%; left: 75%; background: #4d79ff; animation-delay: 1.5s; }}
-                    
-                    @keyframes firework-explode {{
-                        0% {{ transform: scale(0); opacity: 1; }}
-                        50% {{ transform: scale(20); opacity: 0.8; }}
-                        100% {{ transform: scale(40); opacity: 0; }}
-                    }}
-                    
-                    .container {{
-                        background: rgba(255, 255, 255, 0.95);
-                        border-radius: 25px;
-                        padding: 50px;
-                        box-shadow: 0 30px 80px rgba(0,0,0,0.15);
-                        max-width: 800px;
-                        margin: 0 auto;
-                        text-align: center;
-                        position: relative;
-                        backdrop-filter: blur(10px);
-                    }}
-                    
-                    .celebration-title {{
-                        font-family: 'Fredoka One', cursive;
-                        font-size: 48px;
-                        font-weight: bold;
-                        background: linear-gradient(45deg, #ff6b6b, #ffd93d, #6bcf7f, #4d79ff);
-                        background-size: 300% 300%;
-                        background-clip: text;
-                        -webkit-background-clip: text;
-                        -webkit-text-fill-color: transparent;
-                        animation: celebration-text 3s ease infinite;
-                        margin-bottom: 20px;
-                        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-                    }}
-                    
-                    @keyframes celebration-text {{
-                        0% {{ background-position: 0% 50%; }}
-                        50% {{ background-position: 100% 50%; }}
-                        100% {{ background-position: 0% 50%; }}
-                    }}
-                    
-                    .celebration-subtitle {{
-                        font-size: 24px;
-                        color: #2c3e50;
-                        margin-bottom: 40px;
-                        font-weight: 600;
-                    }}
-                    
-                    .milestone-info {{
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        border-radius: 20px;
-                        padding: 30px;
-                        margin-bottom: 40px;
-                        color: white;
-                        position: relative;
-                        overflow: hidden;
-                    }}
-                    
-                    .milestone-info::before {{
-                        content: '';
-                        position: absolute;
-                        top: -50%;
-                        left: -50%;
-                        width: 200%;
-                        height: 200%;
-                        background: repeating-linear-gradient(
-                            45deg,
-                            transparent,
-                            transparent 10px,
-                            rgba(255,255,255,0.1) 10px,
-                            rgba(255,255,255,0.1) 20px
-                        );
-                        animation: shine 3s linear infinite;
-                    }}
-                    
-                    @keyframes shine {{
-                        0% {{ transform: translateX(-100%) translateY(-100%); }}
-                        100% {{ transform: translateX(100%) translateY(100%); }}
-                    }}
-                    
-                    .repo-name {{
-                        font-size: 32px;
-                        font-weight: bold;
-                        margin-bottom: 15px;
-                        position: relative;
-                        z-index: 1;
-                    }}
-                    
-                    .milestone-stars {{
-                        font-size: 42px;
-                        font-weight: bold;
-                        margin-bottom: 10px;
-                        position: relative;
-                        z-index: 1;
-                        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-                    }}
-                    
-                    .milestone-message {{
-                        font-size: 18px;
-                        position: relative;
-                        z-index: 1;
-                    }}
-                    
-                    .milestone-user {{
-                        background: linear-gradient(135deg, #ffd93d 0%, #ff6b6b 100%);
-                        border-radius: 20px;
-                        padding: 30px;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        gap: 25px;
-                        margin-bottom: 30px;
-                        box-shadow: 0 15px 35px rgba(0,0,0,0.1);
-                    }}
-                    
-                    .milestone-avatar-container {{
-                        position: relative;
-                    }}
-                    
-                    .milestone-avatar {{
-                        width: 80px;
-                        height: 80px;
-                        border-radius: 50%;
-                        border: 4px solid white;
-                        object-fit: cover;
-                        box-shadow: 0 8px 25px rgba(0,0,0,0.2);
-                    }}
-                    
-                    .crown {{
-                        position: absolute;
-                        top: -15px;
-                        right: -10px;
-                        font-size: 24px;
-                        animation: crown-bounce 2s ease infinite;
-                    }}
-                    
-                    @keyframes crown-bounce {{
-                        0%, 100% {{ transform: translateY(0) rotate(0deg); }}
-                        50% {{ transform: translateY(-5px) rotate(10deg); }}
-                    }}
-                    
-                    .milestone-user-info {{
-                        text-align: left;
-                    }}
-                    
-                    .milestone-username {{
-                        font-size: 24px;
-                        font-weight: bold;
-                        color: white;
-                        margin-bottom: 5px;
-                        text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
-                    }}
-                    
-                    .milestone-label {{
-                        font-size: 16px;
-                        color: rgba(255,255,255,0.9);
-                        font-weight: 600;
-                    }}
-                    
-                    .celebration-footer {{
-                        font-size: 18px;
-                        color: #2c3e50;
-                        font-weight: 600;
-                        margin-top: 20px;
-                    }}
-                    
-                    .emoji-rain {{
-                        position: absolute;
-                        top: 0;
-                        left: 0;
-                        width: 100%;
-                        height: 100%;
-                        pointer-events: none;
-                        overflow: hidden;
-                    }}
-                    
-                    .emoji {{
-                        position: absolute;
-                        font-size: 20px;
-                        animation: fall 3s linear infinite;
-                    }}
-                    
-                    .emoji:nth-child(1) {{ left: 10%; animation-delay: 0s; }}
-                    .emoji:nth-child(2) {{ left: 20%; animation-delay: 0.5s; }}
-                    .emoji:nth-child(3) {{ left: 30%; animation-delay: 1s; }}
-                    .emoji:nth-child(4) {{ left: 40%; animation-delay: 1.5s; }}
-                    .emoji:nth-child(5) {{ left: 50%; animation-delay: 2s; }}
-                    .emoji:nth-child(6) {{ left: 60%; animation-delay: 2.5s; }}
-                    .emoji:nth-child(7) {{ left: 70%; animation-delay: 0.3s; }}
-                    .emoji:nth-child(8) {{ left: 80%; animation-delay: 0.8s; }}
-                    .emoji:nth-child(9) {{ left: 90%; animation-delay: 1.3s; }}
-                    
-                    @keyframes fall {{
-                        0% {{ transform: translateY(-100px) rotate(0deg); opacity: 1; }}
-                        100% {{ transform: translateY(calc(100vh + 100px)) rotate(360deg); opacity: 0; }}
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="fireworks">
-                    <div class="firework"></div>
-                    <div class="firework"></div>
-                    <div class="firework"></div>
-                    <div class="firework"></div>
-                </div>
-                
-                <div class="emoji-rain">
-                    <div class="emoji">🎉</div>
-                    <div class="emoji">🎊</div>
-                    <div class="emoji">⭐</div>
-                    <div class="emoji">🏆</div>
-                    <div class="emoji">🎈</div>
-                    <div class="emoji">✨</div>
-                    <div class="emoji">🌟</div>
-                    <div class="emoji">🎁</div>
-                    <div class="emoji">🚀</div>
-                </div>
-                
-                <div class="container">
-                    <div class="celebration-title">
-                        🎉 恭喜达成里程碑！🎉
-                    </div>
-                    
-                    <div class="celebration-subtitle">
-                        GitHub仓库突破1万星标！
-                    </div>
-                    
-                    <div class="milestone-info">
-                        <div class="repo-name">🏆 {repo_key}</div>
-                        <div class="milestone-stars">⭐ {current_stars:,} Stars</div>
-                        <div class="milestone-message">这是一个重要的里程碑时刻！</div>
-                    </div>
-                    
-                    {milestone_user_html if milestone_user_html else ''}
-                    
-                    <div class="celebration-footer">
-                        🎈 让我们继续努力，迈向下一个里程碑！🚀
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
+            # 模板代码只在首次生成图片时加载
+            from .image_cards import milestone_html
+            html_template = milestone_html(repo_key, current_stars, milestone_user)
             
             # 使用本地Playwright渲染HTML为图片
             image_path = await self.render_html_to_image(html_template)
@@ -933,31 +1494,49 @@ class GitHubStarMonitor(Star):
         except Exception as e:
             logger.error(f"GitHub Star Monitor: 创建庆祝图片失败: {e}")
             return ""
-    async def send_image_notification(self, target_sessions: list, image_path: str):
-        """发送图片通知到目标会话"""
-        class MessageChain:
-            def __init__(self, chain):
-                self.chain = chain
-        
-        # 使用本地文件路径
-        message_chain = MessageChain([Comp.Image.fromFileSystem(image_path)])
-        
+    @traced("send")
+    async def send_image_notification(self, target_sessions: list, image_path: str, dedup_key: Optional[str] = None):
+        """发送图片通知到目标会话，图片在所有会话送达后由出站队列清理"""
         for session_id in target_sessions:
-            try:
-                await self.context.send_message(session_id, message_chain)
-                logger.info(f"GitHub Star Monitor: 已向会话 {session_id} 发送图片通知")
-            except Exception as e:
-                logger.error(f"GitHub Star Monitor: 向会话 {session_id} 发送图片通知失败: {e}")
-          # 清理临时图片文件
-        try:
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                logger.debug(f"GitHub Star Monitor: 已清理临时图片文件: {image_path}")
-        except Exception as e:
-            logger.warning(f"GitHub Star Monitor: 清理临时图片文件失败: {e}")
+            self.outbox.enqueue(session_id, "image", image_path, dedup_key)
+        if not self.outbox.batch_window:
+            await self.outbox.drain()
 
     async def terminate(self):
         """插件卸载时调用"""
+        if self.outbox_task:
+            self.outbox_task.cancel()
+            self.outbox_task = None
+        if self.digest_task:
+            self.digest_task.cancel()
+            self.digest_task = None
+        if self.overlap_task:
+            self.overlap_task.cancel()
+            self.overlap_task = None
+        if self.shard_task:
+            self.shard_task.cancel()
+            self.shard_task = None
+        self.outbox.close()
+        if self.webhook_server:
+            await self.webhook_server.stop()
+            self.webhook_server = None
+        if self.query_api:
+            await self.query_api.stop()
+            self.query_api = None
+        await self.github.close()
+        await self.renderer.close()
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler = None
+        if self.profile_cache is not None:
+            self.profile_cache.save()
+        if self.stargazer_index is not None and self.stargazer_index.bitmaps:
+            self.stargazer_index.save()
+        if self.shard:
+            try:
+                await asyncio.to_thread(self.shard.leave)
+            except Exception as e:
+                logger.warning(f"GitHub Star Monitor: 释放分片租约失败: {e}")
         if self.monitoring_task:
             self.monitoring_task.cancel()
             try:
@@ -980,7 +1559,7 @@ class GitHubStarMonitor(Star):
         message += f"仓库链接: https://github.com/{repo_key}"
         await self.send_notification(target_sessions, message)
     
-    async def send_text_notification_with_users(self, target_sessions: list, repo_key: str, change: int, current_stars: int, change_users: List[dict]):
+    async def send_text_notification_with_users(self, target_sessions: list, repo_key: str, change: int, current_stars: int, change_users: List[Stargazer], dedup_key: Optional[str] = None, anomaly: Optional[AnomalyResult] = None):
         """发送包含用户信息的文本通知"""
         change_text = f"+{change}" if change > 0 else str(change)
         action_text = "点了star" if change > 0 else "取消了star"
@@ -989,23 +1568,30 @@ class GitHubStarMonitor(Star):
         message += f"📁 仓库: {repo_key}\n"
         message += f"📊 变动: {change_text}\n"
         message += f"⭐ 当前星标数: {current_stars}\n"
+        if anomaly:
+            message += f"⚠️ {self.format_anomaly(anomaly)}\n"
         # 添加导致变动的用户信息
         if change_users:
             message += f"\n👤 导致此次变动的用户:\n"
-            for i, event in enumerate(change_users):
-                user = event.get('actor', {})
-                username = user.get('login', '未知用户')
-                message += f"• @{username} {action_text}\n"
+            for user in change_users[:10]:
+                message += f"• @{user.login} {action_text}" + (" 🏅" if user.notable else "")
+                if user.family_repos and change > 0:
+                    message += f"（已star我们的 {user.family_repos + 1} 个仓库）"
+                message += "\n"
+                if user.profile:
+                    message += f"  {user.profile.summary()}\n"
+            if len(change_users) > 10:
+                message += f"... 以及其他 {len(change_users) - 10} 位用户\n"
         
         message += f"\n🔗 仓库链接: https://github.com/{repo_key}"
-        await self.send_notification(target_sessions, message)
+        await self.send_notification(target_sessions, message, dedup_key)
 
     async def check_milestone_reached(self, last_stars: int, current_stars: int) -> bool:
         """检查是否达到1万star里程碑"""
         milestone = 10000
         return last_stars < milestone <= current_stars
 
-    async def send_milestone_text_notification(self, target_sessions: list, repo_key: str, current_stars: int, change_users: List[dict]):
+    async def send_milestone_text_notification(self, target_sessions: list, repo_key: str, current_stars: int, change_users: List[Stargazer], dedup_key: Optional[str] = None):
         """发送里程碑庆祝文本通知"""
         message = f"🎉🎊 恭喜！GitHub仓库达到1万star里程碑！🎊🎉\n\n"
         message += f"🏆 仓库: {repo_key}\n"
@@ -1015,16 +1601,17 @@ class GitHubStarMonitor(Star):
         # 添加第1万个star用户信息
         if change_users:
             message += f"\n🌟 第1万个star来自:\n"
-            for event in change_users[:1]:  # 只显示第一个用户
-                user = event.get('actor', {})
-                username = user.get('login', '未知用户')
-                message += f"👤 @{username} - 感谢你的支持！\n"
+            for user in change_users[:1]:  # 只显示第一个用户
+                message += f"👤 @{user.login} - 感谢你的支持！\n"
+                if user.profile:
+                    message += f"   {user.profile.summary()}\n"
         
         message += f"\n🔗 仓库链接: https://github.com/{repo_key}\n"
         message += f"🎈 让我们继续努力，迈向下一个里程碑！"
         
-        await self.send_notification(target_sessions, message)
+        await self.send_notification(target_sessions, message, dedup_key)
 
+    @traced("render")
     async def render_html_to_image(self, html_content: str) -> str:
         """使用本地Playwright将HTML渲染为图片"""
         try:
@@ -1032,98 +1619,66 @@ class GitHubStarMonitor(Star):
             if not os.path.exists("data"):
                 os.makedirs("data")
             
-            image_path = f"data/star_notification_{int(time.time())}.png"
+            # 同一秒内可能渲染多张图片（如多个会话的汇总），文件名加上随机后缀
+            image_path = f"data/star_notification_{int(time.time())}_{uuid.uuid4().hex[:6]}.png"
             
-            async with async_playwright() as p:
-                # 启动浏览器
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-                
-                # 设置视口大小
-                await page.set_viewport_size({"width": 800, "height": 600})
-                
-                # 设置HTML内容
-                await page.set_content(html_content)
-                
-                # 等待页面加载完成
-                await page.wait_for_load_state('networkidle')
-                
-                # 截图
-                await page.screenshot(
-                    path=image_path,
-                    full_page=True,
-                    type='png'
-                )
-                
-                await browser.close()
-                
-                logger.info(f"GitHub Star Monitor: 成功生成通知图片: {image_path}")
-                return image_path
+            await self.renderer.render(html_content, image_path)
+            logger.info(f"GitHub Star Monitor: 成功生成通知图片: {image_path}")
+            return image_path
                 
         except Exception as e:
             logger.error(f"GitHub Star Monitor: Playwright渲染失败: {e}")
             return ""
     
-    async def get_star_change_users(self, owner: str, repo: str, change_count: int) -> List[dict]:
-        """获取导致此次星标变动的具体用户"""
-        github_token = self.config.get("github_token", "").strip()
-        if not github_token:
+    @traced("change_users")
+    async def get_star_change_users(self, owner: str, repo: str, change_count: int, total_stars: Optional[int] = None) -> List[Stargazer]:
+        """获取导致此次星标变动的具体用户，total_stars 为刚查询到的星标数，可省去一次仓库信息请求"""
+        if not self.token_pool.has_token():
             return []
         
         try:
             if change_count > 0:
                 # 新增star：获取最新的stargazers
-                # 首先获取总的star数量来计算最后一页
-                repo_info = await self.get_repo_info(owner, repo)
-                if not repo_info:
-                    return []
+                # 根据总的star数量计算最后一页
+                if total_stars is None:
+                    total_stars = await self.get_repo_stars(owner, repo)
+                    if total_stars is None:
+                        return []
                 
-                total_stars = repo_info.get('stargazers_count', 0)
                 per_page = 100  # GitHub API最大值
                 
                 # 计算最后一页
                 last_page = max(1, (total_stars + per_page - 1) // per_page)
                 
-                url = f"https://api.github.com/repos/{owner}/{repo}/stargazers"
+                # 最新的star位于最后几页，star+json 格式包含时间戳信息。根据变动数量算出
+                # 需要的页并发获取，批量star时也能拿到完整的用户列表；开启刷星检测时
+                # 最多取10页（1000个用户），否则最多取2页
+                max_pages = 10 if self.anomaly_detection else 2
+                first_page = max(1, (total_stars - abs(change_count)) // per_page + 1, last_page - max_pages + 1)
                 
-                headers = {
-                    'User-Agent': 'AstrBot-GitHub-Star-Monitor/1.0.0',
-                    'Accept': 'application/vnd.github.v3.star+json',  # 包含时间戳信息
-                    'Authorization': f'Bearer {github_token}'
-                }
+                async def fetch_page(page: int) -> List[Stargazer]:
+                    params = {
+                        'per_page': per_page,
+                        'page': page
+                    }
+                    response = await self.github.request(
+                        f"{self.api_base}/repos/{owner}/{repo}/stargazers", "stargazers",
+                        params=params, accept='application/vnd.github.v3.star+json', transform=parse_stargazers,
+                    )
+                    if response is None or not response.ok:
+                        logger.warning(GitHubClient.describe_failure(response, f"GitHub Star Monitor: 获取 {owner}/{repo} stargazers失败"))
+                        return []
+                    return response.data
                 
-                # 获取最后一页的数据（包含最新的star用户）
-                params = {
-                    'per_page': per_page,
-                    'page': last_page
-                }
+                pages = await asyncio.gather(*(fetch_page(page) for page in range(first_page, last_page + 1)))
+                stargazers = [user for page in pages for user in page]
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=headers, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                        if response.status == 200:
-                            stargazers = await response.json()
-                            
-                            # 获取最新的几个用户（根据变动数量）
-                            latest_stargazers = stargazers[-abs(change_count):] if stargazers else []
-                            
-                            # 转换为事件格式以保持兼容性
-                            result_events = []
-                            for stargazer in latest_stargazers:
-                                event = {
-                                    'type': 'WatchEvent',
-                                    'actor': stargazer.get('user', {}),
-                                    'created_at': stargazer.get('starred_at', datetime.now().isoformat() + 'Z')
-                                }
-                                result_events.append(event)
-                            
-                            # 按时间排序，最新的在前
-                            result_events.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-                            
-                            logger.info(f"GitHub Star Monitor: 获取到 {len(result_events)} 个最新star用户")
-                            return result_events
-                        else:
-                            logger.warning(f"GitHub Star Monitor: 获取stargazers失败，状态码: {response.status}")
-                            return []
+                # 获取最新的几个用户（根据变动数量），按时间排序，最新的在前
+                latest_stargazers = stargazers[-abs(change_count):] if stargazers else []
+                latest_stargazers.sort(key=lambda user: user.starred_at, reverse=True)
+                
+                logger.info(f"GitHub Star Monitor: 获取到 {len(latest_stargazers)} 个最新star用户")
+                return latest_stargazers
             else:
                 # 取消star：使用events API尝试获取最近的unstar事件
                 return await self.get_recent_unstar_events(owner, repo)
@@ -1132,60 +1687,107 @@ class GitHubStarMonitor(Star):
             logger.error(f"GitHub Star Monitor: 获取变动用户失败: {e}")
             return []
     
-    async def get_repo_info(self, owner: str, repo: str) -> Optional[dict]:
-        """获取GitHub仓库的详细信息"""
+    @traced("enrich")
+    async def enrich_stargazers(self, users: List[Stargazer]) -> List[Optional[UserProfile]]:
+        """查询变动用户的公开资料，未命中缓存的用户合并为批量GraphQL查询
+
+        返回与 users 对应的资料列表；开启资料补全时同时写入用户并标记知名用户。
+        """
+        enrich = self.config.get("enable_stargazer_enrichment", False)
+        needed = enrich or (self.anomaly_detection and len(users) >= self.config.get("anomaly_min_batch", 20))
+        if self.profile_cache is None or not users or not needed or not self.token_pool.has_token():
+            return [None] * len(users)
+        missing = list(dict.fromkeys(user.login for user in users if self.profile_cache.get(user.login) is None))
+        if missing:
+            results = await asyncio.gather(*(self.fetch_user_profiles(logins) for logins in batched(missing)))
+            for profiles in results:
+                for profile in profiles:
+                    self.profile_cache.put(profile)
+        profiles = [self.profile_cache.get(user.login) for user in users]
+        if enrich:
+            for user, profile in zip(users, profiles):
+                user.profile = profile if profile is not None and profile.found else None
+                user.notable = self.is_notable(user.profile)
+        return profiles
+    
+    def detect_anomaly(self, repo_key: str, users: List[Stargazer], profiles: List[Optional[UserProfile]]) -> Optional[AnomalyResult]:
+        """对本次新增的stargazer整体打分，只返回被判定为可疑的结果"""
+        if not self.anomaly_detection:
+            return None
         try:
-            url = f"https://api.github.com/repos/{owner}/{repo}"
-            
-            headers = {
-                'User-Agent': 'AstrBot-GitHub-Star-Monitor/1.0.0',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            github_token = self.config.get("github_token", "").strip()
-            if github_token:
-                headers['Authorization'] = f'Bearer {github_token}'
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        logger.warning(f"GitHub Star Monitor: 获取仓库信息失败，状态码: {response.status}")
-                        return None
+            result = score_batch(
+                users, profiles,
+                threshold=self.config.get("anomaly_threshold", 0.6),
+                min_batch=self.config.get("anomaly_min_batch", 20),
+            )
+        except Exception as e:
+            logger.error(f"GitHub Star Monitor: 刷星检测出错: {e}")
+            return None
+        if result is None or not result.suspicious:
+            return None
+        logger.warning(f"GitHub Star Monitor: {repo_key} 的 {result.size} 个新star{self.format_anomaly(result)}")
+        return result
+    
+    def format_anomaly(self, anomaly: AnomalyResult) -> str:
+        reasons = "，".join(anomaly.reasons())
+        return f"疑似刷星（可疑度 {anomaly.score:.2f}）" + (f"：{reasons}" if reasons else "")
+    
+    async def fetch_user_profiles(self, logins: List[str]) -> List[UserProfile]:
+        """一次GraphQL请求查询多个用户的资料"""
+        query, variables = build_profiles_query(logins)
+        try:
+            response = await self.github.request(
+                f"{self.api_base}/graphql", "graphql", method="POST", json_body={"query": query, "variables": variables}
+            )
         except Exception as e:
-            logger.error(f"GitHub Star Monitor: 获取仓库信息失败: {e}")
+            logger.error(f"GitHub Star Monitor: 查询用户资料出错: {e}")
+            return []
+        if response is None or not response.ok:
+            logger.warning(GitHubClient.describe_failure(response, f"GitHub Star Monitor: 查询 {len(logins)} 个用户资料失败"))
+            return []
+        profiles = parse_profiles_response(logins, response.data)
+        if len(profiles) < len(logins):
+            errors = (response.data or {}).get("errors") or [{}]
+            message = errors[0].get("message", "响应中缺少数据") if isinstance(errors[0], dict) else errors[0]
+            logger.warning(f"GitHub Star Monitor: {len(logins) - len(profiles)} 个用户资料查询失败，暂不缓存: {message}")
+        return profiles
+    
+    def is_notable(self, profile: Optional[UserProfile]) -> bool:
+        """关注者数或公开仓库数达到配置的阈值即为知名用户，阈值为0时不参与判断"""
+        if profile is None:
+            return False
+        min_followers = self.config.get("notable_min_followers", 1000)
+        min_repos = self.config.get("notable_min_public_repos", 0)
+        return bool(
+            (min_followers and profile.followers >= min_followers)
+            or (min_repos and profile.public_repos >= min_repos)
+        )
+    
+    async def get_repo_info(self, owner: str, repo: str) -> Optional[dict]:
+        """获取GitHub仓库的详细信息"""
+        response = await self.github.request(f"{self.api_base}/repos/{owner}/{repo}", "repo")
+        if response is None or not response.ok:
+            logger.warning(GitHubClient.describe_failure(response, f"GitHub Star Monitor: 获取 {owner}/{repo} 仓库信息失败"))
             return None
+        return response.data
 
-    async def get_recent_unstar_events(self, owner: str, repo: str) -> List[dict]:
+    async def get_recent_unstar_events(self, owner: str, repo: str) -> List[Stargazer]:
         """尝试获取最近的unstar事件（这个功能有限，GitHub API不直接支持）"""
         try:
             # 由于GitHub API的限制，我们只能通过events API尝试获取
             # 但events API只能获取到最近的事件，无法确保获取到具体的unstar用户
-            url = f"https://api.github.com/repos/{owner}/{repo}/events"
-            
-            headers = {
-                'User-Agent': 'AstrBot-GitHub-Star-Monitor/1.0.0',
-                'Accept': 'application/vnd.github.v3+json',
-                'Authorization': f'Bearer {self.config.get("github_token", "")}'
-            }
+            # 只保留最近的WatchEvent（包括star和unstar）
+            # 注意：GitHub的WatchEvent主要记录star操作，unstar较难追踪
+            response = await self.github.request(
+                f"{self.api_base}/repos/{owner}/{repo}/events", "events", transform=parse_watch_events
+            )
+            if response is None or not response.ok:
+                logger.warning(GitHubClient.describe_failure(response, f"GitHub Star Monitor: 获取 {owner}/{repo} 事件失败"))
+                return []
+            watch_events = response.data
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        events = await response.json()
-                        # 查找最近的WatchEvent（包括star和unstar）
-                        watch_events = []
-                        for event in events:
-                            if event.get('type') == 'WatchEvent':
-                                # 注意：GitHub的WatchEvent主要记录star操作，unstar较难追踪
-                                watch_events.append(event)
-                        
-                        logger.info(f"GitHub Star Monitor: 找到 {len(watch_events)} 个最近的watch事件（可能包含unstar）")
-                        return watch_events[:1]  # 返回最近的1个事件作为可能的unstar用户
-                    else:
-                        logger.warning(f"GitHub Star Monitor: 获取事件失败，状态码: {response.status}")
-                        return []
+            logger.info(f"GitHub Star Monitor: 找到 {len(watch_events)} 个最近的watch事件（可能包含unstar）")
+            return watch_events[:1]  # 返回最近的1个事件作为可能的unstar用户
         except Exception as e:
             logger.error(f"GitHub Star Monitor: 获取unstar事件失败: {e}")
             return []
\ No newline at end of file
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+
+class RepoState:
+    """一个被监控仓库的状态，stars 为上一次记录的星标数（None表示尚未建立基线）"""
+
+    __slots__ = ("owner", "name", "key", "stars", "checked_at", "updated_at")
+
+    def __init__(self, owner: str, name: str, stars: Optional[int] = None):
+        self.owner = owner
+        self.name = name
+        self.key = f"{owner}/{name}"
+        self.stars = stars
+        # 最近一次成功获取星标数的时间
+        self.checked_at = 0.0
+        # 最近一次由Webhook更新星标数的时间，早于它发出的轮询结果已经过时
+        self.updated_at = 0.0
+
+    @classmethod
+    def from_key(cls, repo_key: str, stars: Optional[int] = None) -> "RepoState":
+        owner, name = repo_key.split("/", 1)
+        return cls(owner, name, stars)
+
+
+class Stargazer:
+    """导致星标变动的用户，只保留通知中用到的字段"""
+
+    __slots__ = ("login", "avatar_url", "starred_at", "action", "profile", "notable", "family_repos")
+
+    def __init__(self, login: str, avatar_url: str = "", starred_at: str = "", action: str = "started"):
+        self.login = login
+        self.avatar_url = avatar_url
+        self.starred_at = starred_at
+        self.action = action
+        # 开启资料补全后为 profiles.UserProfile
+        self.profile = None
+        self.notable = False
+        # 开启重合分析后为该用户star过的其他被监控仓库数
+        self.family_repos = 0
+
+    @classmethod
+    def from_user(cls, user: Optional[dict], starred_at: str = "", action: str = "started") -> "Stargazer":
+        user = user or {}
+        return cls(user.get("login") or "未知用户", user.get("avatar_url") or "", starred_at or "", action)
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_repo_stars(data: dict) -> int:
+    """仓库接口只保留星标数"""
+    return data.get("stargazers_count", 0)
+
+
+def parse_stargazers(data: list) -> List[Stargazer]:
+    """解析 star+json 格式的 stargazers 列表"""
+    return [Stargazer.from_user(item.get("user"), item.get("starred_at") or now_iso()) for item in data or []]
+
+
+def parse_watch_events(data: list) -> List[Stargazer]:
+    """从仓库事件中提取 WatchEvent（star操作）"""
+    return [
+        Stargazer.from_user(
+            event.get("actor"), event.get("created_at") or "", (event.get("payload") or {}).get("action") or "started"
+        )
+        for event in data or []
+        if event.get("type") == "WatchEvent"
+    ]
@@ -0,0 +1,288 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from astrbot.api import logger
+
+from .tracing import current_trace
+
+
+class OutboxItem:
+    """一条待发送的通知"""
+
+    __slots__ = ("id", "session", "kind", "payload", "dedup_key", "created_at", "attempts", "trace")
+
+    def __init__(self, id: str, session: str, kind: str, payload: str, dedup_key: Optional[str], created_at: float):
+        self.id = id
+        self.session = session
+        self.kind = kind
+        self.payload = payload
+        self.dedup_key = dedup_key
+        self.created_at = created_at
+        self.attempts = 0
+        # 入队时所在的延迟追踪（只在内存中），送达时记录送达时间
+        self.trace = None
+
+
+class SessionQueue:
+    """单个会话的发送队列与退避状态，会话内按入队顺序发送"""
+
+    __slots__ = ("items", "failures", "next_at")
+
+    def __init__(self):
+        self.items: Deque[OutboxItem] = deque()
+        self.failures = 0
+        self.next_at = 0.0
+
+
+class Outbox:
+    """持久化的出站通知队列，保证至少一次送达
+
+    每条通知先追加写入数据目录下的JSONL日志再发送，发送成功后追加一条确认记录。
+    插件启动时重放日志，恢复所有未确认的通知。发送失败的会话按指数退避重试，
+    平台故障期间通知只会延迟，不会丢失。日志中已确认的记录过多时会压缩重写。
+
+    batch_window 大于0时，同一会话的通知先缓冲，最早一条等待满 batch_window 秒
+    （或攒够 batch_size 条）后由 batch_sender 合并为一条消息发送，突发时减少平台API调用。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sender: Callable[[str, str, str], Awaitable[None]],
+        base_delay: float = 5.0,
+        max_delay: float = 600.0,
+        max_age: float = 86400.0,
+        dedup_window: float = 600.0,
+        batch_window: float = 0.0,
+        batch_size: int = 10,
+        batch_sender: Optional[Callable[[str, List[OutboxItem]], Awaitable[None]]] = None,
+        on_trace_done: Optional[Callable] = None,
+    ):
+        self.path = path
+        self.sender = sender
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_age = max_age
+        self.dedup_window = dedup_window
+        self.batch_window = batch_window if batch_sender else 0.0
+        self.batch_size = max(1, batch_size)
+        self.batch_sender = batch_sender
+        # 追踪的所有通知都已送达或丢弃、且检测流程已结束时调用
+        self.on_trace_done = on_trace_done
+        self.sessions: Dict[str, SessionQueue] = {}
+        self.pending_keys: Dict[tuple, str] = {}
+        # 图片文件路径 -> 引用它的待发送通知数，归零时删除文件
+        self.image_refs: Dict[str, int] = {}
+        # 最近已送达的去重键及送达时间，窗口内重复检测到的同一通知不再发送
+        self.delivered_keys: "OrderedDict[tuple, float]" = OrderedDict()
+        self.delivered_limit = 4096
+        self.log_records = 0
+        self._file = None
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(queue.items) for queue in self.sessions.values())
+
+    def load(self) -> int:
+        """重放日志，恢复未确认的通知，返回恢复的数量"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        items: Dict[str, OutboxItem] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 写入中途崩溃可能留下不完整的最后一行
+                        continue
+                    self.log_records += 1
+                    if record.get("op") == "add":
+                        items[record["id"]] = OutboxItem(
+                            record["id"], record["session"], record["kind"], record["payload"],
+                            record.get("key"), record.get("ts", time.time()),
+                        )
+                    elif record.get("op") in ("ack", "drop"):
+                        item = items.pop(record.get("id"), None)
+                        if item and item.dedup_key and record.get("op") == "ack":
+                            self._remember_delivered((item.session, item.dedup_key))
+        for item in items.values():
+            self._push(item)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._compact_if_needed()
+        if items:
+            logger.info(f"GitHub Star Monitor: 从出站队列恢复了 {len(items)} 条未送达的通知")
+        return len(items)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def enqueue(self, session: str, kind: str, payload: str, dedup_key: Optional[str] = None) -> bool:
+        """加入一条通知，相同会话下重复的去重键会被忽略"""
+        if dedup_key:
+            key = (session, dedup_key)
+            if key in self.pending_keys:
+                return False
+            delivered_at = self.delivered_keys.get(key)
+            if delivered_at is not None and time.time() - delivered_at < self.dedup_window:
+                return False
+        item = OutboxItem(uuid.uuid4().hex, session, kind, payload, dedup_key, time.time())
+        item.trace = current_trace.get()
+        if item.trace is not None:
+            item.trace.pending += 1
+        self._write({
+            "op": "add", "id": item.id, "session": session, "kind": kind,
+            "payload": payload, "key": dedup_key, "ts": item.created_at,
+        })
+        self._push(item)
+        self._wakeup.set()
+        return True
+
+    async def drain(self):
+        """发送所有到期会话的通知，失败的会话进入退避"""
+        async with self._lock:
+            now = time.time()
+            due = [(session, queue) for session, queue in self.sessions.items() if self._due_at(queue) <= now]
+            await asyncio.gather(*(self._drain_session(session, queue) for session, queue in due))
+            for session in [session for session, queue in self.sessions.items() if not queue.items]:
+                self.sessions.pop(session)
+            self._compact_if_needed()
+
+    async def run(self):
+        """后台循环：有新通知或退避到期时发送"""
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                logger.error(f"GitHub Star Monitor: 出站队列处理出错: {e}")
+            self._wakeup.clear()
+            timeout = None
+            if self.sessions:
+                timeout = max(0.1, min(self._due_at(queue) for queue in self.sessions.values()) - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _due_at(self, queue: SessionQueue) -> float:
+        """会话下一次可以发送的时间：退避结束，且合并发送时缓冲已满或最早一条已等待够久"""
+        if not self.batch_window or not queue.items or len(queue.items) >= self.batch_size:
+            return queue.next_at
+        return max(queue.next_at, queue.items[0].created_at + self.batch_window)
+
+    async def _drain_session(self, session: str, queue: SessionQueue):
+        while queue.items:
+            self._drop_expired(session, queue)
+            if not queue.items:
+                return
+            item = queue.items[0]
+            batch = list(itertools.islice(queue.items, self.batch_size)) if self.batch_window else [item]
+            for entry in batch:
+                entry.attempts += 1
+            try:
+                if len(batch) > 1:
+                    await self.batch_sender(session, batch)
+                else:
+                    await self.sender(session, item.kind, item.payload)
+            except Exception as e:
+                queue.failures += 1
+                delay = min(self.max_delay, self.base_delay * (2 ** (queue.failures - 1)))
+                queue.next_at = time.time() + delay
+                attempts = sorted({entry.attempts for entry in batch})
+                attempt_text = f"第{attempts[0]}次" if len(attempts) == 1 else f"第{attempts[0]}~{attempts[-1]}次"
+                logger.warning(
+                    f"GitHub Star Monitor: 向会话 {session} 发送{len(batch)}条通知失败（{attempt_text}）: {e}，{delay:.0f}秒后重试"
+                )
+                return
+            queue.failures = 0
+            queue.next_at = 0.0
+            for _ in batch:
+                self._finish(queue, "ack")
+
+    def _drop_expired(self, session: str, queue: SessionQueue):
+        """丢弃队列中所有超过最长保留时间的通知，合并发送时不会把过期的通知带进批次"""
+        if not self.max_age:
+            return
+        cutoff = time.time() - self.max_age
+        expired = [item for item in queue.items if item.created_at < cutoff]
+        if expired:
+            logger.warning(f"GitHub Star Monitor: 发往会话 {session} 的 {len(expired)} 条通知已超过最长保留时间，已丢弃")
+            for item in expired:
+                self._finish(queue, "drop", item)
+
+    def _finish(self, queue: SessionQueue, op: str, item: Optional[OutboxItem] = None):
+        if item is None:
+            item = queue.items.popleft()
+        else:
+            queue.items.remove(item)
+        self._write({"op": op, "id": item.id})
+        if item.trace is not None:
+            item.trace.pending -= 1
+            if op == "ack" and item.trace.delivered_at is None:
+                item.trace.delivered_at = time.time()
+            if item.trace.pending == 0 and item.trace.done and self.on_trace_done:
+                self.on_trace_done(item.trace)
+        if item.dedup_key:
+            key = (item.session, item.dedup_key)
+            self.pending_keys.pop(key, None)
+            if op == "ack":
+                self._remember_delivered(key)
+        if item.kind != "image":
+            return
+        refs = self.image_refs.get(item.payload, 1) - 1
+        if refs > 0:
+            self.image_refs[item.payload] = refs
+        else:
+            self.image_refs.pop(item.payload, None)
+            try:
+                if os.path.exists(item.payload):
+                    os.remove(item.payload)
+                    logger.debug(f"GitHub Star Monitor: 已清理临时图片文件: {item.payload}")
+            except Exception as e:
+                logger.warning(f"GitHub Star Monitor: 清理临时图片文件失败: {e}")
+
+    def _push(self, item: OutboxItem):
+        self.sessions.setdefault(item.session, SessionQueue()).items.append(item)
+        if item.kind == "image":
+            self.image_refs[item.payload] = self.image_refs.get(item.payload, 0) + 1
+        if item.dedup_key:
+            self.pending_keys[(item.session, item.dedup_key)] = item.id
+
+    def _remember_delivered(self, key: tuple):
+        self.delivered_keys[key] = time.time()
+        self.delivered_keys.move_to_end(key)
+        while len(self.delivered_keys) > self.delivered_limit:
+            self.delivered_keys.popitem(last=False)
+
+    def _write(self, record: dict):
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.log_records += 1
+
+    def _compact_if_needed(self):
+        """已确认的记录远多于待发送记录时，只保留待发送的部分重写日志"""
+        pending = len(self)
+        if self._file is None or self.log_records < 1000 or self.log_records < pending * 4:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for queue in self.sessions.values():
+                for item in queue.items:
+                    f.write(json.dumps({
+                        "op": "add", "id": item.id, "session": item.session, "kind": item.kind,
+                        "payload": item.payload, "key": item.dedup_key, "ts": item.created_at,
+                    }, ensure_ascii=False) + "\n")
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.log_records = pending
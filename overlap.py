@@ -0,0 +1,192 @@
+"""跨仓库的stargazer重合分析
+
+用户名被映射为连续的整数ID，每个仓库的stargazer集合保存为一个位图（bytearray），
+通知时判断某个用户star过哪些仓库只需按位读取。交集、并集与“只star了这一个仓库”
+把位图转换为Python整数后做位运算，bit_count 直接得到人数。同步时按页记录ETag和
+该页的用户ID，未变化的页返回304，不消耗额度也不必重新解析；写入磁盘时用zlib压缩。
+"""
+import base64
+import json
+import os
+import zlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from astrbot.api import logger
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    """依次取出位图中所有为1的位，按字节扫描以跳过大段的0"""
+    for index, byte in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")):
+        while byte:
+            low = byte & -byte
+            yield (index << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+def set_bit(bitmap: bytearray, user_id: int):
+    index = user_id >> 3
+    if index >= len(bitmap):
+        bitmap.extend(bytes(index + 1 - len(bitmap)))
+    bitmap[index] |= 1 << (user_id & 7)
+
+
+def has_bit(bitmap: bytearray, user_id: int) -> bool:
+    index = user_id >> 3
+    return index < len(bitmap) and bool(bitmap[index] >> (user_id & 7) & 1)
+
+
+class StargazerIndex:
+    """被监控仓库的stargazer位图索引"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ids: Dict[str, int] = {}
+        self.logins: List[str] = []
+        # 仓库 -> 页码 -> (ETag, 该页的用户ID)
+        self.pages: Dict[str, Dict[int, Tuple[str, array]]] = {}
+        self.bitmaps: Dict[str, bytearray] = {}
+
+    def intern(self, login: str) -> int:
+        key = login.lower()
+        user_id = self.ids.get(key)
+        if user_id is None:
+            user_id = self.ids[key] = len(self.logins)
+            self.logins.append(login)
+        return user_id
+
+    def lookup(self, login: str) -> Optional[int]:
+        return self.ids.get(login.lower())
+
+    def set_page(self, repo_key: str, page: int, etag: str, logins: Iterable[str]):
+        self.pages.setdefault(repo_key, {})[page] = (etag, array("I", (self.intern(login) for login in logins)))
+
+    def page_etag(self, repo_key: str, page: int) -> Optional[str]:
+        entry = self.pages.get(repo_key, {}).get(page)
+        return entry[0] if entry else None
+
+    def rebuild(self, repo_key: str, last_page: int):
+        """同步结束后丢弃多余的页，并由各页重新生成仓库的位图"""
+        pages = self.pages.get(repo_key, {})
+        for page in [page for page in pages if page > last_page]:
+            del pages[page]
+        size = max((max(ids) for _, ids in pages.values() if ids), default=-1) // 8 + 1
+        bitmap = bytearray(size)
+        for _, ids in pages.values():
+            for user_id in ids:
+                bitmap[user_id >> 3] |= 1 << (user_id & 7)
+        self.bitmaps[repo_key] = bitmap
+
+    def add(self, repo_key: str, logins: Iterable[str]):
+        """通知时增量加入新的stargazer，下一次同步时以GitHub上的列表为准"""
+        bitmap = self.bitmaps.setdefault(repo_key, bytearray())
+        for login in logins:
+            set_bit(bitmap, self.intern(login))
+
+    def remove_repo(self, repo_key: str):
+        self.pages.pop(repo_key, None)
+        self.bitmaps.pop(repo_key, None)
+
+    def repo_count(self, login: str, exclude: Optional[str] = None) -> int:
+        """该用户star了多少个被索引的仓库（可排除一个仓库）"""
+        user_id = self.lookup(login)
+        if user_id is None:
+            return 0
+        return sum(1 for repo, bitmap in self.bitmaps.items() if repo != exclude and has_bit(bitmap, user_id))
+
+    def as_int(self, repo_key: str) -> int:
+        return int.from_bytes(self.bitmaps.get(repo_key, b""), "little")
+
+    def union(self, repos: Iterable[str]) -> int:
+        bitmap = 0
+        for repo in repos:
+            bitmap |= self.as_int(repo)
+        return bitmap
+
+    def intersection(self, repos: List[str]) -> int:
+        if not repos:
+            return 0
+        bitmap = self.as_int(repos[0])
+        for repo in repos[1:]:
+            bitmap &= self.as_int(repo)
+        return bitmap
+
+    def exclusive(self, repo_key: str) -> int:
+        """只star了该仓库、没有star其他被索引仓库的用户"""
+        return self.as_int(repo_key) & ~self.union(repo for repo in self.bitmaps if repo != repo_key)
+
+    def multi_starred(self) -> int:
+        """star了至少两个被索引仓库的用户"""
+        seen = multi = 0
+        for repo in self.bitmaps:
+            bitmap = self.as_int(repo)
+            multi |= seen & bitmap
+            seen |= bitmap
+        return multi
+
+    def top_users(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """star仓库最多的用户，只需遍历star了多个仓库的用户"""
+        counts = [
+            (self.logins[user_id], sum(1 for bitmap in self.bitmaps.values() if has_bit(bitmap, user_id)))
+            for user_id in iter_bits(self.multi_starred())
+        ]
+        counts.sort(key=lambda item: item[1], reverse=True)
+        return counts[:limit]
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.logins = data["logins"]
+            self.ids = {login.lower(): user_id for user_id, login in enumerate(self.logins)}
+            for repo_key, pages in data["repos"].items():
+                for page, (etag, packed) in pages.items():
+                    ids = array("I")
+                    ids.frombytes(zlib.decompress(base64.b64decode(packed)))
+                    self.pages.setdefault(repo_key, {})[int(page)] = (etag, ids)
+                self.rebuild(repo_key, max(self.pages.get(repo_key, {0: None})))
+        except Exception as e:
+            logger.warning(f"GitHub Star Monitor: 加载stargazer索引失败: {e}")
+            self.ids, self.logins, self.pages, self.bitmaps = {}, [], {}, {}
+
+    def snapshot(self) -> dict:
+        """在事件循环中取当前索引的快照，之后的增量更新不会影响交给线程保存的数据
+
+        set_page 总是替换整页而不修改已有的数组，浅拷贝即可。
+        """
+        return {
+            "logins": list(self.logins),
+            "repos": {repo_key: dict(pages) for repo_key, pages in self.pages.items()},
+        }
+
+    def save(self, snapshot: Optional[dict] = None):
+        """只保存各页的ETag与压缩后的用户ID，位图在加载时重新生成
+
+        在线程中保存时应传入事件循环中取得的 snapshot，未传入时保存当前索引。
+        """
+        snapshot = snapshot or self.snapshot()
+        data = {
+            "logins": snapshot["logins"],
+            "repos": {
+                repo_key: {
+                    str(page): [etag, base64.b64encode(zlib.compress(ids.tobytes())).decode("ascii")]
+                    for page, (etag, ids) in pages.items()
+                }
+                for repo_key, pages in snapshot["repos"].items()
+            },
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"GitHub Star Monitor: 保存stargazer索引失败: {e}")
+
+
+def parse_logins(data: list) -> List[str]:
+    """stargazers列表只保留用户名"""
+    return [item.get("login") for item in data or [] if item and item.get("login")]
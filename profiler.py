@@ -0,0 +1,173 @@
+"""按需开启的采样分析器
+
+后台线程按固定间隔抓取事件循环线程的调用栈，只统计栈中包含插件代码的样本，
+即插件的各个任务（轮询、通知、汇总）实际占用事件循环的时间。同时可用 tracemalloc
+记录采样窗口内新增的内存分配位置。只在 /star_profile 的时间窗口内运行，结束后完全停止。
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+# 火焰图中保留的最大调用深度
+MAX_STACK_DEPTH = 24
+
+
+def short_path(filename: str) -> str:
+    """插件内的文件显示相对路径，其他只显示文件名"""
+    if filename.startswith(PLUGIN_DIR):
+        return os.path.relpath(filename, PLUGIN_DIR)
+    return os.path.basename(filename)
+
+
+def frame_label(filename: str, name: str, lineno: Optional[int] = None) -> str:
+    location = short_path(filename)
+    return f"{name} ({location}:{lineno})" if lineno is not None else f"{name} ({location})"
+
+
+class ProfileReport:
+    """一次采样窗口的结果"""
+
+    __slots__ = ("duration", "interval", "samples", "plugin_samples", "top_self", "top_total", "allocations", "stacks")
+
+    def __init__(self, duration: float, interval: float):
+        self.duration = duration
+        self.interval = interval
+        # 采样总数，以及栈中包含插件代码的样本数
+        self.samples = 0
+        self.plugin_samples = 0
+        # (位置, 样本数)：自身耗时按栈顶所在行统计，累计耗时按函数统计
+        self.top_self: List[Tuple[str, int]] = []
+        self.top_total: List[Tuple[str, int]] = []
+        # (分配位置, 新增KB, 新增块数)
+        self.allocations: List[Tuple[str, float, int]] = []
+        # 从最外层插件函数开始的调用栈 -> 样本数，用于绘制火焰图
+        self.stacks: Counter = Counter()
+
+    @property
+    def busy_ratio(self) -> float:
+        """插件代码占用事件循环的时间比例"""
+        return self.plugin_samples / self.samples if self.samples else 0.0
+
+
+class SamplingProfiler:
+    """对指定线程（默认为创建者所在的事件循环线程）做调用栈采样"""
+
+    def __init__(self, interval: float = 0.005, trace_memory: bool = True, top: int = 10):
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.top = top
+        self.thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._self_counts: Counter = Counter()
+        self._total_counts: Counter = Counter()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._plugin_samples = 0
+        self._started_at = 0.0
+        self._owns_tracemalloc = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self.trace_memory:
+            self._owns_tracemalloc = not tracemalloc.is_tracing()
+            if self._owns_tracemalloc:
+                tracemalloc.start(8)
+            self._baseline = tracemalloc.take_snapshot()
+        self._started_at = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="star-monitor-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._sample(frame)
+
+    def _sample(self, frame):
+        self._samples += 1
+        codes = []
+        leaf_line = frame.f_lineno
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        # 从外到内找到第一个插件帧，之前的 asyncio 调度帧不计入
+        codes.reverse()
+        start = next((i for i, code in enumerate(codes) if code.co_filename.startswith(PLUGIN_DIR)), None)
+        if start is None:
+            return
+        self._plugin_samples += 1
+        stack = tuple(frame_label(code.co_filename, code.co_name) for code in codes[start:])
+        leaf = codes[-1]
+        self._self_counts[frame_label(leaf.co_filename, leaf.co_name, leaf_line)] += 1
+        self._total_counts.update(set(stack))
+        self._stacks[stack[:MAX_STACK_DEPTH]] += 1
+
+    def stop(self) -> ProfileReport:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        report = ProfileReport(time.perf_counter() - self._started_at, self.interval)
+        report.samples = self._samples
+        report.plugin_samples = self._plugin_samples
+        report.top_self = self._self_counts.most_common(self.top)
+        report.top_total = self._total_counts.most_common(self.top)
+        report.stacks = self._stacks
+        if self._baseline is not None:
+            report.allocations = self._allocation_diff(tracemalloc.take_snapshot())
+            self._baseline = None
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+        return report
+
+    def _allocation_diff(self, snapshot: tracemalloc.Snapshot) -> List[Tuple[str, float, int]]:
+        """窗口内新增内存最多的分配位置，分析器自身与 tracemalloc 的分配不计入"""
+        ignore = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        stats = snapshot.filter_traces(ignore).compare_to(self._baseline.filter_traces(ignore), "lineno")
+        allocations = []
+        for stat in stats:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            allocations.append((f"{short_path(frame.filename)}:{frame.lineno}", stat.size_diff / 1024, stat.count_diff))
+            if len(allocations) >= self.top:
+                break
+        return allocations
+
+
+def flame_nodes(stacks: Dict[tuple, int], min_ratio: float = 0.005) -> List[Tuple[int, float, float, str, int]]:
+    """把调用栈计数展开为火焰图的矩形：(深度, 起点比例, 宽度比例, 函数, 样本数)"""
+    total = sum(stacks.values())
+    if not total:
+        return []
+    nodes = []
+
+    def walk(items: List[Tuple[tuple, int]], depth: int, offset: int):
+        children: Dict[str, List[Tuple[tuple, int]]] = {}
+        for stack, count in items:
+            if len(stack) > depth:
+                children.setdefault(stack[depth], []).append((stack, count))
+        for name in sorted(children):
+            group = children[name]
+            count = sum(c for _, c in group)
+            if count / total >= min_ratio:
+                nodes.append((depth, offset / total, count / total, name, count))
+                walk(group, depth + 1, offset)
+            offset += count
+
+    walk(list(stacks.items()), 0, 0)
+    return nodes
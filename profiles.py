@@ -0,0 +1,170 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from astrbot.api import logger
+
+# 一次GraphQL查询最多合并的用户数
+GRAPHQL_BATCH_SIZE = 25
+
+PROFILE_FIELDS = "login name company bio createdAt followers { totalCount } repositories(privacy: PUBLIC) { totalCount }"
+
+
+class UserProfile:
+    """GitHub用户的公开资料，只保留卡片中用到的字段"""
+
+    __slots__ = ("login", "name", "company", "bio", "followers", "public_repos", "fetched_at", "created_at")
+
+    def __init__(
+        self,
+        login: str,
+        name: str = "",
+        company: str = "",
+        bio: str = "",
+        followers: int = 0,
+        public_repos: int = 0,
+        fetched_at: Optional[float] = None,
+        created_at: str = "",
+    ):
+        self.login = login
+        self.name = name
+        self.company = company
+        self.bio = bio
+        self.followers = followers
+        self.public_repos = public_repos
+        self.fetched_at = fetched_at or time.time()
+        # 账号注册时间（ISO格式），用于刷星检测
+        self.created_at = created_at
+
+    @classmethod
+    def from_graphql(cls, login: str, node: Optional[dict]) -> "UserProfile":
+        """node 为 None 时（用户不存在或为机器人账号）返回空资料，同样会被缓存"""
+        node = node or {}
+        return cls(
+            node.get("login") or login,
+            node.get("name") or "",
+            (node.get("company") or "").strip(),
+            " ".join((node.get("bio") or "").split()),
+            (node.get("followers") or {}).get("totalCount", 0),
+            (node.get("repositories") or {}).get("totalCount", 0),
+            created_at=node.get("createdAt") or "",
+        )
+
+    @property
+    def found(self) -> bool:
+        """GitHub上存在的账号一定有注册时间，NOT_FOUND 缓存的空资料没有"""
+        return bool(self.created_at)
+
+    def to_row(self) -> list:
+        return [
+            self.login, self.name, self.company, self.bio, self.followers, self.public_repos, self.fetched_at, self.created_at
+        ]
+
+    def summary(self, max_bio: int = 40) -> str:
+        """一行简介，如 ``1.2k followers · @company · bio``"""
+        parts = [f"{format_count(self.followers)} followers"]
+        if self.company:
+            parts.append(self.company)
+        if self.bio:
+            parts.append(self.bio if len(self.bio) <= max_bio else self.bio[:max_bio - 1] + "…")
+        return " · ".join(parts)
+
+
+def format_count(value: int) -> str:
+    if value >= 1000:
+        return f"{value / 1000:.1f}k".replace(".0k", "k")
+    return str(value)
+
+
+class ProfileCache:
+    """带过期时间的LRU用户资料缓存
+
+    超过 ttl 的资料视为过期需要重新查询；超过 max_size 时淘汰最久未使用的条目。
+    插件卸载时写入数据目录，重启后继续使用。
+    """
+
+    def __init__(self, path: str, max_size: int = 5000, ttl: float = 86400):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, UserProfile]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, login: str) -> Optional[UserProfile]:
+        key = login.lower()
+        profile = self._entries.get(key)
+        if profile is None:
+            return None
+        if time.time() - profile.fetched_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return profile
+
+    def put(self, profile: UserProfile):
+        key = profile.login.lower()
+        self._entries[key] = profile
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+            for row in rows:
+                self.put(UserProfile(*row))
+        except Exception as e:
+            logger.warning(f"GitHub Star Monitor: 加载用户资料缓存失败: {e}")
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([profile.to_row() for profile in self._entries.values()], f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"GitHub Star Monitor: 保存用户资料缓存失败: {e}")
+
+
+def build_profiles_query(logins: List[str]) -> Tuple[str, Dict[str, str]]:
+    """把多个用户合并为一次GraphQL查询，用户名通过变量传入"""
+    params = ", ".join(f"$l{i}: String!" for i in range(len(logins)))
+    fields = " ".join(f"u{i}: user(login: $l{i}) {{ {PROFILE_FIELDS} }}" for i in range(len(logins)))
+    return f"query({params}) {{ {fields} }}", {f"l{i}": login for i, login in enumerate(logins)}
+
+
+def parse_profiles_response(logins: List[str], body: Optional[dict]) -> List[UserProfile]:
+    """解析批量查询的结果，只返回可以写入缓存的资料
+
+    找不到的用户在 data 中为 null，并附带指向该别名的 NOT_FOUND 错误，缓存为空资料；
+    因限流、Token权限不足或查询出错而为 null 的用户不返回，下次重新查询。
+    data 整体为 null 时整批视为失败。
+    """
+    body = body or {}
+    data = body.get("data")
+    if not isinstance(data, dict):
+        return []
+    not_found = {
+        error["path"][0]
+        for error in body.get("errors") or []
+        if isinstance(error, dict) and error.get("type") == "NOT_FOUND" and error.get("path")
+    }
+    profiles = []
+    for i, login in enumerate(logins):
+        node = data.get(f"u{i}")
+        if node is not None or f"u{i}" in not_found:
+            profiles.append(UserProfile.from_graphql(login, node))
+    return profiles
+
+
+def batched(items: Iterable[str], size: int = GRAPHQL_BATCH_SIZE) -> List[List[str]]:
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
@@ -0,0 +1,155 @@
+import hashlib
+import hmac
+import json
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+from aiohttp import web
+from astrbot.api import logger
+
+# 每个仓库保留的最近变动与最近stargazer数量
+MAX_CHANGES = 500
+MAX_STARGAZERS = 20
+HISTORY_WINDOW = 7 * 86400
+
+
+class RepoActivity:
+    """一个仓库最近的星标变动与stargazer，只保存在内存中"""
+
+    __slots__ = ("changes", "stargazers")
+
+    def __init__(self):
+        # (时间, 变动, 变动后的星标数)
+        self.changes: deque = deque(maxlen=MAX_CHANGES)
+        # (用户名, starred_at, 是否知名用户)，最新的在前
+        self.stargazers: deque = deque(maxlen=MAX_STARGAZERS)
+
+    def delta_since(self, since: float) -> int:
+        total = 0
+        for t, change, _ in reversed(self.changes):
+            if t < since:
+                break
+            total += change
+        return total
+
+
+class ActivityLog:
+    """查询接口使用的最近活动，启动时可从汇总的观测记录中恢复"""
+
+    def __init__(self):
+        self.repos: Dict[str, RepoActivity] = {}
+
+    def record(self, repo_key: str, change: int, stars: int, users: Iterable = (), at: Optional[float] = None):
+        activity = self.repos.get(repo_key)
+        if activity is None:
+            activity = self.repos[repo_key] = RepoActivity()
+        activity.changes.append((at or time.time(), change, stars))
+        if change > 0:
+            for user in users:
+                activity.stargazers.appendleft((user.login, user.starred_at, user.notable))
+
+    def load(self, records: Iterable[dict]):
+        """按时间顺序回放观测记录（只有用户名，没有starred_at）"""
+        for record in records:
+            activity = self.repos.get(record["repo"])
+            if activity is None:
+                activity = self.repos[record["repo"]] = RepoActivity()
+            activity.changes.append((record.get("t", 0), record.get("change", 0), record.get("stars", 0)))
+            notable = set(record.get("notable", ()))
+            for login in record.get("users", ()):
+                activity.stargazers.appendleft((login, "", login in notable))
+
+
+def _encode(data, cacheable: bool = True) -> Tuple[bytes, str]:
+    """序列化响应体，ETag按实际返回的字节计算；不可缓存的响应不带ETag"""
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"' if cacheable else ""
+
+
+def build_snapshot(states: list, activity: ActivityLog, status: dict, now: Optional[float] = None) -> Dict[str, Tuple[bytes, str]]:
+    """把监控状态预先序列化为各个接口的响应体及ETag
+
+    每轮检查后生成一次，查询时只需一次字典查找。每轮都会变化的检查时间只放在
+    不做条件缓存的 /status 中，仓库接口内容没有变化时ETag保持不变。
+    states 为 RepoState 列表，status 为插件的整体状态。
+    """
+    now = now or time.time()
+    day_ago, week_ago = now - 86400, now - HISTORY_WINDOW
+    summaries = []
+    responses: Dict[str, Tuple[bytes, str]] = {}
+    for state in states:
+        repo_activity = activity.repos.get(state.key) or RepoActivity()
+        last_change = repo_activity.changes[-1] if repo_activity.changes else None
+        summary = {
+            "repo": state.key,
+            "stars": state.stars,
+            "delta_24h": repo_activity.delta_since(day_ago),
+            "delta_7d": repo_activity.delta_since(week_ago),
+            "last_change": last_change[1] if last_change else None,
+            "changed_at": round(last_change[0], 3) if last_change else None,
+        }
+        summaries.append(summary)
+        detail = dict(summary)
+        detail["recent_stargazers"] = [
+            {"login": login, "starred_at": starred_at or None, "notable": notable}
+            for login, starred_at, notable in repo_activity.stargazers
+        ]
+        detail["history"] = [
+            {"t": round(t, 3), "change": change, "stars": stars}
+            for t, change, stars in repo_activity.changes if t >= week_ago
+        ]
+        responses[f"/repos/{state.key.lower()}"] = _encode(detail)
+    summaries.sort(key=lambda summary: summary["repo"].lower())
+    responses["/repos"] = _encode({"count": len(summaries), "repos": summaries})
+    checked_at = {state.key: round(state.checked_at, 3) if state.checked_at else None for state in states}
+    responses["/status"] = _encode(dict(status, repo_count=len(summaries), checked_at=checked_at), cacheable=False)
+    return responses
+
+
+class QueryAPIServer:
+    """只读的JSON查询接口
+
+    所有响应体由 build_snapshot 预先生成，请求时只做查表和ETag比较，
+    看板频繁刷新时不会产生任何GitHub请求。配置了 token 时要求 Bearer 认证。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6191, prefix: str = "/api", token: str = ""):
+        self.host = host
+        self.port = port
+        self.prefix = prefix.rstrip("/")
+        self.token = token
+        self.responses: Dict[str, Tuple[bytes, str]] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    def update(self, responses: Dict[str, Tuple[bytes, str]]):
+        self.responses = responses
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get(self.prefix + "/{path:.*}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"GitHub Star Monitor: 查询接口已启动 http://{self.host}:{self.port}{self.prefix}/repos")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {self.token}"):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        entry = self.responses.get("/" + request.match_info["path"].strip("/").lower())
+        if entry is None:
+            return web.json_response({"error": "not found"}, status=404)
+        body, etag = entry
+        if not etag:
+            headers = {"Cache-Control": "no-store", "Access-Control-Allow-Origin": "*"}
+            return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Access-Control-Allow-Origin": "*"}
+        if etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
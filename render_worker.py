@@ -0,0 +1,79 @@
+"""独立的图片渲染进程
+
+由 renderer.RenderWorkerPool 以子进程方式启动，不依赖AstrBot和插件包。
+通过标准输入/输出交换JSON Lines：每行一个渲染请求，处理完后回复一行结果，
+结果中附带本进程及其Chromium子进程的内存占用，由主进程决定何时回收。
+"""
+import json
+import os
+import sys
+
+
+def tree_rss_mb(pid: int) -> float:
+    """进程及其所有子进程的常驻内存（MB），无法获取时返回0"""
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [process] + process.children(recursive=True)) / 1048576
+    except ImportError:
+        pass
+    except Exception:
+        return 0.0
+    total, pending = 0, [pid]
+    page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total / 1048576
+
+
+def main():
+    # 协议独占标准输出，其他输出一律转到标准错误
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    sys.stdout = sys.stderr
+
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+        try:
+            for line in sys.stdin:
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    continue
+                if request.get("cmd") == "exit":
+                    break
+                reply = {"id": request.get("id")}
+                try:
+                    if request.get("cmd") == "ping":
+                        reply["ok"] = True
+                    else:
+                        page = browser.new_page(viewport=request.get("viewport") or {"width": 800, "height": 600})
+                        try:
+                            page.set_content(request["html"])
+                            page.wait_for_load_state("networkidle")
+                            page.screenshot(path=request["path"], full_page=True, type="png")
+                        finally:
+                            page.close()
+                        reply["ok"] = True
+                        reply["path"] = request["path"]
+                except Exception as e:
+                    reply["ok"] = False
+                    reply["error"] = str(e)
+                reply["rss_mb"] = round(tree_rss_mb(os.getpid()), 1)
+                channel.write(json.dumps(reply) + "\n")
+                channel.flush()
+        finally:
+            browser.close()
+
+
+if __name__ == "__main__":
+    main()
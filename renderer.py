@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+import sys
+from typing import Optional
+
+from astrbot.api import logger
+
+
+class ImageRenderer:
+    """基于本地Chromium的HTML渲染器
+
+    Playwright只在首次渲染（或预热）时才导入并启动浏览器，只发送文本通知的部署
+    不会加载浏览器相关的依赖。浏览器启动后在多次渲染之间复用，每次渲染只新建页面。
+    """
+
+    # 是否由浏览器自行加载远程图片（头像）；进程内渲染时头像先下载并内嵌为base64
+    loads_remote_images = False
+
+    def __init__(self, width: int = 800, height: int = 600):
+        self.viewport = {"width": width, "height": height}
+        self._playwright = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _ensure_browser(self):
+        async with self._lock:
+            if self.is_ready:
+                return self._browser
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            return self._browser
+
+    async def prewarm(self) -> bool:
+        """提前导入Playwright并启动浏览器，避免首次通知等待浏览器冷启动"""
+        try:
+            await self._ensure_browser()
+            logger.info("GitHub Star Monitor: 图片渲染器预热完成")
+            return True
+        except Exception as e:
+            logger.warning(f"GitHub Star Monitor: 图片渲染器预热失败: {e}")
+            return False
+
+    async def render(self, html_content: str, image_path: str) -> Optional[str]:
+        browser = await self._ensure_browser()
+        page = await browser.new_page(viewport=self.viewport)
+        try:
+            await page.set_content(html_content)
+            await page.wait_for_load_state('networkidle')
+            await page.screenshot(path=image_path, full_page=True, type='png')
+            return image_path
+        finally:
+            await page.close()
+
+    async def close(self):
+        async with self._lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception:
+                    pass
+                self._browser = None
+            if self._playwright is not None:
+                try:
+                    await self._playwright.stop()
+                except Exception:
+                    pass
+                self._playwright = None
+
+
+# 单次渲染（含Chromium冷启动）的超时时间
+WORKER_TIMEOUT = 60.0
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_worker.py")
+
+
+class RenderWorker:
+    """一个渲染子进程，按需启动，通过管道逐个处理渲染请求"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.renders = 0
+        self.rss_mb = 0.0
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=1 << 20,
+        )
+        self.renders = 0
+        self.rss_mb = 0.0
+        logger.info(f"GitHub Star Monitor: 渲染进程#{self.index} 已启动 (pid {self.process.pid})")
+
+    async def call(self, request: dict, timeout: float) -> dict:
+        if not self.is_alive:
+            await self.start()
+        self.process.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+        await self.process.stdin.drain()
+        try:
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"渲染进程#{self.index} {timeout:.0f}秒内未完成渲染") from None
+        if not line:
+            await self.process.wait()
+            raise RuntimeError(f"渲染进程#{self.index} 意外退出 (exit {self.process.returncode})")
+        reply = json.loads(line)
+        if reply.get("id") != request.get("id"):
+            raise RuntimeError(f"渲染进程#{self.index} 返回的结果与请求不对应")
+        self.rss_mb = reply.get("rss_mb", 0.0)
+        return reply
+
+    async def stop(self, graceful: bool = True):
+        process, self.process = self.process, None
+        if process is None or process.returncode is not None:
+            return
+        try:
+            if graceful:
+                process.stdin.write(b'{"cmd": "exit"}\n')
+                await process.stdin.drain()
+                await asyncio.wait_for(process.wait(), 5)
+                return
+        except Exception:
+            pass
+        try:
+            process.kill()
+            await process.wait()
+        except ProcessLookupError:
+            pass
+
+
+class RenderWorkerPool:
+    """在独立进程中渲染图片的进程池，接口与 ImageRenderer 相同
+
+    Chromium、截图与大段HTML都不再占用机器人的事件循环，主进程只传递HTML并拿到图片路径。
+    每个进程渲染 max_renders 次或内存超过 memory_limit_mb 后回收，超时或崩溃时直接结束
+    进程，下一次渲染时自动重新启动。子进程中的浏览器会自行加载头像链接，无需在主进程下载头像。
+    """
+
+    loads_remote_images = True
+
+    def __init__(self, size: int = 1, max_renders: int = 100, memory_limit_mb: float = 512,
+                 width: int = 800, height: int = 600, timeout: float = WORKER_TIMEOUT):
+        self.viewport = {"width": width, "height": height}
+        self.max_renders = max_renders
+        self.memory_limit_mb = memory_limit_mb
+        self.timeout = timeout
+        self.workers = [RenderWorker(i) for i in range(max(1, size))]
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for worker in self.workers:
+            self._idle.put_nowait(worker)
+        self._request_id = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return any(worker.is_alive for worker in self.workers)
+
+    async def _call(self, request: dict) -> dict:
+        worker = await self._idle.get()
+        try:
+            self._request_id += 1
+            request["id"] = self._request_id
+            try:
+                reply = await worker.call(request, self.timeout)
+            except BaseException:
+                # 包括被取消：管道中可能还留着这次请求的结果，必须结束进程，不能交给下一次渲染
+                await worker.stop(graceful=False)
+                raise
+            if request.get("cmd") == "ping":
+                return reply
+            worker.renders += 1
+            if (self.max_renders and worker.renders >= self.max_renders) or (
+                self.memory_limit_mb and worker.rss_mb > self.memory_limit_mb
+            ):
+                logger.info(
+                    f"GitHub Star Monitor: 回收渲染进程#{worker.index}（已渲染 {worker.renders} 次，内存 {worker.rss_mb:.0f}MB）"
+                )
+                await worker.stop()
+            return reply
+        finally:
+            self._idle.put_nowait(worker)
+
+    async def prewarm(self) -> bool:
+        """启动所有渲染进程并等待浏览器就绪"""
+        try:
+            for reply in await asyncio.gather(*(self._call({"cmd": "ping"}) for _ in self.workers)):
+                if not reply.get("ok"):
+                    raise RuntimeError(reply.get("error"))
+            logger.info(f"GitHub Star Monitor: {len(self.workers)} 个渲染进程预热完成")
+            return True
+        except Exception as e:
+            logger.warning(f"GitHub Star Monitor: 渲染进程预热失败: {e}")
+            return False
+
+    async def render(self, html_content: str, image_path: str) -> Optional[str]:
+        reply = await self._call({"html": html_content, "path": os.path.abspath(image_path), "viewport": self.viewport})
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error") or "渲染失败")
+        return image_path
+
+    async def close(self):
+        await asyncio.gather(*(worker.stop() for worker in self.workers), return_exceptions=True)
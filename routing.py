@@ -0,0 +1,121 @@
+import fnmatch
+import re
+from typing import Dict, Iterable, List, Optional
+
+from astrbot.api import logger
+
+
+class Route:
+    """一条路由规则：仓库匹配模式 -> 会话列表，可选最小变动阈值"""
+
+    __slots__ = ("pattern", "sessions", "min_change")
+
+    def __init__(self, pattern: str, sessions: List[str], min_change: int = 1):
+        self.pattern = pattern
+        self.sessions = sessions
+        self.min_change = min_change
+
+
+def parse_route(line: str) -> Optional[Route]:
+    """解析一行路由配置
+
+    格式为 ``仓库模式|会话1,会话2|最小变动``，最小变动可省略。仓库模式支持：
+    ``owner/repo`` 精确匹配、``owner/*`` 匹配某个用户或组织的全部仓库、
+    ``*`` 匹配全部仓库，以及 ``astrbot*/plugin-*`` 这样的通配模式。
+    """
+    parts = [part.strip() for part in line.split("|")]
+    if len(parts) < 2 or not parts[0]:
+        return None
+    sessions = [session.strip() for session in parts[1].split(",") if session.strip()]
+    if not sessions:
+        return None
+    min_change = 1
+    if len(parts) >= 3 and parts[2]:
+        try:
+            min_change = max(1, int(parts[2]))
+        except ValueError:
+            return None
+    pattern = parts[0].lower()
+    if pattern != "*" and "/" not in pattern:
+        return None
+    return Route(pattern, sessions, min_change)
+
+
+class RoutingTable:
+    """预编译的路由索引
+
+    精确仓库与 ``owner/*`` 规则分别放入字典，``*`` 与其他通配规则预编译为正则。
+    每个仓库第一次匹配后结果会被缓存，之后的分发都是一次字典查找。
+    没有任何规则命中的仓库使用默认会话（即 target_sessions）。
+    """
+
+    def __init__(self, routes: Iterable[Route], default_sessions: Iterable[str] = ()):
+        self.default: Dict[str, int] = {session: 1 for session in default_sessions if session}
+        self.exact: Dict[str, List[Route]] = {}
+        self.owners: Dict[str, List[Route]] = {}
+        self.globs: List[Route] = []
+        self.route_count = 0
+        for route in routes:
+            self.route_count += 1
+            owner, _, repo = route.pattern.partition("/")
+            if route.pattern == "*":
+                self.globs.append(route)
+            elif repo == "*" and not any(ch in owner for ch in "*?["):
+                self.owners.setdefault(owner, []).append(route)
+            elif not any(ch in route.pattern for ch in "*?["):
+                self.exact.setdefault(route.pattern, []).append(route)
+            else:
+                self.globs.append(route)
+        # 通配规则预先编译为正则，只在仓库第一次解析时逐条匹配
+        self._glob_patterns = [(re.compile(fnmatch.translate(route.pattern)), route) for route in self.globs]
+        self._cache: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_config(cls, lines: Iterable[str], default_sessions: Iterable[str] = ()) -> "RoutingTable":
+        routes = []
+        for line in lines or []:
+            if not line or not line.strip():
+                continue
+            route = parse_route(line)
+            if route is None:
+                logger.warning(f"GitHub Star Monitor: 无效的路由配置: {line}")
+                continue
+            routes.append(route)
+        return cls(routes, default_sessions)
+
+    def _match(self, repo_key: str) -> List[Route]:
+        owner = repo_key.split("/", 1)[0]
+        matched = list(self.exact.get(repo_key, ()))
+        matched.extend(self.owners.get(owner, ()))
+        matched.extend(route for regex, route in self._glob_patterns if regex.match(repo_key))
+        return matched
+
+    def resolve(self, repo_key: str) -> Dict[str, int]:
+        """返回仓库对应的 {会话: 最小变动阈值}"""
+        key = repo_key.lower()
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        routes = self._match(key)
+        if not routes:
+            result = self.default
+        else:
+            result = {}
+            for route in routes:
+                for session in route.sessions:
+                    # 同一会话被多条规则命中时取最小阈值
+                    result[session] = min(route.min_change, result.get(session, route.min_change))
+        self._cache[key] = result
+        return result
+
+    def all_sessions(self) -> List[str]:
+        """所有可能收到通知的会话"""
+        sessions = dict(self.default)
+        for routes in list(self.exact.values()) + list(self.owners.values()) + [self.globs]:
+            for route in routes:
+                for session in route.sessions:
+                    sessions.setdefault(session, route.min_change)
+        return list(sessions)
+
+    def __bool__(self) -> bool:
+        return bool(self.default) or self.route_count > 0
@@ -0,0 +1,144 @@
+import bisect
+import hashlib
+import os
+import socket
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+def default_instance_id() -> str:
+    """主机名加工作目录摘要，同一部署重启后ID不变，可以直接接回原来的租约"""
+    digest = hashlib.md5(os.path.abspath(os.getcwd()).encode("utf-8")).hexdigest()[:8]
+    return f"{socket.gethostname()}-{digest}"
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """一致性哈希环，实例增减时只有少量仓库需要迁移"""
+
+    def __init__(self, members: Iterable[str], vnodes: int = 64):
+        points = sorted((_hash(f"{member}#{i}"), member) for member in members for i in range(vnodes))
+        self._keys = [point for point, _ in points]
+        self._members = [member for _, member in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._members[index]
+
+
+class ShardCoordinator:
+    """多个实例之间的仓库分片协调
+
+    成员与租约保存在共享的SQLite文件中：每个实例每轮检查写入心跳，超过
+    lease_ttl 未更新的实例视为已停止。仓库按一致性哈希分配给存活的实例，
+    实例只有持有仓库租约时才轮询该仓库；租约过期或被释放后才会被新的
+    负责实例接手，保证同一时刻只有一个实例轮询同一仓库。租约中同时记录
+    最近一次的星标数，接手的实例以此为基线，迁移期间的变动不会丢失。
+    """
+
+    def __init__(self, path: str, instance_id: str, lease_ttl: float = 180.0, vnodes: int = 64):
+        self.path = path
+        self.instance_id = instance_id
+        self.lease_ttl = lease_ttl
+        self.vnodes = vnodes
+        self.members: List[str] = []
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS members (instance_id TEXT PRIMARY KEY, heartbeat REAL NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "repo TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL, stars INTEGER)"
+            )
+        finally:
+            conn.close()
+
+    def claim(self, repo_keys: Iterable[str]) -> Dict[str, Optional[int]]:
+        """写入心跳并按哈希环申领/续约租约
+
+        返回本实例当前持有租约的仓库及租约中记录的星标数（可能为None）。
+        """
+        now = time.time()
+        expires = now + self.lease_ttl
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO members (instance_id, heartbeat) VALUES (?, ?) "
+                "ON CONFLICT(instance_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+                (self.instance_id, now),
+            )
+            conn.execute("DELETE FROM members WHERE heartbeat < ?", (now - self.lease_ttl,))
+            # 已过期的租约保留一段时间，接手的实例仍可读取其中的星标数
+            conn.execute("DELETE FROM leases WHERE expires < ?", (now - 86400,))
+            self.members = sorted(row[0] for row in conn.execute("SELECT instance_id FROM members"))
+
+            ring = HashRing(self.members, self.vnodes)
+            wanted = [repo for repo in repo_keys if ring.owner(repo.lower()) == self.instance_id]
+            wanted_set = set(wanted)
+            # 释放不再属于本实例的租约（置为过期），让新的负责实例尽快接手
+            held = [row[0] for row in conn.execute("SELECT repo FROM leases WHERE owner = ?", (self.instance_id,))]
+            conn.executemany(
+                "UPDATE leases SET expires = ? WHERE repo = ? AND owner = ?",
+                [(now, repo, self.instance_id) for repo in held if repo not in wanted_set],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO leases (repo, owner, expires) VALUES (?, ?, ?)",
+                [(repo, self.instance_id, expires) for repo in wanted],
+            )
+            # 续约自己的租约，接手已过期的租约；仍被其他实例持有的租约要等其过期或释放
+            conn.executemany(
+                "UPDATE leases SET owner = ?, expires = ? WHERE repo = ? AND (owner = ? OR expires <= ?)",
+                [(self.instance_id, expires, repo, self.instance_id, now) for repo in wanted],
+            )
+            owned = {
+                repo: stars
+                for repo, stars in conn.execute(
+                    "SELECT repo, stars FROM leases WHERE owner = ? AND expires > ?", (self.instance_id, now)
+                )
+            }
+            conn.execute("COMMIT")
+            return owned
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def owns(self, key: str) -> bool:
+        """按最近一次心跳得到的成员列表判断某项全局任务（如定时汇总）是否由本实例负责"""
+        return HashRing(self.members, self.vnodes).owner(key) == self.instance_id
+
+    def store_counts(self, counts: Dict[str, int]):
+        """把本实例持有仓库的最新星标数写入租约，供接手的实例作为基线"""
+        if not counts:
+            return
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "UPDATE leases SET stars = ? WHERE repo = ? AND owner = ?",
+                [(stars, repo, self.instance_id) for repo, stars in counts.items()],
+            )
+        finally:
+            conn.close()
+
+    def leave(self):
+        """退出集群并释放全部租约，其他实例在下一轮检查时即可接手"""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE leases SET expires = ? WHERE owner = ?", (time.time(), self.instance_id))
+            conn.execute("DELETE FROM members WHERE instance_id = ?", (self.instance_id,))
+        finally:
+            conn.close()
@@ -0,0 +1,107 @@
+import asyncio
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_PACKAGE = "star_monitor_plugin"
+
+
+def load(name: str):
+    """以包的形式加载插件模块，与AstrBot的加载方式一致"""
+    if PLUGIN_PACKAGE not in sys.modules:
+        package = types.ModuleType(PLUGIN_PACKAGE)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PLUGIN_PACKAGE] = package
+    return importlib.import_module(f"{PLUGIN_PACKAGE}.{name}")
+
+
+github_client = load("github_client")
+token_pool = load("token_pool")
+
+
+def half_open_client(send):
+    """熔断器已打开且冷却结束的客户端，_send 由测试替换"""
+    breaker = github_client.CircuitBreaker(threshold=1, cooldown=60)
+    breaker.failures = 1
+    breaker.opened_at = 0.0
+    client = github_client.GitHubClient(token_pool.TokenPool([]), retries=0, breaker=breaker, cache_ttl=0)
+    client._send = send
+    return client
+
+
+def test_half_open_trial_released_after_non_network_error():
+    async def send(*args):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+    client = half_open_client(send)
+    with pytest.raises(ValueError):
+        asyncio.run(client.request("https://api.github.com/repos/a/b", "repo"))
+    assert not client.breaker.trial_in_flight
+    assert client.breaker.failures == 2
+
+    # 再次熔断冷却结束后仍会放行新的试探请求
+    client.breaker.opened_at = 0.0
+    assert client.breaker.allow()
+
+
+def test_half_open_trial_released_after_cancel():
+    started = asyncio.Event()
+
+    async def send(*args):
+        started.set()
+        await asyncio.sleep(3600)
+
+    client = half_open_client(send)
+
+    async def run():
+        task = asyncio.ensure_future(client._fetch(
+            "https://api.github.com/repos/a/b", "repo", None, github_client.DEFAULT_ACCEPT,
+            None, True, None, "json", "GET", None, None,
+        ))
+        await started.wait()
+        assert client.breaker.trial_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert not client.breaker.trial_in_flight
+    assert client.breaker.allow()
+
+
+def test_half_open_trial_success_closes_breaker():
+    async def send(*args):
+        return github_client.GitHubResponse(200, {}, {"stargazers_count": 1}, None)
+
+    client = half_open_client(send)
+    response = asyncio.run(client.request("https://api.github.com/repos/a/b", "repo"))
+    assert response.ok
+    assert client.breaker.failures == 0
+    assert not client.breaker.trial_in_flight
+
+
+def test_shared_response_data_is_copied_per_caller():
+    models = load("models")
+
+    async def send(*args):
+        return github_client.GitHubResponse(200, {}, [models.Stargazer("alice")], None)
+
+    client = half_open_client(send)
+    client.breaker = github_client.CircuitBreaker()
+    client.cache_ttl = 60
+
+    async def run():
+        url = "https://api.github.com/repos/a/b/stargazers"
+        first, second = await asyncio.gather(client.request(url, "stargazers"), client.request(url, "stargazers"))
+        first.data[0].notable = True
+        cached = await client.request(url, "stargazers")
+        return first, second, cached
+
+    first, second, cached = asyncio.run(run())
+    assert first.data[0] is not second.data[0]
+    assert not second.data[0].notable
+    assert not cached.data[0].notable
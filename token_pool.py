@@ -0,0 +1,99 @@
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+class TokenState:
+    """单个GitHub Token的速率限制状态"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.limit = 5000
+        self.remaining = 5000
+        self.reset = 0
+        self.quarantined = False
+        self.requests = 0
+        # 已挑选但还未收到响应的请求数，响应头更新 remaining 前先在本地扣除
+        self.reserved = 0
+
+    @property
+    def masked(self) -> str:
+        """日志和命令输出中使用的脱敏Token"""
+        if len(self.token) <= 8:
+            return "****"
+        return f"{self.token[:4]}…{self.token[-4:]}"
+
+    def available_budget(self, now: float) -> int:
+        """当前可用的请求数（扣除进行中的请求），重置时间已过则视为额度已恢复"""
+        if self.reset and now >= self.reset:
+            return self.limit - self.reserved
+        return self.remaining - self.reserved
+
+
+class TokenPool:
+    """多Token池，每次请求挑选剩余额度最多的Token
+
+    通过响应头 X-RateLimit-* 跟踪每个Token的额度，返回401的Token会被隔离，
+    不再参与挑选。挑选时先在本地预留一次额度，请求结束后释放，同一批并发请求
+    在收到响应前也会分散到不同的Token上。
+    """
+
+    def __init__(self, tokens: Iterable[str]):
+        self.states: Dict[str, TokenState] = {}
+        for token in tokens:
+            token = (token or "").strip()
+            if token and token not in self.states:
+                self.states[token] = TokenState(token)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def has_token(self) -> bool:
+        """是否还有可用（未被隔离）的Token"""
+        return any(not state.quarantined for state in self.states.values())
+
+    def acquire(self) -> Optional[str]:
+        """返回剩余额度最多的Token，没有可用Token时返回None"""
+        now = time.time()
+        best = None
+        best_budget = -1
+        for state in self.states.values():
+            if state.quarantined:
+                continue
+            budget = state.available_budget(now)
+            if budget > best_budget:
+                best, best_budget = state, budget
+        if best is None:
+            return None
+        best.requests += 1
+        best.reserved += 1
+        return best.token
+
+    def release(self, token: Optional[str]) -> None:
+        """请求结束（无论成功与否）后释放 acquire 预留的额度，实际剩余额度以响应头为准"""
+        state = self.states.get(token) if token else None
+        if state is not None and state.reserved > 0:
+            state.reserved -= 1
+
+    def update(self, token: Optional[str], headers) -> None:
+        """根据响应头更新Token额度"""
+        state = self.states.get(token) if token else None
+        if state is None:
+            return
+        try:
+            if "X-RateLimit-Limit" in headers:
+                state.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                state.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                state.reset = int(headers["X-RateLimit-Reset"])
+        except (TypeError, ValueError):
+            pass
+
+    def quarantine(self, token: Optional[str]) -> None:
+        """隔离无效或已过期的Token"""
+        state = self.states.get(token) if token else None
+        if state is not None:
+            state.quarantined = True
+
+    def all_states(self) -> List[TokenState]:
+        return list(self.states.values())
@@ -0,0 +1,151 @@
+import contextvars
+import functools
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from astrbot.api import logger
+
+# 当前正在处理的星标变动，随 asyncio 上下文传递到下游的请求、渲染与发送
+current_trace: contextvars.ContextVar = contextvars.ContextVar("star_monitor_trace", default=None)
+
+
+def parse_github_time(value: Optional[str]) -> Optional[float]:
+    """把GitHub的ISO时间（如 2024-01-01T00:00:00Z）转换为时间戳"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Trace:
+    """一次星标变动从GitHub发生到送达群聊的时间线"""
+
+    __slots__ = ("id", "repo", "change", "origin", "detected_at", "delivered_at", "spans", "pending", "done")
+
+    def __init__(self, repo: str, change: int, detected_at: Optional[float] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.repo = repo
+        self.change = change
+        # 星标在GitHub上发生的时间（starred_at），未知时为None
+        self.origin: Optional[float] = None
+        self.detected_at = detected_at or time.time()
+        self.delivered_at: Optional[float] = None
+        self.spans: List[tuple] = []
+        # 出站队列中尚未送达的通知数；检测流程结束（done）且全部送达后才写入记录
+        self.pending = 0
+        self.done = False
+
+    def add_span(self, name: str, start: float, end: float):
+        self.spans.append((name, start, end))
+
+    def to_record(self) -> dict:
+        record = {
+            "id": self.id,
+            "repo": self.repo,
+            "change": self.change,
+            "origin": self.origin,
+            "detected": self.detected_at,
+            "delivered": self.delivered_at,
+            "spans": [
+                {"name": name, "offset": round(start - self.detected_at, 4), "duration": round(end - start, 4)}
+                for name, start, end in self.spans
+            ],
+        }
+        if self.origin is not None:
+            record["detect_latency"] = round(self.detected_at - self.origin, 3)
+            if self.delivered_at is not None:
+                record["e2e_latency"] = round(self.delivered_at - self.origin, 3)
+        return record
+
+
+def traced(name: str):
+    """装饰异步方法：存在当前trace时记录一个耗时区间"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = current_trace.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+            start = time.time()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                trace.add_span(name, start, time.time())
+        return wrapper
+    return decorator
+
+
+class TraceRecorder:
+    """把完成的trace追加写入JSONL文件，并汇总延迟分位数"""
+
+    def __init__(self, path: str, max_records: int = 5000):
+        self.path = path
+        self.max_records = max_records
+        self.records = None
+
+    def record(self, trace: Trace):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace.to_record(), ensure_ascii=False) + "\n")
+            if self.records is None:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.records = sum(1 for _ in f)
+            else:
+                self.records += 1
+            if self.records > self.max_records * 2:
+                self._truncate()
+        except Exception as e:
+            logger.warning(f"GitHub Star Monitor: 写入延迟追踪记录失败: {e}")
+
+    def _truncate(self):
+        """只保留最近的 max_records 条记录"""
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()[-self.max_records:]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.path)
+        self.records = len(lines)
+
+    def load(self, limit: int = 1000) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f.readlines()[-limit:]:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def summarize(self, limit: int = 1000) -> Dict[str, dict]:
+        """返回端到端延迟、检测延迟以及各阶段耗时的 p50/p99（秒）"""
+        records = self.load(limit)
+        series: Dict[str, List[float]] = {"e2e": [], "detect": []}
+        for record in records:
+            if record.get("e2e_latency") is not None:
+                series["e2e"].append(record["e2e_latency"])
+            if record.get("detect_latency") is not None:
+                series["detect"].append(record["detect_latency"])
+            for span in record.get("spans", []):
+                series.setdefault(span["name"], []).append(span["duration"])
+        return {
+            name: {"count": len(values), "p50": percentile(values, 50), "p99": percentile(values, 99)}
+            for name, values in series.items()
+        }
@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from typing import Awaitable, Callable, Optional
+
+from aiohttp import web
+from astrbot.api import logger
+
+
+def verify_signature(secret: str, body: bytes, signature_header: Optional[str]) -> bool:
+    """校验GitHub Webhook的 X-Hub-Signature-256 签名"""
+    if not secret or not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len("sha256="):])
+
+
+class WebhookServer:
+    """接收GitHub star/watch事件的内嵌HTTP服务
+
+    收到并校验通过的事件会交给 handler(event_name, payload, delivery_id) 异步处理，
+    请求本身立即返回，避免GitHub等待通知发送完成。
+    """
+
+    SUPPORTED_EVENTS = ("star", "watch")
+
+    def __init__(
+        self,
+        secret: str,
+        handler: Callable[[str, dict, str], Awaitable[None]],
+        host: str = "0.0.0.0",
+        port: int = 6190,
+        path: str = "/github/webhook",
+    ):
+        self.secret = secret
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.path = path
+        self._runner: Optional[web.AppRunner] = None
+        self._tasks = set()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"GitHub Star Monitor: Webhook服务已启动 http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not verify_signature(self.secret, body, request.headers.get("X-Hub-Signature-256")):
+            logger.warning("GitHub Star Monitor: Webhook签名校验失败，已拒绝请求")
+            return web.Response(status=401, text="invalid signature")
+
+        event_name = request.headers.get("X-GitHub-Event", "")
+        if event_name == "ping":
+            return web.Response(text="pong")
+        if event_name not in self.SUPPORTED_EVENTS:
+            return web.Response(status=202, text="ignored")
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.Response(status=400, text="invalid payload")
+
+        delivery_id = request.headers.get("X-GitHub-Delivery", "")
+        task = asyncio.create_task(self._dispatch(event_name, payload, delivery_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=202, text="accepted")
+
+    async def _dispatch(self, event_name: str, payload: dict, delivery_id: str):
+        try:
+            await self.handler(event_name, payload, delivery_id)
+        except Exception as e:
+            logger.error(f"GitHub Star Monitor: 处理Webhook事件出错: {e}")